@@ -0,0 +1,78 @@
+"""Benchmark de concurrencia lectura/escritura por perfil SQLite
+
+Ejecuta lectores y escritores en hilos contra una base de datos en archivo
+y reporta operaciones por segundo y errores "database is locked" para cada
+perfil de SQLITE_PERFIL.
+
+Uso:
+    python -m benchmarks.concurrencia_sqlite --lectores 8 --escritores 4 --segundos 10
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy.exc import OperationalError
+from inventario.app import crear_app
+from inventario.database import crear_producto, obtener_productos, ajustar_stock
+from inventario.models import db
+
+def _trabajador(app, operacion, fin, contadores, clave):
+    with app.app_context():
+        while time.monotonic() < fin:
+            try:
+                operacion()
+                contadores[clave] += 1
+            except OperationalError:
+                db.session.rollback()
+                contadores['bloqueos'] += 1
+        db.session.remove()
+
+def medir(perfil, lectores, escritores, segundos, filas=1000):
+    """Ejecutar la carga mixta con un perfil y retornar los contadores"""
+    directorio = tempfile.mkdtemp()
+    app = crear_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(directorio, "bench.db")}',
+        'SQLITE_PERFIL': perfil,
+        'CACHE_TIPO': 'ninguna',
+    })
+    with app.app_context():
+        for i in range(filas):
+            crear_producto({'nombre': f'Producto {i}', 'precio': 10.0, 'stock': 100})
+
+    def leer():
+        obtener_productos(pagina=(time.monotonic_ns() % 50) + 1, por_pagina=20).items
+
+    def escribir():
+        ajustar_stock((time.monotonic_ns() % filas) + 1, 1)
+
+    contadores = {'lecturas': 0, 'escrituras': 0, 'bloqueos': 0}
+    fin = time.monotonic() + segundos
+    hilos = [
+        threading.Thread(target=_trabajador, args=(app, leer, fin, contadores, 'lecturas'))
+        for _ in range(lectores)
+    ] + [
+        threading.Thread(target=_trabajador, args=(app, escribir, fin, contadores, 'escrituras'))
+        for _ in range(escritores)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return contadores
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lectores', type=int, default=8)
+    parser.add_argument('--escritores', type=int, default=4)
+    parser.add_argument('--segundos', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{'perfil':<12}{'lecturas/s':>12}{'escrituras/s':>14}{'bloqueos':>10}")
+    for perfil in ('ninguno', 'produccion'):
+        c = medir(perfil, args.lectores, args.escritores, args.segundos)
+        print(f"{perfil:<12}{c['lecturas'] / args.segundos:>12.0f}"
+              f"{c['escrituras'] / args.segundos:>14.0f}{c['bloqueos']:>10}")
+
+if __name__ == '__main__':
+    main()
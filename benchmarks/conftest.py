@@ -0,0 +1,46 @@
+"""Datos de prueba para la suite de rendimiento
+
+Cada tamaño de --filas se siembra una vez por sesión con inventario.semilla
+en un archivo SQLite, con datos deterministas; cada benchmark trabaja sobre
+una copia, así las escrituras de uno no alteran a los demás.
+"""
+import shutil
+import pytest
+from inventario.app import crear_app
+from inventario.models import db
+from inventario.semilla import sembrar
+
+CONFIG_BENCH = {
+    'CACHE_TIPO': 'ninguna',
+    'METRICAS': False,
+}
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--filas', default='10000',
+        help='Tamaños de catálogo separados por coma, p. ej. 10000,100000,1000000'
+    )
+
+def pytest_generate_tests(metafunc):
+    if 'filas' in metafunc.fixturenames:
+        tamanos = [int(t) for t in metafunc.config.getoption('filas').split(',')]
+        metafunc.parametrize('filas', tamanos, scope='session')
+
+@pytest.fixture(scope='session')
+def base_sembrada(filas, tmp_path_factory):
+    ruta = tmp_path_factory.mktemp('bench') / f'productos-{filas}.db'
+    app = crear_app({**CONFIG_BENCH, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{ruta}'})
+    sembrar(app, filas)
+    with app.app_context():
+        db.engine.dispose()
+    return ruta
+
+@pytest.fixture
+def app_bench(base_sembrada, tmp_path):
+    ruta = tmp_path / base_sembrada.name
+    shutil.copy(base_sembrada, ruta)
+    app = crear_app({**CONFIG_BENCH, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{ruta}'})
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
@@ -0,0 +1,50 @@
+"""Benchmark de serialización de una página del listado
+
+Compara el camino anterior (objetos ORM, to_dict y json estándar) con el
+actual (tuplas de columnas, filas_a_dicts y el proveedor JSON de la app).
+
+Uso:
+    python -m benchmarks.serializacion_listado --filas 1000 --por-pagina 100
+"""
+import argparse
+import json
+import time
+from inventario.app import crear_app
+from inventario.database import crear_productos_lote, obtener_productos, obtener_pagina_filas, COLUMNAS_PRODUCTO
+from inventario.serializacion import filas_a_dicts
+
+def _por_segundo(funcion, segundos):
+    n = 0
+    fin = time.monotonic() + segundos
+    while time.monotonic() < fin:
+        funcion()
+        n += 1
+    return n / segundos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--filas', type=int, default=1000)
+    parser.add_argument('--por-pagina', type=int, default=100)
+    parser.add_argument('--segundos', type=float, default=3)
+    args = parser.parse_args()
+
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'CACHE_TIPO': 'ninguna'})
+    with app.app_context():
+        crear_productos_lote([
+            {'nombre': f'Producto ñ {i}', 'precio': 10.5, 'stock': i} for i in range(args.filas)
+        ])
+
+        def orm():
+            paginacion = obtener_productos(1, args.por_pagina)
+            json.dumps({'productos': [p.to_dict() for p in paginacion.items], 'total': paginacion.total})
+
+        def filas():
+            resultado, total = obtener_pagina_filas(1, args.por_pagina)
+            app.json.dumps({'productos': filas_a_dicts(COLUMNAS_PRODUCTO, resultado), 'total': total})
+
+        print(f"{'camino':<10}{'páginas/s':>12}")
+        for nombre, funcion in (('orm', orm), ('filas', filas)):
+            print(f'{nombre:<10}{_por_segundo(funcion, args.segundos):>12.0f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Suite de rendimiento de las funciones de datos y las rutas
+
+Requiere pytest-benchmark. Ejecutar con:
+    pytest benchmarks --no-cov --filas 10000,100000 --benchmark-autosave
+y comparar contra la última ejecución guardada con --benchmark-compare.
+"""
+import itertools
+import json
+import pytest
+from inventario.database import (
+    crear_producto, obtener_productos, actualizar_stock, eliminar_producto, obtener_estadisticas
+)
+from inventario.models import db, Producto
+
+POR_PAGINA = 20
+
+@pytest.fixture
+def client(app_bench):
+    return app_bench.test_client()
+
+def test_crear_producto(app_bench, benchmark):
+    benchmark(crear_producto, {'nombre': 'Nuevo', 'precio': 9.99, 'stock': 5})
+
+@pytest.mark.parametrize('profundidad', ['primera', 'media', 'ultima'])
+def test_obtener_productos(app_bench, benchmark, filas, profundidad):
+    paginas = -(-filas // POR_PAGINA)
+    pagina = {'primera': 1, 'media': paginas // 2, 'ultima': paginas}[profundidad]
+    
+    paginacion = benchmark(obtener_productos, pagina, POR_PAGINA)
+    assert paginacion.items
+
+def test_actualizar_stock(app_bench, benchmark, filas):
+    ids = itertools.cycle(range(1, filas + 1))
+    benchmark(lambda: actualizar_stock(next(ids), 7))
+
+def test_eliminar_producto(app_bench, benchmark, filas):
+    ids = iter(range(1, filas + 1))
+    benchmark.pedantic(lambda: eliminar_producto(next(ids)), rounds=min(filas, 200))
+
+def test_obtener_estadisticas(app_bench, benchmark, filas):
+    estadisticas = benchmark(obtener_estadisticas)
+    assert estadisticas['productos'] == filas
+
+def test_to_dict(app_bench, benchmark):
+    productos = db.session.execute(db.select(Producto).limit(100)).scalars().all()
+    benchmark(lambda: [p.to_dict() for p in productos])
+
+def test_ruta_listar_productos(client, benchmark, filas):
+    paginas = -(-filas // POR_PAGINA)
+    respuesta = benchmark(client.get, f'/api/productos?pagina={paginas // 2}&por_pagina={POR_PAGINA}')
+    assert respuesta.status_code == 200
+
+def test_ruta_obtener_producto(client, benchmark, filas):
+    respuesta = benchmark(client.get, f'/api/productos/{filas // 2}')
+    assert respuesta.status_code == 200
+
+def test_ruta_crear_producto(client, benchmark):
+    cuerpo = json.dumps({'nombre': 'Nuevo', 'precio': 9.99, 'stock': 5})
+    respuesta = benchmark(client.post, '/api/productos', data=cuerpo, content_type='application/json')
+    assert respuesta.status_code == 201
@@ -109,8 +109,8 @@ def step_verificar_stock(context, stock):
 @then('el producto ya no existe en el inventario')
 def step_producto_eliminado(context):
     response = context.client.get(f'/api/productos/{context.producto_id}')
-    # El endpoint GET individual no existe, verificamos con lista
     assert context.response.status_code == 200
+    assert response.status_code == 404
 
 @then('la respuesta contiene errores de validación')
 def step_errores_validacion(context):
@@ -0,0 +1,166 @@
+import json
+import logging
+import queue
+import threading
+import urllib.request
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+class SumideroAlertas:
+    """Destino de los eventos de alerta
+
+    Permite enviar las alertas a otro sistema (cola de mensajes, correo)
+    asignando una instancia a ALERTAS_SUMIDERO.
+    """
+
+    def enviar(self, eventos):
+        raise NotImplementedError
+
+class SumideroCola(SumideroAlertas):
+    """Cola en proceso, para consumidores dentro de la misma aplicación"""
+
+    def __init__(self, max_eventos=10000):
+        self.cola = queue.Queue(max_eventos)
+        self.descartados = 0
+
+    def enviar(self, eventos):
+        for evento in eventos:
+            try:
+                self.cola.put_nowait(evento)
+            except queue.Full:
+                self.descartados += 1
+
+    def obtener(self, timeout=None):
+        """Siguiente evento, o None si no llega ninguno en `timeout`"""
+        try:
+            return self.cola.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class SumideroArchivo(SumideroAlertas):
+    """Añade cada evento como una línea JSON a un archivo"""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def enviar(self, eventos):
+        with open(self.ruta, 'a', encoding='utf-8') as archivo:
+            for evento in eventos:
+                archivo.write(json.dumps(evento, ensure_ascii=False) + '\n')
+
+class SumideroWebhook(SumideroAlertas):
+    """Envía los eventos de cada lote en un POST JSON a `url`"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def enviar(self, eventos):
+        cuerpo = json.dumps({'eventos': eventos}, ensure_ascii=False).encode()
+        peticion = urllib.request.Request(
+            self.url, data=cuerpo, headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        with urllib.request.urlopen(peticion, timeout=self.timeout):
+            pass
+
+class ProcesadorAlertas:
+    """Hilo que entrega las alertas al sumidero fuera de las peticiones
+
+    Las escrituras solo encolan los eventos tras confirmar la transacción;
+    el hilo los agrupa en lotes de hasta `max_lote` y los envía, de modo
+    que un sumidero lento o caído no retrasa las escrituras. Los errores
+    del sumidero se registran en el log y el lote se descarta.
+    """
+
+    def __init__(self, sumidero, max_lote=100):
+        self.sumidero = sumidero
+        self.max_lote = max_lote
+        self.enviados = 0
+        self.errores = 0
+        self._cola = queue.Queue()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._ejecutar, name='procesador-alertas', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        """Entregar lo pendiente y terminar el hilo"""
+        if self._hilo is not None:
+            self._cola.put(None)
+            self._hilo.join()
+            self._hilo = None
+
+    def reiniciar_tras_fork(self):
+        """Crear un hilo y una cola nuevos en un proceso hijo"""
+        self._cola = queue.Queue()
+        self._hilo = None
+        self.iniciar()
+
+    def publicar(self, eventos):
+        for evento in eventos:
+            self._cola.put(evento)
+
+    def _tomar_lote(self):
+        primero = self._cola.get()
+        if primero is None:
+            return None
+
+        lote = [primero]
+        while len(lote) < self.max_lote:
+            try:
+                siguiente = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if siguiente is None:
+                self._cola.put(None)
+                break
+            lote.append(siguiente)
+        return lote
+
+    def _ejecutar(self):
+        while True:
+            lote = self._tomar_lote()
+            if lote is None:
+                break
+            try:
+                self.sumidero.enviar(lote)
+                self.enviados += len(lote)
+            except Exception:
+                self.errores += len(lote)
+                logger.exception('No se pudieron entregar %d alertas de stock', len(lote))
+
+def _crear_sumidero(app):
+    sumidero = app.config['ALERTAS_SUMIDERO']
+    if isinstance(sumidero, SumideroAlertas):
+        return sumidero
+    if sumidero == 'cola':
+        return SumideroCola()
+    if sumidero == 'archivo':
+        return SumideroArchivo(app.config['ALERTAS_ARCHIVO'])
+    if sumidero == 'webhook':
+        return SumideroWebhook(app.config['ALERTAS_WEBHOOK_URL'])
+    raise ValueError(f"Sumidero de alertas desconocido: {sumidero}")
+
+def init_alertas(app):
+    """Iniciar el procesador de alertas si ALERTAS_SUMIDERO está configurado
+
+    ALERTAS_SUMIDERO admite 'cola', 'archivo' (ALERTAS_ARCHIVO), 'webhook'
+    (ALERTAS_WEBHOOK_URL) o una instancia de SumideroAlertas.
+    """
+    app.config.setdefault('ALERTAS_SUMIDERO', None)
+    app.config.setdefault('ALERTAS_ARCHIVO', 'alertas_stock.ndjson')
+    app.config.setdefault('ALERTAS_WEBHOOK_URL', None)
+
+    if app.config['ALERTAS_SUMIDERO'] is None:
+        return
+
+    procesador = ProcesadorAlertas(_crear_sumidero(app))
+    procesador.iniciar()
+    app.extensions['inventario_alertas'] = procesador
+
+def obtener_procesador_alertas():
+    """Procesador de alertas de la aplicación actual, o None si no está activo"""
+    return current_app.extensions.get('inventario_alertas')
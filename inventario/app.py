@@ -1,12 +1,22 @@
+import os
 from flask import Flask
 from flask_cors import CORS
 from inventario.models import db
 from inventario.routes import api
 from inventario.database import init_db
+from inventario.alertas import init_alertas
+from inventario.cache import init_cache
+from inventario.cambios import init_cambios
+from inventario.busqueda import init_busqueda
+from inventario.escritura import init_escritura
+from inventario.replicas import init_replicas
+from inventario.serializacion import ProveedorJSON
+from inventario.metricas import init_metricas
 
 def crear_app(config=None):
     """Factory para crear la aplicación Flask"""
     app = Flask(__name__)
+    app.json = ProveedorJSON(app)
     
     # Configuración por defecto
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///inventario.db'
@@ -20,16 +30,47 @@ def crear_app(config=None):
     # Inicializar extensiones
     CORS(app)
     init_db(app)
+    init_busqueda(app)
+    init_cache(app)
+    init_cambios(app)
+    init_alertas(app)
+    init_escritura(app)
+    init_replicas(app)
+    init_metricas(app)
     
     # Registrar blueprints
     app.register_blueprint(api)
     
     return app
 
+def preparar_proceso_hijo(app):
+    """Dejar una aplicación precargada lista para usarse tras fork()
+    
+    Descarta las conexiones heredadas del proceso padre (SQLite no admite
+    compartirlas entre procesos) y reinicia los hilos del escritor agrupado
+    y del procesador de alertas.
+    """
+    with app.app_context():
+        for motor in db.engines.values():
+            motor.dispose(close=False)
+    
+    escritor = app.extensions.get('inventario_escritor')
+    if escritor is not None:
+        escritor.reiniciar_tras_fork()
+    
+    alertas = app.extensions.get('inventario_alertas')
+    if alertas is not None:
+        alertas.reiniciar_tras_fork()
+
 def main():
-    """Función principal para ejecutar la aplicación"""
+    """Función principal para ejecutar la aplicación en desarrollo
+    
+    El modo debug se activa con INVENTARIO_DEBUG=1; en producción use el
+    punto de entrada ASGI (inventario.asgi).
+    """
     app = crear_app()
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    debug = os.environ.get('INVENTARIO_DEBUG', '1') == '1'
+    app.run(debug=debug, host='0.0.0.0', port=5000, threaded=True)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
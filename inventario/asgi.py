@@ -0,0 +1,43 @@
+"""Punto de entrada ASGI de la API
+
+Sirve la misma aplicación Flask (rutas, validaciones y capa de datos)
+detrás de un servidor ASGI. El bucle de eventos acepta las conexiones,
+pero la aplicación es WSGI: cada petición ocupa uno de los `ASGI_HILOS`
+hilos (64 por defecto) del adaptador de principio a fin. Ese es el límite
+real de peticiones concurrentes por proceso, no el número de conexiones
+abiertas; las que superan el pool esperan un hilo libre.
+
+Los clientes del feed de cambios retienen su hilo mientras esperan, así
+que aquí se acotan: como mucho la mitad del pool (`CAMBIOS_MAX_CLIENTES`;
+el resto recibe 503 con Retry-After), el long-poll a 30 segundos y cada
+flujo SSE a 60 antes de que el cliente se reconecte.
+
+Uso:
+    uvicorn --factory inventario.asgi:crear_app_asgi --host 0.0.0.0 --port 5000
+"""
+from inventario.app import crear_app
+
+# Hilos del adaptador por defecto: peticiones atendidas a la vez
+HILOS_ASGI = 64
+
+# Límites de las esperas del feed de cambios, en segundos
+ESPERA_MAX_ASGI = 30
+SSE_DURACION_ASGI = 60
+
+def crear_app_asgi(config=None):
+    """Factory de la aplicación envuelta como ASGI"""
+    try:
+        from a2wsgi import WSGIMiddleware
+    except ImportError as e:
+        raise RuntimeError(
+            "El modo ASGI requiere a2wsgi, instálelo con: poetry install -E asgi"
+        ) from e
+
+    config = dict(config or {})
+    hilos = config.setdefault('ASGI_HILOS', HILOS_ASGI)
+    config.setdefault('CAMBIOS_MAX_CLIENTES', max(hilos // 2, 1))
+    app = crear_app(config)
+    app.config['CAMBIOS_ESPERA_MAX'] = min(app.config['CAMBIOS_ESPERA_MAX'], ESPERA_MAX_ASGI)
+    app.config['CAMBIOS_SSE_DURACION'] = min(app.config['CAMBIOS_SSE_DURACION'], SSE_DURACION_ASGI)
+
+    return WSGIMiddleware(app, workers=hilos)
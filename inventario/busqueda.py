@@ -0,0 +1,114 @@
+from flask import current_app
+from sqlalchemy import column, event, func, select, table, text
+from inventario.models import db, Producto
+from inventario.database import consulta_filas
+
+# Índice de texto completo sobre productos.nombre (SQLite FTS5). La tabla
+# virtual usa productos como contenido externo y se mantiene con triggers,
+# por lo que también cubre inserciones masivas y actualizaciones en SQL.
+SENTENCIAS_FTS = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+        nombre,
+        content='productos',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+        INSERT INTO productos_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END""",
+]
+
+def fts_disponible(conexion):
+    """Indica si la conexión es SQLite compilado con FTS5"""
+    if conexion.dialect.name != 'sqlite':
+        return False
+    opciones = conexion.exec_driver_sql('PRAGMA compile_options').scalars().all()
+    return 'ENABLE_FTS5' in opciones
+
+def crear_indice_fts(conexion):
+    """Crear la tabla FTS5 y sus triggers si no existen
+
+    Si la tabla se crea sobre una tabla productos con datos, el índice se
+    reconstruye a partir de ella. Retorna True si FTS5 queda disponible.
+    """
+    if not fts_disponible(conexion):
+        return False
+
+    existia = conexion.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE name = 'productos_fts'"
+    ).first()
+    for sentencia in SENTENCIAS_FTS:
+        conexion.exec_driver_sql(sentencia)
+    if not existia:
+        conexion.exec_driver_sql("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+    return True
+
+def eliminar_indice_fts(conexion):
+    """Eliminar la tabla FTS5 (los triggers se eliminan con productos)"""
+    if conexion.dialect.name == 'sqlite':
+        conexion.exec_driver_sql('DROP TABLE IF EXISTS productos_fts')
+
+@event.listens_for(Producto.__table__, 'after_create')
+def _crear_fts_con_tabla(tabla, conexion, **kwargs):
+    crear_indice_fts(conexion)
+
+@event.listens_for(Producto.__table__, 'before_drop')
+def _eliminar_fts_con_tabla(tabla, conexion, **kwargs):
+    eliminar_indice_fts(conexion)
+
+def init_busqueda(app):
+    """Asegurar el índice FTS5 en bases de datos creadas antes de él"""
+    with app.app_context():
+        with db.engine.begin() as conexion:
+            app.extensions['inventario_fts'] = crear_indice_fts(conexion)
+
+def consulta_fts(texto):
+    """Convertir el texto del usuario en una consulta FTS5 por prefijos
+
+    Cada término se cita para que los operadores de FTS5 se traten como
+    texto literal, y todos los términos deben aparecer.
+    """
+    terminos = texto.split()
+    return ' '.join('"{}"*'.format(t.replace('"', '""')) for t in terminos)
+
+def buscar_productos(texto, pagina=1, por_pagina=10):
+    """Buscar productos por nombre, ordenados por relevancia
+
+    Usa FTS5 (bm25) cuando está disponible; en otros motores recurre a
+    una búsqueda por subcadena sin distinguir mayúsculas.
+    Retorna (filas, total) con las filas de consulta_filas.
+    """
+    desplazamiento = (pagina - 1) * por_pagina
+
+    if current_app.extensions.get('inventario_fts'):
+        consulta = consulta_fts(texto)
+        fts = table('productos_fts', column('rowid'), column('rank'))
+        sentencia = (
+            consulta_filas()
+            .join(fts, fts.c.rowid == Producto.id)
+            .where(text('productos_fts MATCH :consulta').bindparams(consulta=consulta))
+            .order_by(fts.c.rank, Producto.id)
+            .limit(por_pagina)
+            .offset(desplazamiento)
+        )
+        productos = db.session.execute(sentencia).all()
+        total = db.session.execute(
+            select(func.count()).select_from(fts)
+            .where(text('productos_fts MATCH :consulta').bindparams(consulta=consulta))
+        ).scalar()
+        return productos, total
+
+    condiciones = [Producto.nombre.icontains(t, autoescape=True) for t in texto.split()]
+    total = db.session.execute(select(func.count(Producto.id)).where(*condiciones)).scalar()
+    productos = db.session.execute(
+        consulta_filas().where(*condiciones)
+        .order_by(Producto.nombre, Producto.id).limit(por_pagina).offset(desplazamiento)
+    ).all()
+    return productos, total
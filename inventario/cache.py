@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+class BackendCache:
+    """Interfaz de almacenamiento para la caché
+
+    Permite sustituir la LRU en proceso por un backend compartido entre
+    procesos (p. ej. Redis) asignando una instancia a CACHE_BACKEND.
+    """
+
+    def obtener(self, clave):
+        raise NotImplementedError
+
+    def guardar(self, clave, valor, ttl=None):
+        raise NotImplementedError
+
+    def eliminar(self, clave):
+        raise NotImplementedError
+
+    def limpiar(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        return 0
+
+class CacheLRU(BackendCache):
+    """LRU acotada en memoria con expiración por entrada"""
+
+    def __init__(self, max_entradas=1024):
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+
+            expira, valor = entrada
+            if expira is not None and expira < time.monotonic():
+                del self._datos[clave]
+                return None
+
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        expira = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._datos[clave] = (expira, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+
+    def eliminar(self, clave):
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+class CacheNula(BackendCache):
+    """Backend que no almacena nada, desactiva la caché"""
+
+    def obtener(self, clave):
+        return None
+
+    def guardar(self, clave, valor, ttl=None):
+        pass
+
+    def eliminar(self, clave):
+        pass
+
+    def limpiar(self):
+        pass
+
+class Cache:
+    """Caché read-through de productos serializados
+
+    Las claves incluyen el valor que cambia con cada escritura y que las
+    rutas ya leen para sus ETag: la fecha de actualización de cada producto
+    y la versión de la tabla para los listados. Una escritura hecha en otro
+    proceso deja de coincidir con las entradas antiguas sin tener que
+    avisar a nadie, y estas salen del backend por LRU o TTL.
+    """
+
+    def __init__(self, backend=None, ttl=30):
+        self.backend = backend if backend is not None else CacheLRU()
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def _contar(self, acierto):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def obtener_o_cargar(self, clave, cargador, vigente=None):
+        """Retornar el valor en caché o calcularlo con `cargador`
+
+        Los resultados None no se guardan, ni aquellos para los que
+        `vigente(valor)` es falso: cargados tras una escritura que la clave
+        no refleja, se guardarían bajo una clave que ya no les corresponde.
+        """
+        valor = self.backend.obtener(clave)
+        if valor is not None:
+            self._contar(True)
+            return valor
+
+        self._contar(False)
+        valor = cargador()
+        if valor is not None and (vigente is None or vigente(valor)):
+            self.backend.guardar(clave, valor, self.ttl)
+        return valor
+
+    def obtener_varios_o_cargar(self, ids, clave, cargador, vigente=None):
+        """Variante de obtener_o_cargar para varios ids
+
+        `clave` construye la clave de cada id y `cargador` recibe solo los
+        ids ausentes de la caché y retorna {id: valor}; `vigente(id, valor)`
+        decide como en obtener_o_cargar si un valor cargado se guarda.
+        Retorna {id: valor} para los ids encontrados.
+        """
+        valores = {}
+        faltantes = []
+        for id_ in ids:
+            valor = self.backend.obtener(clave(id_))
+            if valor is None:
+                faltantes.append(id_)
+            else:
+                valores[id_] = valor
+
+        with self._lock:
+            self.aciertos += len(valores)
+            self.fallos += len(faltantes)
+
+        if faltantes:
+            cargados = cargador(faltantes)
+            for id_, valor in cargados.items():
+                if vigente is None or vigente(id_, valor):
+                    self.backend.guardar(clave(id_), valor, self.ttl)
+            valores.update(cargados)
+        return valores
+
+    def clave_producto(self, producto_id, fecha_actualizacion):
+        marca = fecha_actualizacion.isoformat() if fecha_actualizacion else ''
+        return f'productos:{producto_id}:{marca}'
+
+    def clave_listado(self, version, *partes):
+        return f'productos:listado:{version}:' + ':'.join(map(str, partes))
+
+    def estadisticas(self):
+        consultas = self.aciertos + self.fallos
+        return {
+            'backend': type(self.backend).__name__,
+            'entradas': len(self.backend),
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0
+        }
+
+def init_cache(app):
+    """Inicializar la caché de la aplicación según su configuración"""
+    app.config.setdefault('CACHE_TIPO', 'lru')
+    app.config.setdefault('CACHE_MAX_ENTRADAS', 1024)
+    app.config.setdefault('CACHE_TTL', 30)
+
+    backend = app.config.get('CACHE_BACKEND')
+    if backend is None:
+        if app.config['CACHE_TIPO'] == 'lru':
+            backend = CacheLRU(app.config['CACHE_MAX_ENTRADAS'])
+        else:
+            backend = CacheNula()
+
+    app.extensions['inventario_cache'] = Cache(backend, app.config['CACHE_TTL'])
+
+def obtener_cache():
+    """Caché de la aplicación actual, o None si no fue inicializada"""
+    return current_app.extensions.get('inventario_cache')
@@ -0,0 +1,84 @@
+import threading
+import time
+from flask import current_app
+
+class AvisoCambios:
+    """Despierta a las peticiones que esperan cambios del catálogo
+
+    Las escrituras confirmadas en este proceso notifican a los que esperan;
+    las de otros procesos (workers de gunicorn, CLI) se detectan leyendo
+    la versión de la tabla cada `intervalo` segundos, una lectura de una
+    sola fila por cliente en espera. `max_clientes` acota los clientes
+    del long-poll y del flujo SSE atendidos a la vez, cada uno con un hilo
+    ocupado; None no pone límite.
+    """
+
+    def __init__(self, intervalo=0.5, max_clientes=None):
+        self.intervalo = intervalo
+        self.max_clientes = max_clientes
+        self.esperando = 0
+        self.clientes = 0
+        self._notificaciones = 0
+        self._condicion = threading.Condition()
+
+    def ocupar(self):
+        """Reservar un lugar para un cliente; False si no queda ninguno"""
+        with self._condicion:
+            if self.max_clientes is not None and self.clientes >= self.max_clientes:
+                return False
+            self.clientes += 1
+            return True
+
+    def liberar(self):
+        with self._condicion:
+            self.clientes -= 1
+
+    def notificar(self):
+        with self._condicion:
+            self._notificaciones += 1
+            self._condicion.notify_all()
+
+    def esperar(self, version, timeout):
+        """Esperar hasta que la versión de productos supere `version`
+
+        La sesión se cierra en cada lectura para no retener una conexión
+        del pool ni una transacción de lectura durante la espera.
+        Retorna la última versión leída.
+        """
+        from inventario.database import obtener_version_productos
+        from inventario.models import db
+
+        limite = time.monotonic() + timeout
+        with self._condicion:
+            self.esperando += 1
+        try:
+            while True:
+                # Se toma antes de leer para no perder un aviso intermedio
+                vistas = self._notificaciones
+                actual = obtener_version_productos()[0]
+                db.session.close()
+                restante = limite - time.monotonic()
+                if actual > version or restante <= 0:
+                    return actual
+                with self._condicion:
+                    self._condicion.wait_for(
+                        lambda: self._notificaciones != vistas,
+                        min(self.intervalo, restante)
+                    )
+        finally:
+            with self._condicion:
+                self.esperando -= 1
+
+def init_cambios(app):
+    """Configurar la espera de cambios del feed (long-poll y SSE)"""
+    app.config.setdefault('CAMBIOS_INTERVALO_MS', 500)
+    app.config.setdefault('CAMBIOS_ESPERA_MAX', 30)
+    app.config.setdefault('CAMBIOS_SSE_DURACION', 300)
+    app.config.setdefault('CAMBIOS_MAX_CLIENTES', None)
+    app.extensions['inventario_cambios'] = AvisoCambios(
+        app.config['CAMBIOS_INTERVALO_MS'] / 1000, app.config['CAMBIOS_MAX_CLIENTES']
+    )
+
+def obtener_aviso_cambios():
+    """Aviso de cambios de la aplicación actual, o None si no está configurado"""
+    return current_app.extensions.get('inventario_cambios')
@@ -0,0 +1,189 @@
+"""Línea de comandos de la API de inventario
+
+Uso:
+    inventario serve --workers 4 --max-requests 10000
+    inventario seed --filas 5000000 --reemplazar
+    inventario consolidar-stock --minimo-movimientos 10
+    inventario recalcular-estadisticas
+"""
+import argparse
+import os
+import sys
+from inventario.app import crear_app, preparar_proceso_hijo
+
+# Hilos por worker por defecto: cada cliente del feed en espera ocupa uno
+HILOS_POR_WORKER = 4
+
+# Segundos que una espera del feed de cambios deja libres antes del timeout
+# de un worker sync
+MARGEN_TIMEOUT = 5
+
+def _opciones_servidor(args):
+    """Configuración de gunicorn a partir de los argumentos de serve
+
+    Con más de un hilo se usa el worker gthread, cuyo proceso avisa al
+    maestro que sigue vivo aunque sus hilos atiendan peticiones largas
+    (long-poll y SSE del feed de cambios); un worker sync que tarda más de
+    --timeout en una petición se mata.
+    """
+    return {
+        'bind': f'{args.host}:{args.port}',
+        'workers': args.workers,
+        'worker_class': 'gthread' if args.hilos > 1 else 'sync',
+        'threads': args.hilos,
+        'max_requests': args.max_requests,
+        'max_requests_jitter': args.max_requests_jitter,
+        'timeout': args.timeout,
+        'graceful_timeout': args.timeout,
+        'preload_app': True,
+        'accesslog': '-' if args.log_accesos else None,
+    }
+
+def _crear_app_servidor(args):
+    """Aplicación para serve, con las esperas del feed acotadas al timeout
+
+    Cada worker tiene su propia LRU; --sin-cache la desactiva para no
+    repetir su memoria en cada proceso. Con workers sync (--hilos 1) el
+    long-poll y el flujo SSE terminan MARGEN_TIMEOUT segundos antes de
+    --timeout, para que el maestro no mate al worker en medio de una
+    respuesta.
+    """
+    app = crear_app({'CACHE_TIPO': 'ninguna'} if args.sin_cache else None)
+    if args.hilos <= 1:
+        limite = max(args.timeout - MARGEN_TIMEOUT, 1)
+        for clave in ('CAMBIOS_ESPERA_MAX', 'CAMBIOS_SSE_DURACION'):
+            app.config[clave] = min(app.config[clave], limite)
+    return app
+
+def comando_serve(args):
+    """Servir la API con varios procesos que comparten una app precargada
+
+    El proceso maestro crea la aplicación una sola vez y la hereda a cada
+    worker por fork. Los workers se reciclan tras --max-requests peticiones
+    y SIGHUP los reemplaza sin cortar conexiones, pero los nuevos salen de
+    la misma app precargada: no ven cambios de código ni de configuración.
+    Para eso se envía USR2 al maestro, que lanza un maestro nuevo con el
+    mismo comando, y después TERM al anterior.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("inventario serve requiere gunicorn: poetry install -E servidor", file=sys.stderr)
+        return 1
+
+    app = _crear_app_servidor(args)
+
+    class ServidorInventario(BaseApplication):
+        def __init__(self, opciones):
+            self.opciones = opciones
+            super().__init__()
+
+        def load_config(self):
+            for clave, valor in self.opciones.items():
+                if valor is not None:
+                    self.cfg.set(clave, valor)
+            self.cfg.set('post_fork', lambda servidor, worker: preparar_proceso_hijo(app))
+
+        def load(self):
+            return app
+
+    ServidorInventario(_opciones_servidor(args)).run()
+    return 0
+
+def comando_seed(args):
+    """Cargar un catálogo sintético para pruebas de carga y benchmarks"""
+    from inventario.semilla import sembrar
+
+    config = {'METRICAS': False}
+    if args.base_datos:
+        config['SQLALCHEMY_DATABASE_URI'] = args.base_datos
+    app = crear_app(config)
+
+    tiempos = sembrar(app, args.filas, args.semilla, args.lote, args.reemplazar, args.procesos)
+    print(f"{args.filas} productos cargados en {tiempos['carga']:.1f} s "
+          f"({args.filas / tiempos['carga']:,.0f} filas/s); "
+          f"índices reconstruidos en {tiempos['indices']:.1f} s")
+    return 0
+
+def comando_consolidar_stock(args):
+    """Crear snapshots del stock para acotar la reconstrucción histórica"""
+    from inventario.database import consolidar_stock
+
+    config = {'METRICAS': False}
+    if args.base_datos:
+        config['SQLALCHEMY_DATABASE_URI'] = args.base_datos
+    app = crear_app(config)
+
+    with app.app_context():
+        creados = consolidar_stock(args.minimo_movimientos)
+    print(f"{creados} snapshots de stock creados")
+    return 0
+
+def comando_recalcular_estadisticas(args):
+    """Recalcular el resumen de inventario tras escrituras fuera de la API"""
+    from inventario.database import recalcular_estadisticas
+
+    config = {'METRICAS': False}
+    if args.base_datos:
+        config['SQLALCHEMY_DATABASE_URI'] = args.base_datos
+    app = crear_app(config)
+
+    with app.app_context():
+        estadisticas = recalcular_estadisticas()
+    if estadisticas is None:
+        print("Sin escrituras registradas, no hay resumen que recalcular")
+    else:
+        print(f"{estadisticas['productos']} productos, valor total {estadisticas['valor_total']:.2f}, "
+              f"{estadisticas['sin_stock']} sin stock, {estadisticas['stock_bajo']} con stock bajo")
+    return 0
+
+def crear_parser():
+    parser = argparse.ArgumentParser(prog='inventario', description='API REST de inventario')
+    subcomandos = parser.add_subparsers(dest='comando', required=True)
+
+    serve = subcomandos.add_parser('serve', help='Servir la API con varios procesos')
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=5000)
+    serve.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help='Procesos worker (por defecto, número de CPUs)')
+    serve.add_argument('--hilos', type=int, default=HILOS_POR_WORKER,
+                       help='Hilos por worker; con 1 se usan workers sync (sin esperas largas)')
+    serve.add_argument('--max-requests', type=int, default=10000,
+                       help='Peticiones antes de reciclar un worker (0 = nunca)')
+    serve.add_argument('--max-requests-jitter', type=int, default=1000,
+                       help='Variación aleatoria para no reciclar todos a la vez')
+    serve.add_argument('--timeout', type=int, default=30)
+    serve.add_argument('--sin-cache', action='store_true',
+                       help='Desactivar la caché de lectura, que cada worker mantiene por separado')
+    serve.add_argument('--log-accesos', action='store_true')
+    serve.set_defaults(funcion=comando_serve)
+
+    seed = subcomandos.add_parser('seed', help='Cargar productos sintéticos')
+    seed.add_argument('--filas', type=int, required=True)
+    seed.add_argument('--semilla', type=int, default=0, help='Misma semilla, mismos datos')
+    seed.add_argument('--lote', type=int, default=50000, help='Filas por executemany')
+    seed.add_argument('--reemplazar', action='store_true', help='Eliminar antes los productos existentes')
+    seed.add_argument('--procesos', type=int, default=os.cpu_count() or 1,
+                      help='Procesos que generan los datos (por defecto, número de CPUs)')
+    seed.add_argument('--base-datos', help='URI de la base de datos (por defecto, la de la app)')
+    seed.set_defaults(funcion=comando_seed)
+
+    consolidar = subcomandos.add_parser('consolidar-stock', help='Consolidar movimientos de stock en snapshots')
+    consolidar.add_argument('--minimo-movimientos', type=int, default=1,
+                            help='Movimientos sin consolidar necesarios para crear un snapshot')
+    consolidar.add_argument('--base-datos', help='URI de la base de datos (por defecto, la de la app)')
+    consolidar.set_defaults(funcion=comando_consolidar_stock)
+
+    recalcular = subcomandos.add_parser('recalcular-estadisticas',
+                                        help='Recalcular el resumen de inventario desde la tabla')
+    recalcular.add_argument('--base-datos', help='URI de la base de datos (por defecto, la de la app)')
+    recalcular.set_defaults(funcion=comando_recalcular_estadisticas)
+
+    return parser
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    return args.funcion(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
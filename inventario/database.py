@@ -1,58 +1,1297 @@
-from inventario.models import db, Producto
+import base64
+import heapq
+import json
+from itertools import islice
+from datetime import datetime
+from types import SimpleNamespace
+from flask import current_app
+from sqlalchemy import BigInteger, case, cast, event, func, insert, select, tuple_, update
+from sqlalchemy.engine import make_url
+from inventario.models import db, Producto, EstadoTabla, MovimientoStock, SnapshotStock, ProductoEliminado
+from inventario.alertas import obtener_procesador_alertas
+from inventario.cache import obtener_cache
+from inventario.cambios import obtener_aviso_cambios
+from inventario.escritura import obtener_escritor
+from inventario.migraciones import migrar_esquema
+from inventario.serializacion import filas_a_dicts
+
+# Columnas de ordenamiento soportadas por la paginación con cursor (keyset).
+# El id siempre va al final para desempatar y garantizar un orden total.
+ORDENES_CURSOR = {
+    'id': (Producto.id,),
+    'fecha_creacion': (Producto.fecha_creacion, Producto.id),
+}
+
+# Ordenamientos del listado paginado; el prefijo "-" indica descendente.
+# Cada columna ordenable tiene un índice declarado en el modelo.
+ORDENES_LISTADO = {
+    'id': (Producto.id,),
+    '-id': (Producto.id.desc(),),
+    'nombre': (Producto.nombre, Producto.id),
+    '-nombre': (Producto.nombre.desc(), Producto.id.desc()),
+    'precio': (Producto.precio, Producto.id),
+    '-precio': (Producto.precio.desc(), Producto.id.desc()),
+    'stock': (Producto.stock, Producto.id),
+    '-stock': (Producto.stock.desc(), Producto.id.desc()),
+    'fecha_creacion': (Producto.fecha_creacion, Producto.id),
+    '-fecha_creacion': (Producto.fecha_creacion.desc(), Producto.id.desc()),
+}
+
+# Filtros aceptados por el listado y su tipo
+FILTROS_LISTADO = {
+    'stock_max': int,
+    'precio_min': float,
+    'precio_max': float,
+    'nombre': str,
+}
+
+# Columnas de un producto en las respuestas y la exportación, en orden
+COLUMNAS_PRODUCTO = (
+    'id', 'nombre', 'precio', 'stock', 'umbral_reorden', 'fecha_creacion', 'fecha_actualizacion'
+)
+
+# Filas por sentencia executemany en las inserciones masivas
+TAMANO_LOTE = 1000
+
+# Ids por cláusula IN, por debajo del límite de parámetros de SQLite
+TAMANO_IN = 500
+
+# Rango de INTEGER en SQLite (64 bits con signo)
+ENTERO_MIN, ENTERO_MAX = -2**63, 2**63 - 1
+
+# Modos de cálculo del total de un listado
+MODOS_TOTAL = ('exacto', 'aproximado', 'omitir')
+
+# Máximo de cambios por respuesta del feed
+MAX_CAMBIOS = 1000
+
+# Contadores del resumen de inventario en estado_tablas
+COLUMNAS_RESUMEN = ('valor_total_centavos', 'stock_total', 'sin_stock', 'stock_bajo')
+
+# Pragmas aplicados a cada conexión SQLite según SQLITE_PERFIL.
+# WAL permite lecturas concurrentes con un escritor y synchronous=NORMAL
+# evita un fsync por commit manteniendo la durabilidad ante caídas del
+# proceso; busy_timeout espera al escritor en lugar de fallar con
+# "database is locked".
+PERFILES_SQLITE = {
+    'produccion': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+    },
+    'ninguno': {},
+}
+
+# Pool de conexiones para bases de datos en archivo o servidor
+OPCIONES_POOL = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'pool_recycle': 3600,
+}
+
+def _es_memoria(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def _configurar_motor(app):
+    """Completar SQLALCHEMY_ENGINE_OPTIONS con el tamaño del pool"""
+    opciones = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    # Las bases en memoria usan StaticPool, que no admite estas opciones
+    if not _es_memoria(app.config['SQLALCHEMY_DATABASE_URI']):
+        for clave, valor in OPCIONES_POOL.items():
+            opciones.setdefault(clave, valor)
+
+def pragmas_sqlite(app):
+    """Pragmas del perfil configurado, con SQLITE_PRAGMAS como ajuste fino"""
+    perfil = app.config.get('SQLITE_PERFIL', 'produccion')
+    if perfil not in PERFILES_SQLITE:
+        raise ValueError(f"Perfil SQLite desconocido: {perfil}")
+    pragmas = dict(PERFILES_SQLITE[perfil])
+    pragmas.update(app.config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+def _registrar_pragmas(motor, pragmas):
+    """Aplicar los pragmas en cada nueva conexión del motor"""
+    @event.listens_for(motor, 'connect')
+    def aplicar_pragmas(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        for nombre, valor in pragmas.items():
+            cursor.execute(f'PRAGMA {nombre}={valor}')
+        cursor.close()
 
 def init_db(app):
-    """Inicializar base de datos"""
+    """Inicializar base de datos
+
+    Crea las tablas que faltan y completa las existentes con las columnas
+    e índices agregados después de crearlas (ver migrar_esquema).
+    """
+    app.config.setdefault('UMBRAL_STOCK_BAJO', 5)
+    _configurar_motor(app)
     db.init_app(app)
     with app.app_context():
+        # También las réplicas de SQLALCHEMY_BINDS
+        for motor in db.engines.values():
+            if motor.dialect.name == 'sqlite':
+                _registrar_pragmas(motor, pragmas_sqlite(app))
         db.create_all()
+        with db.engine.begin() as conexion:
+            migrar_esquema(conexion)
+
+def _aplicar_filtros(consulta, filtros):
+    """Aplicar los filtros del listado a una consulta de productos
 
-def obtener_productos(pagina=1, por_pagina=10):
-    """Obtener productos con paginación"""
-    return Producto.query.paginate(
+    El filtro por nombre es un prefijo expresado como rango, de modo que
+    puede resolverse con el índice de nombre en lugar de un LIKE.
+    """
+    filtros = filtros or {}
+    if filtros.get('stock_max') is not None:
+        consulta = consulta.filter(Producto.stock <= filtros['stock_max'])
+    if filtros.get('precio_min') is not None:
+        consulta = consulta.filter(Producto.precio >= filtros['precio_min'])
+    if filtros.get('precio_max') is not None:
+        consulta = consulta.filter(Producto.precio <= filtros['precio_max'])
+    if filtros.get('nombre'):
+        prefijo = filtros['nombre']
+        consulta = consulta.filter(
+            Producto.nombre >= prefijo,
+            Producto.nombre < prefijo + '\U0010ffff'
+        )
+    return consulta
+
+def consulta_productos(filtros=None, orden='id'):
+    """Construir la consulta filtrada y ordenada del listado"""
+    if orden not in ORDENES_LISTADO:
+        raise ValueError("Orden no soportado, use: " + ", ".join(ORDENES_LISTADO))
+    return _aplicar_filtros(Producto.query, filtros).order_by(*ORDENES_LISTADO[orden])
+
+def obtener_productos(pagina=1, por_pagina=10, filtros=None, orden='id'):
+    """Obtener productos con paginación, filtros y orden"""
+    return consulta_productos(filtros, orden).paginate(
         page=pagina,
         per_page=por_pagina,
         error_out=False
     )
 
+def _columnas_producto():
+    return [getattr(Producto, c) for c in COLUMNAS_PRODUCTO]
+
+def consulta_filas(filtros=None):
+    """Sentencia de lectura sobre las columnas de COLUMNAS_PRODUCTO
+
+    Las filas resultantes son tuplas con nombre: no pasan por el identity
+    map ni crean objetos instrumentados. Es el camino de todas las lecturas
+    de la API; el modelo ORM queda para las escrituras.
+    """
+    return _aplicar_filtros(select(*_columnas_producto()), filtros)
+
+def contar_productos(filtros=None, modo='exacto'):
+    """Total de productos del listado según `modo`
+
+    'exacto' ejecuta COUNT(*); 'aproximado' lee el contador de
+    estado_tablas, que se mantiene en cada escritura de la API, y recurre
+    al conteo exacto si hay filtros; 'omitir' retorna None.
+    """
+    if modo not in MODOS_TOTAL:
+        raise ValueError("Modo de total no soportado, use: " + ", ".join(MODOS_TOTAL))
+    if modo == 'omitir':
+        return None
+    
+    if modo == 'aproximado' and not filtros:
+        filas = db.session.execute(
+            select(EstadoTabla.filas).where(EstadoTabla.tabla == 'productos')
+        ).scalar()
+        if filas is not None:
+            return filas
+        return _inicializar_contador()
+    
+    return db.session.execute(_aplicar_filtros(select(func.count(Producto.id)), filtros)).scalar()
+
+def _inicializar_contador():
+    """Fijar el contador de filas con un COUNT(*) y retornarlo
+
+    Se hace en una sola sentencia para no perder escrituras concurrentes.
+    Sin fila de estado (ninguna escritura todavía) solo se cuenta.
+    """
+    conteo = select(func.count(Producto.id)).scalar_subquery()
+    db.session.execute(
+        update(EstadoTabla)
+        .where(EstadoTabla.tabla == 'productos', EstadoTabla.filas.is_(None))
+        .values(filas=conteo)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    filas = db.session.execute(
+        select(EstadoTabla.filas).where(EstadoTabla.tabla == 'productos')
+    ).scalar()
+    if filas is None:
+        filas = db.session.execute(select(func.count(Producto.id))).scalar()
+    return filas
+
+def recontar_productos():
+    """Descartar el contador de filas para que se recalcule
+
+    Necesario tras escrituras que no pasan por la API (SQL directo, cargas
+    masivas).
+    """
+    db.session.execute(
+        update(EstadoTabla)
+        .where(EstadoTabla.tabla == 'productos')
+        .values(filas=None)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return contar_productos(modo='aproximado')
+
+def _centavos(precio):
+    """Precio en centavos enteros, redondeado como _centavos_sql"""
+    return int(precio * 100 + 0.5)
+
+def _centavos_sql(precio):
+    # CAST trunca, lo que para precios no negativos equivale a int() en Python
+    return cast(precio * 100 + 0.5, BigInteger)
+
+def _agregados_inventario(umbral):
+    """SELECT con el número de filas y el resumen de inventario completos"""
+    return select(
+        func.count(Producto.id).label('filas'),
+        func.coalesce(
+            func.sum(_centavos_sql(Producto.precio) * Producto.stock), 0
+        ).label('valor_total_centavos'),
+        func.coalesce(func.sum(Producto.stock), 0).label('stock_total'),
+        func.coalesce(func.sum(case((Producto.stock == 0, 1), else_=0)), 0).label('sin_stock'),
+        func.coalesce(func.sum(case((Producto.stock <= umbral, 1), else_=0)), 0).label('stock_bajo')
+    )
+
+def recalcular_estadisticas(solo_si_falta=False):
+    """Recalcular el resumen de inventario y el contador de filas
+
+    Primero se actualiza la fila de estado, lo que toma el bloqueo de
+    escritura (la fila en motores con bloqueo por fila), y los agregados
+    se calculan en la misma transacción: una escritura concurrente no
+    puede confirmar su delta entre el recorrido y el guardado. Con
+    `solo_si_falta` solo se recalcula si el resumen no está inicializado
+    o se calculó con otro umbral de stock bajo. Necesario tras escrituras
+    que no pasan por la API.
+    Retorna el resumen, como obtener_estadisticas.
+    """
+    umbral = current_app.config['UMBRAL_STOCK_BAJO']
+    condicion = [EstadoTabla.tabla == 'productos']
+    if solo_si_falta:
+        condicion.append(
+            EstadoTabla.valor_total_centavos.is_(None)
+            | EstadoTabla.umbral_stock_bajo.is_(None)
+            | (EstadoTabla.umbral_stock_bajo != umbral)
+        )
+    
+    try:
+        reclamada = db.session.execute(
+            update(EstadoTabla)
+            .where(*condicion)
+            .values(umbral_stock_bajo=umbral)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if reclamada:
+            agregados = db.session.execute(_agregados_inventario(umbral)).one()
+            db.session.execute(
+                update(EstadoTabla)
+                .where(EstadoTabla.tabla == 'productos')
+                .values(**agregados._asdict())
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return _leer_estadisticas(umbral)
+
+def _estadisticas_de(fila, umbral):
+    return {
+        'productos': fila.filas,
+        'valor_total': fila.valor_total_centavos / 100,
+        'stock_total': fila.stock_total,
+        'sin_stock': fila.sin_stock,
+        'stock_bajo': fila.stock_bajo,
+        'umbral_stock_bajo': umbral
+    }
+
+def _leer_estadisticas(umbral):
+    fila = db.session.execute(
+        select(EstadoTabla.filas, EstadoTabla.umbral_stock_bajo,
+               *(getattr(EstadoTabla, columna) for columna in COLUMNAS_RESUMEN))
+        .where(EstadoTabla.tabla == 'productos')
+    ).first()
+    if (fila is None or fila.filas is None or fila.valor_total_centavos is None
+            or fila.umbral_stock_bajo != umbral):
+        return None
+    return _estadisticas_de(fila, umbral)
+
+def obtener_estadisticas():
+    """Resumen del inventario leído de estado_tablas
+
+    El valor total (precio * stock, acumulado en centavos enteros), el
+    stock total y los conteos sin stock y de stock bajo se mantienen en
+    cada escritura, por lo que la
+    lectura es una sola fila. Si el resumen no está inicializado se
+    calcula una vez; sin ninguna escritura todavía se calcula sin guardar.
+    """
+    umbral = current_app.config['UMBRAL_STOCK_BAJO']
+    estadisticas = _leer_estadisticas(umbral)
+    if estadisticas is None:
+        estadisticas = recalcular_estadisticas(solo_si_falta=True)
+    if estadisticas is None:
+        fila = db.session.execute(_agregados_inventario(umbral)).one()
+        estadisticas = _estadisticas_de(fila, umbral)
+    return estadisticas
+
+def obtener_pagina_filas(pagina=1, por_pagina=10, filtros=None, orden='id', modo_total='exacto'):
+    """Obtener una página del listado como tuplas de columnas
+
+    Equivalente a obtener_productos pero sin construir objetos ORM.
+    Retorna (filas, total), con total None si `modo_total` es 'omitir'.
+    """
+    if orden not in ORDENES_LISTADO:
+        raise ValueError("Orden no soportado, use: " + ", ".join(ORDENES_LISTADO))
+    
+    sentencia = consulta_filas(filtros)
+    total = contar_productos(filtros, modo_total)
+    filas = db.session.execute(
+        sentencia.order_by(*ORDENES_LISTADO[orden])
+        .limit(por_pagina)
+        .offset((pagina - 1) * por_pagina)
+    ).all()
+    return filas, total
+
+def iterar_productos_exportacion(filtros=None, tamano_bloque=TAMANO_LOTE):
+    """Iterar el catálogo completo en bloques de tuplas de columnas
+
+    Usa yield_per para leer del cursor por bloques sin materializar la
+    tabla ni crear objetos ORM, así la memoria no crece con el catálogo.
+    """
+    sentencia = consulta_filas(filtros).order_by(Producto.id)
+    resultado = db.session.execute(sentencia.execution_options(yield_per=tamano_bloque))
+    yield from resultado.partitions()
+
+def _registrar_cambio(tabla='productos', delta_filas=0, delta_resumen=None):
+    """Incrementar la versión de la tabla dentro de la transacción actual
+
+    El contador de filas se ajusta en `delta_filas` y el resumen de
+    inventario con `delta_resumen`; los que aún no fueron inicializados
+    siguen en NULL.
+    """
+    ahora = datetime.utcnow()
+    valores = {'version': EstadoTabla.version + 1, 'actualizado_en': ahora}
+    if delta_filas:
+        valores['filas'] = EstadoTabla.filas + delta_filas
+    for columna, delta in (delta_resumen or {}).items():
+        if delta:
+            valores[columna] = getattr(EstadoTabla, columna) + delta
+    resultado = db.session.execute(
+        update(EstadoTabla)
+        .where(EstadoTabla.tabla == tabla)
+        .values(**valores)
+        .execution_options(synchronize_session=False)
+    )
+    if not resultado.rowcount:
+        db.session.add(EstadoTabla(tabla=tabla, version=1, actualizado_en=ahora))
+
+def _bloquear_escritura(tabla='productos'):
+    """Tomar el bloqueo de escritura antes de leer el estado a modificar
+
+    pysqlite no abre la transacción hasta la primera escritura, así que un
+    SELECT previo a ella puede ver un stock que otra escritura cambia
+    antes de la nuestra. Este UPDATE sin efecto abre la transacción de
+    escritura (en SQLite bloquea la base; en otros motores, la fila de
+    estado que toda escritura actualiza), de modo que las lecturas
+    siguientes ven el estado previo real de lo que se va a modificar.
+    """
+    db.session.execute(
+        update(EstadoTabla)
+        .where(EstadoTabla.tabla == tabla)
+        .values(version=EstadoTabla.version)
+        .execution_options(synchronize_session=False)
+    )
+
+def _obtener_para_escribir(producto_id):
+    """Producto releído bajo el bloqueo de escritura
+
+    populate_existing descarta el estado del identity map, que los UPDATE
+    de Core (ajustes atómicos y en lote) dejan desactualizado.
+    """
+    _bloquear_escritura()
+    return db.session.get(Producto, producto_id, populate_existing=True)
+
+def _secuencia_nueva(tabla='productos'):
+    """Expresión SQL con la versión que producirá la escritura en curso
+
+    Las filas escritas antes de _marcar_modificados reciben la versión a
+    la que este la llevará, así el feed de cambios usa la versión de la
+    tabla como secuencia sin una lectura adicional.
+    """
+    version = select(EstadoTabla.version + 1).where(EstadoTabla.tabla == tabla).scalar_subquery()
+    return func.coalesce(version, 1)
+
+def _leer_secuencia_nueva(tabla='productos'):
+    """Valor de _secuencia_nueva leído una sola vez
+
+    Para las inserciones masivas, donde la subconsulta se repetiría en
+    cada fila del INSERT de varias filas. Toma antes el bloqueo de
+    escritura, así ninguna otra escritura cambia la versión hasta el commit.
+    """
+    _bloquear_escritura(tabla)
+    return db.session.execute(select(_secuencia_nueva(tabla))).scalar()
+
+def obtener_version_productos():
+    """Retornar (version, actualizado_en) de la tabla de productos"""
+    fila = db.session.execute(
+        select(EstadoTabla.version, EstadoTabla.actualizado_en)
+        .where(EstadoTabla.tabla == 'productos')
+    ).first()
+    if fila is None:
+        return 0, None
+    return fila.version, fila.actualizado_en
+
+def obtener_fecha_actualizacion(producto_id):
+    """Retornar (existe, fecha_actualizacion) sin cargar el producto completo"""
+    fila = db.session.execute(
+        select(Producto.fecha_actualizacion).where(Producto.id == producto_id)
+    ).first()
+    if fila is None:
+        return False, None
+    return True, fila.fecha_actualizacion
+
+def _delta_resumen(cambios_stock):
+    """Deltas del resumen de inventario para tuplas (id, precio, umbral, anterior, nuevo)
+
+    Un stock anterior None indica un alta y un stock nuevo None una baja.
+    El resumen cuenta el stock bajo con el umbral global, no con el umbral
+    de reorden de cada producto.
+    """
+    umbral = current_app.config['UMBRAL_STOCK_BAJO']
+    delta = dict.fromkeys(COLUMNAS_RESUMEN, 0)
+    for _, precio, _, anterior, nuevo in cambios_stock:
+        for stock, signo in ((anterior, -1), (nuevo, 1)):
+            if stock is None:
+                continue
+            delta['valor_total_centavos'] += signo * _centavos(precio) * stock
+            delta['stock_total'] += signo * stock
+            delta['sin_stock'] += signo * (stock == 0)
+            delta['stock_bajo'] += signo * (stock <= umbral)
+    return delta
+
+def _evento_stock_bajo(producto_id, stock_anterior, stock, umbral):
+    return {
+        'tipo': 'stock_bajo',
+        'producto_id': producto_id,
+        'stock': stock,
+        'stock_anterior': stock_anterior,
+        'umbral': umbral,
+        'fecha': datetime.utcnow().isoformat()
+    }
+
+def _alertas_stock(cambios_stock):
+    """Eventos de los productos que cruzan su umbral de reorden hacia abajo
+
+    Solo alerta el cruce (de sobre el umbral a igual o por debajo de él, o
+    un alta ya por debajo), no cada escritura sobre un producto que sigue
+    bajo, para que el consumidor reciba un aviso por reposición pendiente.
+    """
+    umbral_global = current_app.config['UMBRAL_STOCK_BAJO']
+    eventos = []
+    for producto_id, _, umbral, anterior, nuevo in cambios_stock:
+        if umbral is None:
+            umbral = umbral_global
+        if nuevo is not None and nuevo <= umbral and (anterior is None or anterior > umbral):
+            eventos.append(_evento_stock_bajo(producto_id, anterior, nuevo, umbral))
+    return eventos
+
+def _encolar_alertas(eventos):
+    """Anotar alertas para publicarlas cuando la transacción se confirme"""
+    if eventos:
+        db.session.info.setdefault('alertas_stock', []).extend(eventos)
+
+def _marcar_modificados(producto_ids=(), delta_filas=0, cambios_stock=()):
+    """Registrar una escritura pendiente de confirmar
+
+    Incrementa la versión de la tabla, ajusta su contador de filas y su
+    resumen de inventario según `cambios_stock` (ver _delta_resumen) y
+    anota los productos cuya caché debe invalidarse y las alertas de stock
+    bajo que se publican cuando la transacción se confirme.
+    """
+    _registrar_cambio(delta_filas=delta_filas, delta_resumen=_delta_resumen(cambios_stock))
+    db.session.info.setdefault('productos_modificados', set()).update(producto_ids)
+    if obtener_procesador_alertas() is not None:
+        _encolar_alertas(_alertas_stock(cambios_stock))
+
+def _confirmar():
+    """Confirmar la transacción y avisar de los cambios hechos en ella
+
+    Las alertas se publican solo tras el commit, para no avisar de un
+    stock que un rollback deja sin efecto.
+    """
+    modificados = db.session.info.pop('productos_modificados', None)
+    alertas = db.session.info.pop('alertas_stock', None)
+    db.session.commit()
+    if modificados is not None:
+        aviso = obtener_aviso_cambios()
+        if aviso is not None:
+            aviso.notificar()
+    if alertas:
+        obtener_procesador_alertas().publicar(alertas)
+
+def _descartar():
+    """Revertir la transacción junto con sus avisos y alertas pendientes"""
+    db.session.info.pop('productos_modificados', None)
+    db.session.info.pop('alertas_stock', None)
+    db.session.rollback()
+
+def _escribir(operacion, *args):
+    """Ejecutar una operación de escritura y confirmarla
+
+    Con el modo de escritura agrupada activo, la operación se delega al
+    escritor único, que la confirma junto con otras en un solo commit.
+    """
+    escritor = obtener_escritor()
+    if escritor is not None:
+        return escritor.enviar(operacion, *args)
+    
+    try:
+        resultado = operacion(*args)
+        _confirmar()
+    except Exception:
+        _descartar()
+        raise
+    return resultado
+
+def obtener_productos_serializados(pagina=1, por_pagina=10, filtros=None, orden='id',
+                                   modo_total='exacto', version=None):
+    """Obtener una página de productos ya serializada, a través de la caché
+
+    Los diccionarios se construyen desde las tuplas de columnas, sin pasar
+    por objetos ORM ni to_dict. Con `modo_total` 'omitir' la respuesta no
+    incluye total ni total_paginas. `version` es la versión de la tabla ya
+    leída por quien llama (se consulta si se omite); la página se guarda
+    bajo ella solo si sigue vigente tras cargarla.
+    """
+    def cargar():
+        filas, total = obtener_pagina_filas(pagina, por_pagina, filtros, orden, modo_total)
+        resultado = {
+            'productos': filas_a_dicts(COLUMNAS_PRODUCTO, filas),
+            'pagina': pagina,
+            'por_pagina': por_pagina
+        }
+        if total is not None:
+            resultado['total'] = total
+            resultado['total_paginas'] = -(-total // por_pagina)
+        return resultado
+    
+    cache = obtener_cache()
+    if cache is None:
+        return cargar()
+    if version is None:
+        version = obtener_version_productos()[0]
+    clave = cache.clave_listado(version, pagina, por_pagina, orden, modo_total,
+                                sorted((filtros or {}).items()))
+    return cache.obtener_o_cargar(
+        clave, cargar, lambda _: obtener_version_productos()[0] == version
+    )
+
+def codificar_cursor(orden, valores):
+    """Codificar la posición de la última fila en un cursor opaco"""
+    datos = json.dumps({'o': orden, 'v': valores}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+def decodificar_cursor(cursor):
+    """Decodificar un cursor, lanza ValueError si no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        orden, valores = datos['o'], datos['v']
+        columnas = ORDENES_CURSOR[orden]
+        if not isinstance(valores, list) or len(valores) != len(columnas):
+            raise ValueError(cursor)
+        # El último valor es siempre el id; el resto se liga tal cual a la consulta
+        producto_id = valores[-1]
+        if (not isinstance(producto_id, int) or isinstance(producto_id, bool)
+                or not ENTERO_MIN <= producto_id <= ENTERO_MAX):
+            raise ValueError(cursor)
+        if orden == 'fecha_creacion':
+            if not isinstance(valores[0], str):
+                raise ValueError(cursor)
+            valores[0] = datetime.fromisoformat(valores[0])
+        return orden, valores
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Cursor inválido") from e
+
+def _valores_cursor(fila, orden):
+    """Valores de las columnas de orden de una fila, serializables"""
+    if orden == 'fecha_creacion':
+        return [fila.fecha_creacion.isoformat(), fila.id]
+    return [fila.id]
+
+def obtener_productos_cursor(cursor=None, por_pagina=10, orden='id', modo_total='omitir',
+                             filtros=None):
+    """Obtener productos con paginación por cursor (keyset)
+
+    Busca a partir de la última fila entregada en lugar de usar OFFSET; el
+    total se calcula según `modo_total` (ver contar_productos). Los items
+    son filas de consulta_filas. Si se recibe un cursor, el orden
+    codificado en él tiene prioridad sobre `orden`; los filtros deben
+    repetirse en cada página.
+    Retorna (resultado, error).
+    """
+    valores = None
+    if cursor:
+        try:
+            orden, valores = decodificar_cursor(cursor)
+        except ValueError as e:
+            return None, str(e)
+
+    if orden not in ORDENES_CURSOR:
+        return None, "Orden no soportado, use: " + ", ".join(ORDENES_CURSOR)
+
+    columnas = ORDENES_CURSOR[orden]
+    sentencia = consulta_filas(filtros)
+    if valores is not None:
+        if len(columnas) == 1:
+            sentencia = sentencia.where(columnas[0] > valores[0])
+        else:
+            sentencia = sentencia.where(tuple_(*columnas) > tuple_(*valores))
+
+    # Se pide una fila extra para saber si existe una página siguiente
+    items = db.session.execute(sentencia.order_by(*columnas).limit(por_pagina + 1)).all()
+    siguiente_cursor = None
+    if len(items) > por_pagina:
+        items = items[:por_pagina]
+        siguiente_cursor = codificar_cursor(orden, _valores_cursor(items[-1], orden))
+
+    return {
+        'items': items,
+        'orden': orden,
+        'siguiente_cursor': siguiente_cursor,
+        'total': contar_productos(filtros, modo_total)
+    }, None
+
 def crear_producto(datos):
     """Crear nuevo producto"""
+    return _escribir(_crear_producto, datos)
+
+def _crear_producto(datos):
     producto = Producto(
         nombre=datos.get('nombre'),
         precio=datos.get('precio'),
-        stock=datos.get('stock', 0)
+        stock=datos.get('stock', 0),
+        umbral_reorden=datos.get('umbral_reorden')
     )
     
     errores = producto.validar()
     if errores:
         return None, errores
     
+    producto.secuencia = _secuencia_nueva()
     db.session.add(producto)
-    db.session.commit()
+    db.session.flush()
+    _registrar_movimientos([(producto.id, producto.stock)], 'alta')
+    _marcar_modificados(delta_filas=1, cambios_stock=[
+        (producto.id, producto.precio, producto.umbral_reorden, None, producto.stock)
+    ])
     return producto, None
 
+def _validar_datos_producto(datos):
+    """Validar un elemento de un lote con Producto.validar
+
+    Se valida un objeto simple con los mismos atributos: construir un
+    Producto instrumentado por cada elemento dominaba el costo del lote.
+    Retorna (fila, errores) donde fila es el diccionario listo para insertar.
+    """
+    if not isinstance(datos, dict):
+        return None, ["El producto debe ser un objeto JSON"]
+    
+    fila = {
+        'nombre': datos.get('nombre'),
+        'precio': datos.get('precio'),
+        'stock': datos.get('stock', 0),
+        'umbral_reorden': datos.get('umbral_reorden')
+    }
+    try:
+        errores = Producto.validar(SimpleNamespace(**fila))
+    except (TypeError, AttributeError):
+        errores = ["Tipos de datos inválidos"]
+    
+    if errores:
+        return None, errores
+    return fila, None
+
+def _insertar_bloque(filas, secuencia):
+    """Insertar un bloque de filas validadas con un solo executemany
+
+    Todas las filas reciben `secuencia` (ver _leer_secuencia_nueva). Los
+    movimientos de alta se registran con los ids generados, obtenidos
+    con RETURNING o, sin él, leyendo las filas posteriores al máximo id
+    previo dentro de la misma transacción.
+    Retorna los cambios de stock del bloque (ver _delta_resumen).
+    """
+    ahora = datetime.utcnow()
+    for fila in filas:
+        fila['fecha_creacion'] = ahora
+        fila['fecha_actualizacion'] = ahora
+    
+    columnas = (Producto.id, Producto.stock, Producto.precio, Producto.umbral_reorden)
+    sentencia = insert(Producto.__table__).values(secuencia=secuencia)
+    if db.engine.dialect.insert_executemany_returning:
+        creados = db.session.execute(sentencia.returning(*columnas), filas).all()
+    else:
+        ultimo_id = db.session.execute(select(func.coalesce(func.max(Producto.id), 0))).scalar()
+        db.session.execute(sentencia, filas)
+        creados = db.session.execute(select(*columnas).where(Producto.id > ultimo_id)).all()
+    _registrar_movimientos([(f.id, f.stock) for f in creados], 'alta')
+    return [(f.id, f.precio, f.umbral_reorden, None, f.stock) for f in creados]
+
+def crear_productos_lote(lista_datos, tamano_lote=TAMANO_LOTE):
+    """Crear productos en lote dentro de una sola transacción
+
+    `lista_datos` puede ser cualquier iterable (p. ej. un generador NDJSON).
+    Los elementos válidos se insertan en bloques de `tamano_lote` filas y
+    los inválidos se reportan sin detener el lote.
+    Retorna (creados, errores) con errores = [{'indice', 'detalles'}].
+    """
+    errores = []
+    bloque = []
+    cambios_stock = []
+    # Se lee con el primer bloque, para no bloquear la base mientras se valida
+    secuencia = None
+    
+    try:
+        for indice, datos in enumerate(lista_datos):
+            fila, detalles = _validar_datos_producto(datos)
+            if detalles:
+                errores.append({'indice': indice, 'detalles': detalles})
+                continue
+            
+            bloque.append(fila)
+            if len(bloque) >= tamano_lote:
+                secuencia = secuencia or _leer_secuencia_nueva()
+                cambios_stock += _insertar_bloque(bloque, secuencia)
+                bloque = []
+        
+        if bloque:
+            secuencia = secuencia or _leer_secuencia_nueva()
+            cambios_stock += _insertar_bloque(bloque, secuencia)
+        creados = len(cambios_stock)
+        if creados:
+            _marcar_modificados(delta_filas=creados, cambios_stock=cambios_stock)
+        _confirmar()
+    except Exception:
+        _descartar()
+        raise
+    
+    return creados, errores
+
 def obtener_producto_por_id(producto_id):
     """Obtener producto por ID"""
-    return Producto.query.get(producto_id)
+    return db.session.get(Producto, producto_id)
+
+def obtener_productos_por_ids(producto_ids):
+    """Obtener varios productos por ID con una consulta IN por bloque
+
+    Retorna {id: fila} solo con los ids existentes.
+    """
+    productos = {}
+    producto_ids = list(producto_ids)
+    for inicio in range(0, len(producto_ids), TAMANO_IN):
+        bloque = producto_ids[inicio:inicio + TAMANO_IN]
+        for fila in db.session.execute(consulta_filas().where(Producto.id.in_(bloque))):
+            productos[fila.id] = fila
+    return productos
+
+def obtener_producto_serializado(producto_id, fecha_actualizacion=None):
+    """Obtener un producto como diccionario, a través de la caché
+
+    `fecha_actualizacion` es la ya leída por quien llama para su ETag (se
+    consulta si se omite); el producto se guarda bajo ella solo si la
+    fila cargada la conserva.
+    """
+    def cargar():
+        fila = db.session.execute(consulta_filas().where(Producto.id == producto_id)).first()
+        return dict(zip(COLUMNAS_PRODUCTO, fila)) if fila else None
+    
+    cache = obtener_cache()
+    if cache is None:
+        return cargar()
+    if fecha_actualizacion is None:
+        existe, fecha_actualizacion = obtener_fecha_actualizacion(producto_id)
+        if not existe:
+            return None
+    return cache.obtener_o_cargar(
+        cache.clave_producto(producto_id, fecha_actualizacion), cargar,
+        lambda producto: producto['fecha_actualizacion'] == fecha_actualizacion
+    )
+
+def obtener_productos_serializados_por_ids(producto_ids):
+    """Obtener varios productos como diccionarios, a través de la caché
+
+    Las fechas de actualización, que forman la clave de cada producto, se
+    leen con una consulta IN sobre la clave primaria; solo los productos
+    ausentes de la caché se cargan completos. Retorna (productos,
+    no_encontrados) respetando el orden pedido.
+    """
+    def cargar(faltantes):
+        productos = obtener_productos_por_ids(faltantes)
+        return {producto_id: dict(zip(COLUMNAS_PRODUCTO, fila)) for producto_id, fila in productos.items()}
+    
+    producto_ids = list(dict.fromkeys(producto_ids))
+    cache = obtener_cache()
+    if cache is None:
+        encontrados = cargar(producto_ids)
+    else:
+        fechas = {}
+        for inicio in range(0, len(producto_ids), TAMANO_IN):
+            bloque = producto_ids[inicio:inicio + TAMANO_IN]
+            fechas.update(db.session.execute(
+                select(Producto.id, Producto.fecha_actualizacion).where(Producto.id.in_(bloque))
+            ).all())
+        encontrados = cache.obtener_varios_o_cargar(
+            [i for i in producto_ids if i in fechas],
+            lambda producto_id: cache.clave_producto(producto_id, fechas[producto_id]),
+            cargar,
+            lambda producto_id, producto: producto['fecha_actualizacion'] == fechas[producto_id]
+        )
+    
+    productos = [encontrados[i] for i in producto_ids if i in encontrados]
+    no_encontrados = [i for i in producto_ids if i not in encontrados]
+    return productos, no_encontrados
 
 def actualizar_stock(producto_id, nuevo_stock):
     """Actualizar stock de producto"""
-    producto = Producto.query.get(producto_id)
+    return _escribir(_actualizar_stock, producto_id, nuevo_stock)
+
+def _actualizar_stock(producto_id, nuevo_stock):
+    producto = _obtener_para_escribir(producto_id)
     if not producto:
         return None, "Producto no encontrado"
     
     if nuevo_stock < 0:
         return None, "El stock no puede ser negativo"
     
+    anterior = producto.stock
+    _registrar_movimientos([(producto_id, nuevo_stock - anterior)], 'asignacion')
     producto.stock = nuevo_stock
-    db.session.commit()
+    producto.secuencia = _secuencia_nueva()
+    _marcar_modificados([producto_id], cambios_stock=[
+        (producto_id, producto.precio, producto.umbral_reorden, anterior, nuevo_stock)
+    ])
+    return producto, None
+
+def ajustar_stock(producto_id, delta):
+    """Sumar `delta` al stock con un único UPDATE condicional
+
+    La condición stock + delta >= 0 se evalúa en la base de datos, por lo
+    que ajustes concurrentes no pierden actualizaciones ni requieren
+    bloqueos. Retorna (nuevo_stock, error).
+    """
+    return _escribir(_ajustar_stock, producto_id, delta)
+
+def _ajustar_stock(producto_id, delta):
+    condicion = (Producto.id == producto_id, Producto.stock + delta >= 0)
+    sentencia = (
+        update(Producto)
+        .where(*condicion)
+        .values(stock=Producto.stock + delta, secuencia=_secuencia_nueva())
+        .execution_options(synchronize_session=False)
+    )
+    
+    if _soporta_returning():
+        fila = db.session.execute(
+            sentencia.returning(Producto.stock, Producto.precio, Producto.umbral_reorden)
+        ).first()
+    else:
+        fila = None
+        if db.session.execute(sentencia).rowcount:
+            fila = db.session.execute(
+                select(Producto.stock, Producto.precio, Producto.umbral_reorden)
+                .where(Producto.id == producto_id)
+            ).first()
+    
+    if fila is None:
+        # El UPDATE no modificó filas, no hay nada que revertir
+        existe = db.session.execute(
+            select(Producto.id).where(Producto.id == producto_id)
+        ).first()
+        if not existe:
+            return None, "Producto no encontrado"
+        return None, "Stock insuficiente"
+    
+    nuevo_stock, precio, umbral = fila
+    _registrar_movimientos([(producto_id, delta)], 'ajuste')
+    _marcar_modificados([producto_id], cambios_stock=[
+        (producto_id, precio, umbral, nuevo_stock - delta, nuevo_stock)
+    ])
+    return nuevo_stock, None
+
+def actualizar_umbral_reorden(producto_id, umbral):
+    """Asignar el umbral de reorden de un producto (None usa el global)
+
+    Si con el nuevo umbral el stock actual queda bajo y con el anterior no
+    lo estaba, se emite la alerta en ese momento.
+    """
+    return _escribir(_actualizar_umbral_reorden, producto_id, umbral)
+
+def _actualizar_umbral_reorden(producto_id, umbral):
+    producto = _obtener_para_escribir(producto_id)
+    if not producto:
+        return None, "Producto no encontrado"
+    
+    anterior = producto.umbral_reorden
+    producto.umbral_reorden = umbral
+    errores = producto.validar()
+    if errores:
+        producto.umbral_reorden = anterior
+        return None, errores[0]
+    
+    producto.secuencia = _secuencia_nueva()
+    _marcar_modificados([producto_id])
+    if obtener_procesador_alertas() is not None:
+        umbral_global = current_app.config['UMBRAL_STOCK_BAJO']
+        efectivo_anterior = umbral_global if anterior is None else anterior
+        efectivo = umbral_global if umbral is None else umbral
+        if efectivo_anterior < producto.stock <= efectivo:
+            _encolar_alertas([_evento_stock_bajo(producto_id, producto.stock, producto.stock, efectivo)])
     return producto, None
 
 def eliminar_producto(producto_id):
     """Eliminar producto"""
-    producto = Producto.query.get(producto_id)
+    return _escribir(_eliminar_producto, producto_id)
+
+def _eliminar_producto(producto_id):
+    producto = _obtener_para_escribir(producto_id)
     if not producto:
         return False, "Producto no encontrado"
     
+    _registrar_movimientos([(producto_id, -producto.stock)], 'baja')
+    db.session.execute(insert(ProductoEliminado).values(
+        producto_id=producto_id, secuencia=_secuencia_nueva(), fecha=datetime.utcnow()
+    ))
     db.session.delete(producto)
-    db.session.commit()
-    return True, None
\ No newline at end of file
+    _marcar_modificados([producto_id], delta_filas=-1, cambios_stock=[
+        (producto_id, producto.precio, producto.umbral_reorden, producto.stock, None)
+    ])
+    return True, None
+
+def _soporta_returning():
+    """Indica si el motor actual soporta UPDATE ... RETURNING"""
+    return db.engine.dialect.update_returning
+
+def _error_entero(nombre, valor):
+    """Error si `valor` no es un entero que cabe en INTEGER, o None
+
+    bool no cuenta como entero; fuera del rango de 64 bits el driver
+    fallaría al ligar el valor.
+    """
+    if not isinstance(valor, int) or isinstance(valor, bool):
+        return f"El {nombre} debe ser un número entero"
+    if not ENTERO_MIN <= valor <= ENTERO_MAX:
+        return f"El {nombre} está fuera del rango de enteros de 64 bits"
+    return None
+
+def _validar_entrada_stock(entrada):
+    """Validar una entrada {id, stock} o {id, delta} de un ajuste en lote
+
+    Retorna (producto_id, campo, valor, error).
+    """
+    if not isinstance(entrada, dict):
+        return None, None, None, "La entrada debe ser un objeto JSON"
+    
+    producto_id = entrada.get('id')
+    error = _error_entero('id', producto_id)
+    if error:
+        return None, None, None, error
+    
+    campos = [c for c in ('stock', 'delta') if c in entrada]
+    if len(campos) != 1:
+        return producto_id, None, None, "Se requiere exactamente uno de: stock, delta"
+    
+    campo = campos[0]
+    valor = entrada[campo]
+    error = _error_entero(campo, valor)
+    if error:
+        return producto_id, None, None, error
+    if campo == 'stock' and valor < 0:
+        return producto_id, None, None, "El stock no puede ser negativo"
+    
+    return producto_id, campo, valor, None
+
+def _aplicar_deltas(deltas):
+    """Sumar deltas {id: delta} con un UPDATE por bloque
+
+    La regla de stock no negativo se aplica en el WHERE de la sentencia.
+    Retorna el conjunto de ids actualizados.
+    """
+    expresion = case(deltas, value=Producto.id)
+    condicion = (Producto.id.in_(list(deltas)), Producto.stock + expresion >= 0)
+    sentencia = (
+        update(Producto)
+        .where(*condicion)
+        .values(stock=Producto.stock + expresion, secuencia=_secuencia_nueva())
+        .execution_options(synchronize_session=False)
+    )
+    
+    if _soporta_returning():
+        return set(db.session.execute(sentencia.returning(Producto.id)).scalars())
+    
+    aplicables = set(db.session.execute(select(Producto.id).where(*condicion)).scalars())
+    db.session.execute(sentencia)
+    return aplicables
+
+def _asignar_stock(valores):
+    """Asignar stock absoluto {id: stock} con un UPDATE por bloque"""
+    db.session.execute(
+        update(Producto)
+        .where(Producto.id.in_(list(valores)))
+        .values(stock=case(valores, value=Producto.id), secuencia=_secuencia_nueva())
+        .execution_options(synchronize_session=False)
+    )
+
+def ajustar_stock_lote(entradas):
+    """Ajustar el stock de varios productos en una sola transacción
+
+    Cada entrada es {id, stock} (valor absoluto) o {id, delta} (suma
+    atómica). Las actualizaciones se agrupan en sentencias por bloque de
+    ids en lugar de una por producto.
+    Retorna {'actualizados', 'no_encontrados', 'rechazados'}.
+    """
+    resultado = {'actualizados': [], 'no_encontrados': [], 'rechazados': []}
+    cambios = {}
+    
+    for indice, entrada in enumerate(entradas):
+        producto_id, campo, valor, error = _validar_entrada_stock(entrada)
+        if not error and producto_id in cambios:
+            error = "ID duplicado en el lote"
+        if error:
+            resultado['rechazados'].append({'indice': indice, 'id': producto_id, 'error': error})
+            continue
+        cambios[producto_id] = (indice, campo, valor)
+    
+    ids = list(cambios)
+    cambios_stock = []
+    try:
+        # El stock previo de cada producto se lee bajo el bloqueo
+        _bloquear_escritura()
+        for inicio in range(0, len(ids), TAMANO_IN):
+            bloque = ids[inicio:inicio + TAMANO_IN]
+            existentes = {
+                fila.id: fila for fila in db.session.execute(
+                    select(Producto.id, Producto.stock, Producto.precio, Producto.umbral_reorden)
+                    .where(Producto.id.in_(bloque))
+                )
+            }
+            
+            absolutos = {}
+            deltas = {}
+            for producto_id in bloque:
+                if producto_id not in existentes:
+                    resultado['no_encontrados'].append(producto_id)
+                    continue
+                _, campo, valor = cambios[producto_id]
+                destino = absolutos if campo == 'stock' else deltas
+                destino[producto_id] = valor
+            
+            movimientos = []
+            if absolutos:
+                _asignar_stock(absolutos)
+                resultado['actualizados'].extend(absolutos)
+                for producto_id, valor in absolutos.items():
+                    anterior = existentes[producto_id]
+                    movimientos.append((producto_id, valor - anterior.stock))
+                    cambios_stock.append(
+                        (producto_id, anterior.precio, anterior.umbral_reorden, anterior.stock, valor)
+                    )
+            
+            if deltas:
+                aplicados = _aplicar_deltas(deltas)
+                for producto_id in deltas:
+                    if producto_id in aplicados:
+                        resultado['actualizados'].append(producto_id)
+                        anterior = existentes[producto_id]
+                        movimientos.append((producto_id, deltas[producto_id]))
+                        cambios_stock.append((
+                            producto_id, anterior.precio, anterior.umbral_reorden,
+                            anterior.stock, anterior.stock + deltas[producto_id]
+                        ))
+                    else:
+                        resultado['rechazados'].append({
+                            'indice': cambios[producto_id][0],
+                            'id': producto_id,
+                            'error': "El stock no puede ser negativo"
+                        })
+            _registrar_movimientos(movimientos, 'lote')
+        if resultado['actualizados']:
+            _marcar_modificados(resultado['actualizados'], cambios_stock=cambios_stock)
+        _confirmar()
+    except Exception:
+        _descartar()
+        raise
+    
+    return resultado
+
+def _registrar_movimientos(movimientos, motivo):
+    """Añadir pares (producto_id, delta) al registro de movimientos
+
+    Se escriben en la misma transacción que el cambio de stock; los deltas
+    nulos se omiten.
+    """
+    ahora = datetime.utcnow()
+    filas = [
+        {'producto_id': producto_id, 'delta': delta, 'motivo': motivo, 'fecha': ahora}
+        for producto_id, delta in movimientos if delta
+    ]
+    if filas:
+        db.session.execute(insert(MovimientoStock), filas)
+
+def obtener_movimientos(producto_id, desde_id=0, limite=100):
+    """Movimientos de un producto con id mayor a `desde_id`, en orden"""
+    return db.session.execute(
+        select(MovimientoStock)
+        .where(MovimientoStock.producto_id == producto_id, MovimientoStock.id > desde_id)
+        .order_by(MovimientoStock.id)
+        .limit(limite)
+    ).scalars().all()
+
+def obtener_stock_en(producto_id, momento):
+    """Reconstruir el stock de un producto en la fecha `momento`
+
+    Parte del último snapshot anterior a la fecha y suma los movimientos
+    posteriores a él, por lo que el costo depende de los movimientos desde
+    la última consolidación y no de todo el historial.
+    Retorna (stock, error).
+    """
+    snapshot = db.session.execute(
+        select(SnapshotStock.movimiento_id, SnapshotStock.stock, SnapshotStock.fecha)
+        .where(SnapshotStock.producto_id == producto_id, SnapshotStock.fecha <= momento)
+        .order_by(SnapshotStock.fecha.desc(), SnapshotStock.movimiento_id.desc())
+        .limit(1)
+    ).first()
+    
+    condicion = [
+        MovimientoStock.producto_id == producto_id,
+        MovimientoStock.fecha <= momento
+    ]
+    if snapshot is not None:
+        # Los movimientos posteriores al snapshot no son anteriores a él
+        condicion.append(MovimientoStock.fecha >= snapshot.fecha)
+        condicion.append(MovimientoStock.id > snapshot.movimiento_id)
+    movimientos, suma = db.session.execute(
+        select(func.count(), func.coalesce(func.sum(MovimientoStock.delta), 0)).where(*condicion)
+    ).one()
+    
+    if snapshot is None and not movimientos:
+        return None, "Sin historial de stock a esa fecha"
+    return (snapshot.stock if snapshot is not None else 0) + suma, None
+
+def consolidar_stock(minimo_movimientos=1):
+    """Crear un snapshot por producto con movimientos sin consolidar
+
+    Solo se consideran los productos con al menos `minimo_movimientos`
+    movimientos posteriores a su último snapshot. Los movimientos no se
+    eliminan. Retorna la cantidad de snapshots creados.
+    """
+    # Los snapshots se añaden en orden, el de mayor id es el último
+    ultimos = select(func.max(SnapshotStock.id)).group_by(SnapshotStock.producto_id)
+    base = (
+        select(SnapshotStock.producto_id, SnapshotStock.movimiento_id, SnapshotStock.stock)
+        .where(SnapshotStock.id.in_(ultimos))
+        .subquery()
+    )
+    nuevos = (
+        select(
+            MovimientoStock.producto_id,
+            func.max(MovimientoStock.id),
+            func.coalesce(func.max(base.c.stock), 0) + func.sum(MovimientoStock.delta),
+            func.max(MovimientoStock.fecha)
+        )
+        .outerjoin(base, base.c.producto_id == MovimientoStock.producto_id)
+        .where(MovimientoStock.id > func.coalesce(base.c.movimiento_id, 0))
+        .group_by(MovimientoStock.producto_id)
+        .having(func.count() >= minimo_movimientos)
+    )
+    
+    try:
+        creados = db.session.execute(
+            insert(SnapshotStock).from_select(
+                ['producto_id', 'movimiento_id', 'stock', 'fecha'], nuevos
+            )
+        ).rowcount
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return creados
+
+def codificar_desde(secuencia, producto_id):
+    """Posición en el feed de cambios tras el cambio (secuencia, producto_id)"""
+    return f'{secuencia}:{producto_id}'
+
+def decodificar_desde(desde):
+    """Convertir "<secuencia>" o "<secuencia>:<id>" en (secuencia, id)
+
+    Sin id se entregan todos los cambios de secuencia mayor. Lanza
+    ValueError si no es válido.
+    """
+    secuencia, _, producto_id = desde.partition(':')
+    try:
+        secuencia = int(secuencia)
+        producto_id = int(producto_id) if producto_id else None
+    except ValueError as e:
+        raise ValueError("Parámetro desde inválido") from e
+    if secuencia < 0:
+        raise ValueError("Parámetro desde inválido")
+    return secuencia, producto_id
+
+def obtener_cambios(desde=(0, None), limite=100):
+    """Cambios del catálogo posteriores a `desde`, en orden de secuencia
+
+    Cada producto modificado aparece una vez con su estado actual y los
+    eliminados como {'id', 'secuencia', 'eliminado': True}. El costo
+    depende de la cantidad de cambios y no del tamaño del catálogo.
+    Retorna (cambios, siguiente) con la posición a usar como `desde` en
+    la próxima consulta.
+    """
+    secuencia, ultimo_id = desde
+    
+    def posteriores(columna_secuencia, columna_id):
+        if ultimo_id is None:
+            return columna_secuencia > secuencia
+        return tuple_(columna_secuencia, columna_id) > tuple_(secuencia, ultimo_id)
+    
+    filas = db.session.execute(
+        consulta_filas().add_columns(Producto.secuencia)
+        .where(posteriores(Producto.secuencia, Producto.id))
+        .order_by(Producto.secuencia, Producto.id)
+        .limit(limite)
+    ).all()
+    bajas = db.session.execute(
+        select(ProductoEliminado.secuencia, ProductoEliminado.producto_id)
+        .where(posteriores(ProductoEliminado.secuencia, ProductoEliminado.producto_id))
+        .order_by(ProductoEliminado.secuencia, ProductoEliminado.producto_id)
+        .limit(limite)
+    ).all()
+    
+    actualizados = (
+        ((f.secuencia, f.id), dict(zip(COLUMNAS_PRODUCTO, f), secuencia=f.secuencia, eliminado=False))
+        for f in filas
+    )
+    eliminados = (
+        ((b.secuencia, b.producto_id), {'id': b.producto_id, 'secuencia': b.secuencia, 'eliminado': True})
+        for b in bajas
+    )
+    cambios = [
+        cambio for _, cambio in
+        islice(heapq.merge(actualizados, eliminados, key=lambda par: par[0]), limite)
+    ]
+    
+    if not cambios:
+        siguiente = codificar_desde(secuencia, ultimo_id) if ultimo_id is not None else str(secuencia)
+        return cambios, siguiente
+    return cambios, codificar_desde(cambios[-1]['secuencia'], cambios[-1]['id'])
\ No newline at end of file
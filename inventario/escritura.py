@@ -0,0 +1,147 @@
+import queue
+import threading
+import time
+from flask import current_app
+
+class _Pendiente:
+    """Operación encolada junto con el evento que espera su resultado"""
+
+    __slots__ = ('operacion', 'args', 'resultado', 'excepcion', 'evento')
+
+    def __init__(self, operacion, args):
+        self.operacion = operacion
+        self.args = args
+        self.resultado = None
+        self.excepcion = None
+        self.evento = threading.Event()
+
+class EscritorAgrupado:
+    """Escritor único que confirma varias escrituras en un solo commit
+
+    Las peticiones encolan sus operaciones y esperan el resultado. El hilo
+    escritor toma hasta `max_operaciones` o lo que llegue en `intervalo_ms`
+    desde la primera, las ejecuta en una transacción y hace un único
+    commit, de modo que el costo del fsync se reparte entre todas. Si la
+    transacción falla, las operaciones se reintentan una a una para que
+    el error afecte solo a la que lo provocó.
+    """
+
+    def __init__(self, app, intervalo_ms=5, max_operaciones=100):
+        self.app = app
+        self.intervalo = intervalo_ms / 1000
+        self.max_operaciones = max_operaciones
+        self.lotes = 0
+        self.operaciones = 0
+        self._cola = queue.Queue()
+        self._hilo = None
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._ejecutar, name='escritor-agrupado', daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        if self._hilo is not None:
+            self._cola.put(None)
+            self._hilo.join()
+            self._hilo = None
+
+    def reiniciar_tras_fork(self):
+        """Crear un hilo y una cola nuevos en un proceso hijo
+
+        Los hilos no sobreviven a fork(), por lo que el escritor heredado
+        del proceso padre quedaría sin consumidor.
+        """
+        self._cola = queue.Queue()
+        self._hilo = None
+        self.iniciar()
+
+    def enviar(self, operacion, *args):
+        """Encolar una operación y esperar su resultado"""
+        if threading.current_thread() is self._hilo:
+            return operacion(*args)
+
+        pendiente = _Pendiente(operacion, args)
+        self._cola.put(pendiente)
+        pendiente.evento.wait()
+        if pendiente.excepcion is not None:
+            raise pendiente.excepcion
+        return pendiente.resultado
+
+    def _tomar_lote(self):
+        primero = self._cola.get()
+        if primero is None:
+            return None
+
+        lote = [primero]
+        limite = time.monotonic() + self.intervalo
+        while len(lote) < self.max_operaciones:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                siguiente = self._cola.get(timeout=restante)
+            except queue.Empty:
+                break
+            if siguiente is None:
+                self._cola.put(None)
+                break
+            lote.append(siguiente)
+        return lote
+
+    def _ejecutar(self):
+        with self.app.app_context():
+            while True:
+                lote = self._tomar_lote()
+                if lote is None:
+                    break
+                self._procesar(lote)
+
+    def _procesar(self, lote):
+        from inventario.database import _confirmar, _descartar
+        from inventario.models import db
+
+        try:
+            for pendiente in lote:
+                pendiente.resultado = pendiente.operacion(*pendiente.args)
+            # Los objetos se separan de la sesión con sus atributos cargados
+            # para que las peticiones los lean sin tocar la sesión del escritor
+            db.session.flush()
+            db.session.expunge_all()
+            _confirmar()
+        except Exception:
+            _descartar()
+            for pendiente in lote:
+                try:
+                    pendiente.resultado = pendiente.operacion(*pendiente.args)
+                    db.session.flush()
+                    db.session.expunge_all()
+                    _confirmar()
+                except Exception as e:
+                    _descartar()
+                    pendiente.resultado = None
+                    pendiente.excepcion = e
+        finally:
+            self.lotes += 1
+            self.operaciones += len(lote)
+            for pendiente in lote:
+                pendiente.evento.set()
+
+def init_escritura(app):
+    """Iniciar el escritor agrupado si ESCRITURA_AGRUPADA está activo"""
+    app.config.setdefault('ESCRITURA_AGRUPADA', False)
+    app.config.setdefault('ESCRITURA_INTERVALO_MS', 5)
+    app.config.setdefault('ESCRITURA_MAX_OPERACIONES', 100)
+
+    if app.config['ESCRITURA_AGRUPADA']:
+        escritor = EscritorAgrupado(
+            app,
+            app.config['ESCRITURA_INTERVALO_MS'],
+            app.config['ESCRITURA_MAX_OPERACIONES']
+        )
+        escritor.iniciar()
+        app.extensions['inventario_escritor'] = escritor
+
+def obtener_escritor():
+    """Escritor agrupado de la aplicación actual, o None si no está activo"""
+    return current_app.extensions.get('inventario_escritor')
@@ -0,0 +1,200 @@
+import logging
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+from flask import current_app, request
+from sqlalchemy import event
+from inventario.models import db
+
+logger = logging.getLogger(__name__)
+
+# Inicio y acumulador [consultas, segundos] SQL de la petición en curso
+_peticion_actual = ContextVar('inventario_metricas_peticion', default=None)
+
+# Límites superiores (segundos) de los buckets de los histogramas
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histograma:
+    """Histograma acumulativo al estilo de Prometheus"""
+
+    __slots__ = ('conteos', 'suma', 'total')
+
+    def __init__(self):
+        self.conteos = [0] * (len(BUCKETS) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor):
+        self.conteos[bisect_left(BUCKETS, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+    def acumulados(self):
+        """Pares (límite, conteo acumulado), terminando en +Inf"""
+        acumulado = 0
+        for limite, conteo in zip(BUCKETS + (float('inf'),), self.conteos):
+            acumulado += conteo
+            yield limite, acumulado
+
+class Metricas:
+    """Tiempos de peticiones y consultas SQL de un proceso
+
+    Las peticiones se agrupan por regla de ruta, método y estado, no por
+    URL, para que el número de series no crezca con los ids. Con `sql` las
+    consultas se cuentan por regla de la petición que las ejecutó; las del
+    escritor agrupado u otros hilos sin petición se agrupan como "-".
+    """
+
+    def __init__(self, umbral_lenta=0.2, sql=True):
+        self.umbral_lenta = umbral_lenta
+        self.sql = sql
+        self.peticiones = {}
+        self.consultas = {}
+        self.consultas_lentas = 0
+        self._lock = threading.Lock()
+
+    def observar_peticion(self, ruta, metodo, estado, duracion, consultas, duracion_sql):
+        clave = (ruta, metodo, estado)
+        with self._lock:
+            histograma = self.peticiones.get(clave)
+            if histograma is None:
+                histograma = self.peticiones[clave] = Histograma()
+            histograma.observar(duracion)
+            if not self.sql:
+                return
+
+            acumulado = self.consultas.setdefault(ruta, [0, 0.0])
+            acumulado[0] += consultas
+            acumulado[1] += duracion_sql
+
+    def observar_consulta(self, sentencia, duracion, en_peticion=True):
+        """Registrar una consulta y registrarla en el log si es lenta
+
+        Las consultas de una petición se suman al terminarla; el resto se
+        suman aquí bajo la ruta "-".
+        """
+        lenta = duracion >= self.umbral_lenta
+        if en_peticion and not lenta:
+            return
+        with self._lock:
+            if not en_peticion:
+                acumulado = self.consultas.setdefault('-', [0, 0.0])
+                acumulado[0] += 1
+                acumulado[1] += duracion
+            if lenta:
+                self.consultas_lentas += 1
+        if lenta:
+            logger.warning('Consulta lenta (%.1f ms): %s', duracion * 1000, sentencia)
+
+    def _lineas_peticiones(self):
+        yield '# HELP inventario_peticion_segundos Duración de las peticiones HTTP'
+        yield '# TYPE inventario_peticion_segundos histogram'
+        for (ruta, metodo, estado), histograma in sorted(self.peticiones.items()):
+            etiquetas = f'ruta="{ruta}",metodo="{metodo}",estado="{estado}"'
+            for limite, acumulado in histograma.acumulados():
+                le = '+Inf' if limite == float('inf') else repr(limite)
+                yield f'inventario_peticion_segundos_bucket{{{etiquetas},le="{le}"}} {acumulado}'
+            yield f'inventario_peticion_segundos_sum{{{etiquetas}}} {histograma.suma}'
+            yield f'inventario_peticion_segundos_count{{{etiquetas}}} {histograma.total}'
+
+    def _lineas_consultas(self):
+        yield '# HELP inventario_sql_consultas_total Consultas SQL ejecutadas por ruta'
+        yield '# TYPE inventario_sql_consultas_total counter'
+        for ruta, (consultas, _) in sorted(self.consultas.items()):
+            yield f'inventario_sql_consultas_total{{ruta="{ruta}"}} {consultas}'
+        yield '# HELP inventario_sql_segundos_total Tiempo en consultas SQL por ruta'
+        yield '# TYPE inventario_sql_segundos_total counter'
+        for ruta, (_, segundos) in sorted(self.consultas.items()):
+            yield f'inventario_sql_segundos_total{{ruta="{ruta}"}} {segundos}'
+        yield '# HELP inventario_sql_consultas_lentas_total Consultas sobre el umbral de lentitud'
+        yield '# TYPE inventario_sql_consultas_lentas_total counter'
+        yield f'inventario_sql_consultas_lentas_total {self.consultas_lentas}'
+
+    def exportar(self, extras=()):
+        """Texto en formato de exposición de Prometheus
+
+        `extras` son tuplas (nombre, tipo, ayuda, valor) adicionales, como
+        los contadores de la caché.
+        """
+        with self._lock:
+            lineas = list(self._lineas_peticiones())
+            if self.sql:
+                lineas.extend(self._lineas_consultas())
+        for nombre, tipo, ayuda, valor in extras:
+            lineas.append(f'# HELP {nombre} {ayuda}')
+            lineas.append(f'# TYPE {nombre} {tipo}')
+            lineas.append(f'{nombre} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+def _registrar_eventos_sql(motor, metricas):
+    # El inicio se guarda en el contexto de ejecución, propio de cada sentencia
+    @event.listens_for(motor, 'before_cursor_execute')
+    def antes(conexion, cursor, sentencia, parametros, contexto, executemany):
+        contexto._metricas_inicio = perf_counter()
+
+    @event.listens_for(motor, 'after_cursor_execute')
+    def despues(conexion, cursor, sentencia, parametros, contexto, executemany):
+        duracion = perf_counter() - contexto._metricas_inicio
+        peticion = _peticion_actual.get()
+        if peticion is not None:
+            peticion[1] += 1
+            peticion[2] += duracion
+        metricas.observar_consulta(sentencia, duracion, peticion is not None)
+
+def _iniciar_peticion():
+    _peticion_actual.set([perf_counter(), 0, 0.0])
+
+def _terminar_peticion(metricas, estado):
+    peticion = _peticion_actual.get()
+    if peticion is None:
+        return
+    _peticion_actual.set(None)
+    inicio, consultas, duracion_sql = peticion
+    regla = request.url_rule
+    metricas.observar_peticion(
+        regla.rule if regla is not None else 'desconocida',
+        request.method, estado, perf_counter() - inicio, consultas, duracion_sql
+    )
+
+def init_metricas(app):
+    """Instrumentar peticiones si METRICAS está activo, y consultas con METRICAS_SQL
+
+    Las consultas quedan fuera por defecto: los eventos
+    before/after_cursor_execute tienen un costo por consulta aunque sus
+    funciones no hagan nada, y suman más del 2 % a un listado corto. Los
+    hooks de petición cuestan unos pocos microsegundos por petición.
+    """
+    app.config.setdefault('METRICAS', True)
+    app.config.setdefault('METRICAS_SQL', False)
+    app.config.setdefault('METRICAS_UMBRAL_LENTA_MS', 200)
+
+    if not app.config['METRICAS']:
+        return
+
+    metricas = Metricas(app.config['METRICAS_UMBRAL_LENTA_MS'] / 1000, app.config['METRICAS_SQL'])
+    app.extensions['inventario_metricas'] = metricas
+
+    if metricas.sql:
+        with app.app_context():
+            for motor in db.engines.values():
+                _registrar_eventos_sql(motor, metricas)
+
+    @app.before_request
+    def iniciar():
+        _iniciar_peticion()
+
+    @app.after_request
+    def terminar(respuesta):
+        _terminar_peticion(metricas, respuesta.status_code)
+        return respuesta
+
+    @app.teardown_request
+    def terminar_con_error(excepcion):
+        # after_request no se ejecuta si la vista lanzó una excepción
+        if excepcion is not None:
+            _terminar_peticion(metricas, 500)
+
+def obtener_metricas():
+    """Métricas de la aplicación actual, o None si están desactivadas"""
+    return current_app.extensions.get('inventario_metricas')
\ No newline at end of file
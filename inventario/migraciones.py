@@ -0,0 +1,142 @@
+"""Actualización del esquema de bases de datos creadas con versiones anteriores
+
+db.create_all() crea las tablas que faltan pero nunca modifica una tabla
+existente. migrar_esquema completa las tablas existentes con las columnas
+e índices declarados en los modelos que aún no tienen.
+"""
+import logging
+from sqlalchemy import func, inspect, insert, literal, select, update
+from inventario.models import db, Producto, EstadoTabla, MovimientoStock, ProductoEliminado
+
+logger = logging.getLogger(__name__)
+
+def _rellenar_secuencia(conexion):
+    """Dar a los productos existentes una secuencia posterior a la versión
+
+    Con la secuencia 0 del valor por defecto no aparecerían en el feed de
+    cambios consultado desde 0; todas las filas reciben la versión que
+    produce este incremento, como en la carga de `inventario seed`.
+    """
+    version = conexion.execute(
+        select(EstadoTabla.version).where(EstadoTabla.tabla == 'productos')
+    ).scalar()
+    secuencia = (version or 0) + 1
+    # Sin tocar fecha_actualizacion (onupdate), que usan los ETag
+    conexion.execute(
+        update(Producto).values(secuencia=secuencia, fecha_actualizacion=Producto.fecha_actualizacion)
+    )
+    if version is None:
+        conexion.execute(insert(EstadoTabla).values(tabla='productos', version=secuencia))
+    else:
+        conexion.execute(
+            update(EstadoTabla).where(EstadoTabla.tabla == 'productos').values(version=secuencia)
+        )
+
+# Columnas cuyo valor en las filas existentes no es el valor por defecto
+RELLENOS = {
+    ('productos', 'secuencia'): _rellenar_secuencia,
+}
+
+def _sql_agregar_columna(tabla, columna, dialecto):
+    """ALTER TABLE ... ADD COLUMN con el tipo y el valor por defecto del modelo
+
+    Una columna NOT NULL solo puede agregarse con un valor por defecto
+    escalar, que también reciben las filas existentes.
+    """
+    preparador = dialecto.identifier_preparer
+    sql = (f'ALTER TABLE {preparador.format_table(tabla)} '
+           f'ADD COLUMN {preparador.format_column(columna)} {columna.type.compile(dialect=dialecto)}')
+
+    defecto = columna.default
+    if defecto is not None and defecto.is_scalar:
+        valor = literal(defecto.arg, columna.type).compile(
+            dialect=dialecto, compile_kwargs={'literal_binds': True}
+        )
+        sql += f' DEFAULT {valor}'
+    elif not columna.nullable:
+        raise RuntimeError(
+            f"No se puede agregar {tabla.name}.{columna.name}: es NOT NULL sin valor por defecto"
+        )
+
+    if not columna.nullable:
+        sql += ' NOT NULL'
+    return sql
+
+def _falta_autoincrement(conexion, tabla):
+    """Indica si una tabla declarada con sqlite_autoincrement se creó sin él"""
+    if conexion.dialect.name != 'sqlite' or not tabla.dialect_options['sqlite']['autoincrement']:
+        return False
+    sql = conexion.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla.name,)
+    ).scalar()
+    return sql is not None and 'AUTOINCREMENT' not in sql.upper()
+
+def _reconstruir_productos(conexion):
+    """Recrear productos con AUTOINCREMENT conservando filas e ids
+
+    SQLite no permite agregarlo con ALTER TABLE. La tabla se renombra, se
+    crea de nuevo desde el modelo (con sus índices y, al recrearla, el
+    índice FTS y sus triggers), se copian las filas y la secuencia de ids
+    parte del mayor id conocido, incluidos los de productos ya eliminados
+    que aparecen en el historial de stock o en las marcas de eliminación.
+    """
+    tabla = Producto.__table__
+    temporal = f'{tabla.name}_migracion'
+    columnas = ', '.join(
+        c['name'] for c in inspect(conexion).get_columns(tabla.name)
+    )
+
+    conexion.exec_driver_sql('DROP TABLE IF EXISTS productos_fts')
+    disparadores = conexion.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?", (tabla.name,)
+    ).scalars().all()
+    for nombre in disparadores:
+        conexion.exec_driver_sql(f'DROP TRIGGER "{nombre}"')
+    for indice in inspect(conexion).get_indexes(tabla.name):
+        conexion.exec_driver_sql(f'DROP INDEX "{indice["name"]}"')
+
+    conexion.exec_driver_sql(f'ALTER TABLE {tabla.name} RENAME TO {temporal}')
+    tabla.create(conexion)
+    conexion.exec_driver_sql(f'INSERT INTO {tabla.name} ({columnas}) SELECT {columnas} FROM {temporal}')
+    conexion.exec_driver_sql(f'DROP TABLE {temporal}')
+
+    ultimo_id = max(
+        conexion.execute(select(func.coalesce(func.max(columna), 0))).scalar()
+        for columna in (Producto.id, MovimientoStock.producto_id, ProductoEliminado.producto_id)
+    )
+    conexion.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (tabla.name,))
+    conexion.exec_driver_sql(
+        "INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (tabla.name, ultimo_id)
+    )
+
+def migrar_esquema(conexion):
+    """Agregar a las tablas existentes las columnas e índices que les faltan
+
+    Debe ejecutarse tras db.create_all(), que crea las tablas nuevas
+    completas. En SQLite también recrea productos si se creó sin
+    AUTOINCREMENT (ver _reconstruir_productos). Retorna la lista de columnas agregadas como "tabla.columna".
+    """
+    agregadas = []
+    for tabla in db.metadata.sorted_tables:
+        existentes = {c['name'] for c in inspect(conexion).get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name in existentes:
+                continue
+            conexion.exec_driver_sql(_sql_agregar_columna(tabla, columna, conexion.dialect))
+            relleno = RELLENOS.get((tabla.name, columna.name))
+            if relleno is not None:
+                relleno(conexion)
+            agregadas.append(f'{tabla.name}.{columna.name}')
+
+        for indice in tabla.indexes:
+            indice.create(conexion, checkfirst=True)
+
+    if _falta_autoincrement(conexion, Producto.__table__):
+        # En un savepoint: pysqlite no abre transacción para el DDL
+        with conexion.begin_nested():
+            _reconstruir_productos(conexion)
+        logger.info('Tabla productos recreada con AUTOINCREMENT')
+
+    if agregadas:
+        logger.info('Esquema actualizado, columnas agregadas: %s', ', '.join(agregadas))
+    return agregadas
@@ -1,17 +1,35 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from inventario.replicas import SesionEnrutada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 class Producto(db.Model):
     __tablename__ = 'productos'
+    __table_args__ = (
+        # Soporta la paginación por cursor ordenada por fecha de creación
+        db.Index('ix_productos_fecha_creacion_id', 'fecha_creacion', 'id'),
+        # Filtros y ordenamientos del listado
+        db.Index('ix_productos_nombre', 'nombre'),
+        db.Index('ix_productos_precio', 'precio'),
+        db.Index('ix_productos_stock', 'stock'),
+        # Feed de cambios ordenado por secuencia
+        db.Index('ix_productos_secuencia_id', 'secuencia', 'id'),
+        # Los ids de productos eliminados no se reutilizan: el historial de
+        # stock y las marcas de eliminación los referencian sin clave foránea
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
     precio = db.Column(db.Float, nullable=False)
     stock = db.Column(db.Integer, nullable=False, default=0)
+    # Umbral de reposición propio; NULL usa el umbral global UMBRAL_STOCK_BAJO
+    umbral_reorden = db.Column(db.Integer)
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Versión de la tabla en la escritura que modificó la fila por última vez
+    secuencia = db.Column(db.BigInteger, nullable=False, default=0)
     
     def __repr__(self):
         return f''
@@ -22,6 +40,7 @@ class Producto(db.Model):
             'nombre': self.nombre,
             'precio': self.precio,
             'stock': self.stock,
+            'umbral_reorden': self.umbral_reorden,
             'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
             'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
         }
@@ -34,4 +53,88 @@ class Producto(db.Model):
             errores.append("El precio debe ser mayor o igual a 0")
         if self.stock is None or self.stock < 0:
             errores.append("El stock debe ser mayor o igual a 0")
-        return errores
\ No newline at end of file
+        if self.umbral_reorden is not None and (
+            not isinstance(self.umbral_reorden, int) or isinstance(self.umbral_reorden, bool)
+            or self.umbral_reorden < 0
+        ):
+            errores.append("El umbral de reorden debe ser un entero mayor o igual a 0")
+        return errores
+
+class EstadoTabla(db.Model):
+    """Versión, número de filas y resumen por tabla, mantenidos en cada escritura
+
+    Permite validar listados en caché de clientes (ETag) con una lectura
+    de una sola fila en lugar de consultar la página completa. `filas` y
+    el resumen de inventario son NULL hasta que un recálculo los
+    inicializa; `stock_bajo` cuenta los productos con stock menor o igual
+    a `umbral_stock_bajo`.
+    """
+    __tablename__ = 'estado_tablas'
+    
+    tabla = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    filas = db.Column(db.BigInteger)
+    # En centavos enteros: la suma de millones de deltas en coma flotante deriva
+    valor_total_centavos = db.Column(db.BigInteger)
+    stock_total = db.Column(db.BigInteger)
+    sin_stock = db.Column(db.BigInteger)
+    stock_bajo = db.Column(db.BigInteger)
+    umbral_stock_bajo = db.Column(db.Integer)
+    actualizado_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+class MovimientoStock(db.Model):
+    """Registro append-only de cada cambio de stock
+
+    No tiene clave foránea a productos para conservar el historial de los
+    productos eliminados.
+    """
+    __tablename__ = 'movimientos_stock'
+    __table_args__ = (
+        # Historial de un producto y reconstrucción del stock a una fecha
+        db.Index('ix_movimientos_stock_producto_fecha', 'producto_id', 'fecha', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False)
+    delta = db.Column(db.Integer, nullable=False)
+    motivo = db.Column(db.String(20), nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'producto_id': self.producto_id,
+            'delta': self.delta,
+            'motivo': self.motivo,
+            'fecha': self.fecha.isoformat() if self.fecha else None
+        }
+
+class SnapshotStock(db.Model):
+    """Stock de un producto consolidado hasta un movimiento
+
+    El stock a una fecha se obtiene del último snapshot anterior más los
+    movimientos posteriores a él, que se mantienen pocos consolidando de
+    forma periódica.
+    """
+    __tablename__ = 'snapshots_stock'
+    __table_args__ = (
+        db.Index('ix_snapshots_stock_producto_fecha', 'producto_id', 'fecha', 'movimiento_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False)
+    movimiento_id = db.Column(db.Integer, nullable=False, default=0)
+    stock = db.Column(db.Integer, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False)
+
+class ProductoEliminado(db.Model):
+    """Marca de eliminación de un producto para el feed de cambios"""
+    __tablename__ = 'productos_eliminados'
+    __table_args__ = (
+        db.Index('ix_productos_eliminados_secuencia', 'secuencia', 'producto_id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    producto_id = db.Column(db.Integer, nullable=False)
+    secuencia = db.Column(db.BigInteger, nullable=False)
+    fecha = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
\ No newline at end of file
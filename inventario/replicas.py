@@ -0,0 +1,137 @@
+import itertools
+import threading
+import time
+from flask import current_app, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, exc, text
+
+# Cookie que fija las lecturas de un cliente a la primaria tras escribir
+COOKIE_PRIMARIA = 'inventario_primaria'
+
+METODOS_LECTURA = ('GET', 'HEAD')
+
+class SesionEnrutada(Session):
+    """Sesión que envía los SELECT a la réplica asignada a la petición
+
+    Cualquier otra sentencia (INSERT, UPDATE, flush, SQL textual) usa la
+    primaria, y desde ese momento también las lecturas de la sesión, para
+    que una petición lea lo que acaba de escribir.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get('replica')
+        if replica is not None and bind is None:
+            if getattr(clause, 'is_select', False):
+                return replica
+            self.info.pop('replica')
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class GrupoReplicas:
+    """Réplicas de lectura con turno rotativo y chequeo de salud
+
+    Cada réplica se comprueba con una consulta a la tabla productos como
+    máximo cada `intervalo` segundos, en la petición que la elige; un
+    error de conexión durante una consulta la marca caída de inmediato.
+    Sin réplicas sanas las lecturas van a la primaria.
+    """
+
+    def __init__(self, motores, intervalo=10):
+        self.motores = dict(motores)
+        self.intervalo = intervalo
+        self._sanas = {nombre: True for nombre in self.motores}
+        self._proximo_chequeo = dict.fromkeys(self.motores, 0.0)
+        self._turno = itertools.count()
+        self._lock = threading.Lock()
+
+        for nombre, motor in self.motores.items():
+            self._escuchar_errores(nombre, motor)
+
+    def _escuchar_errores(self, nombre, motor):
+        @event.listens_for(motor, 'handle_error')
+        def marcar_caida(contexto):
+            if contexto.is_disconnect or isinstance(contexto.sqlalchemy_exception, exc.OperationalError):
+                self._marcar(nombre, False)
+
+    def _marcar(self, nombre, sana):
+        with self._lock:
+            self._sanas[nombre] = sana
+            self._proximo_chequeo[nombre] = time.monotonic() + self.intervalo
+
+    def _chequear(self, nombre):
+        try:
+            with self.motores[nombre].connect() as conexion:
+                conexion.execute(text('SELECT 1 FROM productos LIMIT 1'))
+            sana = True
+        except exc.DBAPIError:
+            sana = False
+        self._marcar(nombre, sana)
+
+    def _pendientes_de_chequeo(self):
+        """Réplicas cuyo chequeo venció, reservadas para esta petición"""
+        ahora = time.monotonic()
+        with self._lock:
+            vencidas = [n for n, proximo in self._proximo_chequeo.items() if proximo <= ahora]
+            for nombre in vencidas:
+                self._proximo_chequeo[nombre] = ahora + self.intervalo
+        return vencidas
+
+    def elegir(self):
+        """Motor de la siguiente réplica sana, o None si no hay ninguna"""
+        for nombre in self._pendientes_de_chequeo():
+            self._chequear(nombre)
+
+        sanas = [nombre for nombre, sana in self._sanas.items() if sana]
+        if not sanas:
+            return None
+        return self.motores[sanas[next(self._turno) % len(sanas)]]
+
+    def estado(self):
+        """{nombre: sana} de cada réplica"""
+        with self._lock:
+            return dict(self._sanas)
+
+def init_replicas(app):
+    """Enrutar las lecturas a las réplicas de REPLICAS_LECTURA
+
+    REPLICAS_LECTURA enumera claves de SQLALCHEMY_BINDS. Las peticiones GET
+    y HEAD leen de una réplica salvo que el cliente haya escrito hace menos
+    de REPLICAS_PEGAJOSO_S segundos (cookie), en cuyo caso leen de la
+    primaria para ver su propia escritura.
+    """
+    from inventario.models import db
+
+    app.config.setdefault('REPLICAS_LECTURA', [])
+    app.config.setdefault('REPLICAS_CHEQUEO_S', 10)
+    app.config.setdefault('REPLICAS_PEGAJOSO_S', 5)
+
+    if not app.config['REPLICAS_LECTURA']:
+        return
+
+    with app.app_context():
+        motores = {nombre: db.engines[nombre] for nombre in app.config['REPLICAS_LECTURA']}
+    grupo = GrupoReplicas(motores, app.config['REPLICAS_CHEQUEO_S'])
+    app.extensions['inventario_replicas'] = grupo
+
+    @app.before_request
+    def asignar_replica():
+        if request.method in METODOS_LECTURA and COOKIE_PRIMARIA not in request.cookies:
+            replica = grupo.elegir()
+            if replica is not None:
+                db.session.info['replica'] = replica
+
+    @app.after_request
+    def fijar_primaria(respuesta):
+        if request.method not in METODOS_LECTURA and respuesta.status_code < 400:
+            respuesta.set_cookie(
+                COOKIE_PRIMARIA, '1',
+                max_age=app.config['REPLICAS_PEGAJOSO_S'], httponly=True, samesite='Lax'
+            )
+        return respuesta
+
+    @app.teardown_request
+    def liberar_replica(excepcion):
+        db.session.info.pop('replica', None)
+
+def obtener_replicas():
+    """Grupo de réplicas de la aplicación actual, o None si no hay"""
+    return current_app.extensions.get('inventario_replicas')
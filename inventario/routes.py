@@ -1,11 +1,41 @@
-from flask import Blueprint, request, jsonify
+import csv
+import hashlib
+import io
+import json
+import math
+import time
+from datetime import datetime, timezone
+from flask import (
+    Blueprint, Response, current_app, request, jsonify, make_response, stream_with_context
+)
+from werkzeug.http import is_resource_modified
 from inventario.database import (
-    obtener_productos, crear_producto, obtener_producto_por_id,
-    actualizar_stock, eliminar_producto
+    obtener_productos_serializados, obtener_productos_cursor, crear_producto,
+    crear_productos_lote, obtener_producto_por_id, obtener_producto_serializado,
+    obtener_productos_serializados_por_ids,
+    obtener_version_productos, obtener_fecha_actualizacion, actualizar_stock,
+    ajustar_stock, ajustar_stock_lote, actualizar_umbral_reorden, eliminar_producto,
+    iterar_productos_exportacion, obtener_movimientos, obtener_stock_en, obtener_cambios,
+    decodificar_desde, obtener_estadisticas, FILTROS_LISTADO, ORDENES_LISTADO, COLUMNAS_PRODUCTO, MODOS_TOTAL, MAX_CAMBIOS,
+    ENTERO_MIN, ENTERO_MAX
 )
+from inventario.alertas import obtener_procesador_alertas
+from inventario.cache import obtener_cache
+from inventario.cambios import obtener_aviso_cambios
+from inventario.escritura import obtener_escritor
+from inventario.metricas import obtener_metricas
+from inventario.replicas import obtener_replicas
+from inventario.busqueda import buscar_productos
+from inventario.serializacion import filas_a_dicts
 
 api = Blueprint('api', __name__, url_prefix='/api')
 
+# Máximo de ids aceptados en GET /api/productos?ids=...
+MAX_IDS = 1000
+
+# Segundos sin cambios tras los que el flujo SSE envía un comentario
+LATIDO_SSE = 15
+
 @api.route('/productos', methods=['POST'])
 def crear_producto_endpoint():
     """POST /api/productos - Crear producto"""
@@ -24,28 +54,396 @@ def crear_producto_endpoint():
         'producto': producto.to_dict()
     }), 201
 
+def _no_modificado(etag, ultima_modificacion):
+    """Retornar una respuesta 304 si el cliente ya tiene esta versión"""
+    if ultima_modificacion is not None:
+        ultima_modificacion = ultima_modificacion.replace(tzinfo=timezone.utc, microsecond=0)
+    
+    if is_resource_modified(request.environ, etag=etag, last_modified=ultima_modificacion):
+        return None
+    
+    return _con_validadores(make_response('', 304), etag, ultima_modificacion)
+
+def _con_validadores(respuesta, etag, ultima_modificacion):
+    """Agregar ETag y Last-Modified a una respuesta"""
+    respuesta.set_etag(etag)
+    if ultima_modificacion is not None:
+        respuesta.last_modified = ultima_modificacion
+    return respuesta
+
+def _leer_filtros():
+    """Leer los filtros del listado desde la query string
+
+    Retorna (filtros, error).
+    """
+    filtros = {}
+    for nombre, tipo in FILTROS_LISTADO.items():
+        valor = request.args.get(nombre)
+        if not valor:
+            continue
+        try:
+            filtros[nombre] = tipo(valor)
+        except ValueError:
+            return None, f'El filtro {nombre} no es válido'
+    return filtros, None
+
+# Bytes leídos de una vez del cuerpo NDJSON
+TAMANO_BUFFER_NDJSON = 64 * 1024
+
+def _leer_ndjson(stream):
+    """Generar un objeto por línea de un cuerpo NDJSON, sin cargarlo completo
+
+    El stream de werkzeug busca cada fin de línea con lecturas pequeñas;
+    con un buffer las líneas se separan en memoria.
+    """
+    for linea in io.BufferedReader(stream, TAMANO_BUFFER_NDJSON):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            yield json.loads(linea)
+        except ValueError:
+            # Se reporta como elemento inválido en su posición del lote
+            yield None
+
+@api.route('/productos/lote', methods=['POST'])
+def crear_productos_lote_endpoint():
+    """POST /api/productos/lote - Crear productos en lote
+    
+    Acepta un arreglo JSON o un cuerpo NDJSON (application/x-ndjson) con un
+    producto por línea. Los productos válidos se crean aunque otros fallen.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        productos = _leer_ndjson(request.stream)
+    else:
+        productos = request.get_json(silent=True)
+        if not isinstance(productos, list):
+            return jsonify({'error': 'Se requiere un arreglo JSON de productos'}), 400
+    
+    creados, errores = crear_productos_lote(productos)
+    
+    if not creados:
+        return jsonify({
+            'error': 'Ningún producto válido en el lote',
+            'errores': errores
+        }), 400
+    
+    return jsonify({
+        'mensaje': 'Productos creados exitosamente',
+        'creados': creados,
+        'errores': errores
+    }), 201
+
 @api.route('/productos', methods=['GET'])
 def listar_productos():
-    """GET /api/productos - Listar productos con paginación"""
+    """GET /api/productos - Listar productos con paginación
+    
+    Con el parámetro `cursor` se usa paginación por cursor (keyset); un
+    cursor vacío solicita la primera página. Con `ids=1,2,3` se obtienen
+    esos productos con una sola consulta IN. El ETag se deriva de la
+    versión de la tabla, así que un 304 no consulta ni serializa filas.
+    
+    Filtros: stock_max, precio_min, precio_max y nombre (prefijo).
+    Orden: id, nombre, precio, stock o fecha_creacion, con "-" para
+    descendente.
+    Total: exacto, aproximado (por defecto; contador mantenido en cada
+    escritura) u omitir. En modo cursor solo se incluye si se pide.
+    """
+    pagina = request.args.get('pagina', 1, type=int)
+    por_pagina = request.args.get('por_pagina', 10, type=int)
+    
+    if pagina < 1:
+        return jsonify({'error': 'La página debe ser mayor a 0'}), 400
+    
+    if por_pagina < 1 or por_pagina > 100:
+        return jsonify({'error': 'por_pagina debe estar entre 1 y 100'}), 400
+    
+    filtros, error = _leer_filtros()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    modo_total = request.args.get('total')
+    if modo_total is not None and modo_total not in MODOS_TOTAL:
+        return jsonify({'error': 'total no soportado, use: ' + ', '.join(MODOS_TOTAL)}), 400
+    
+    version, ultima_modificacion = obtener_version_productos()
+    etag = hashlib.sha1(f'{version}:{request.full_path}'.encode()).hexdigest()
+    no_modificado = _no_modificado(etag, ultima_modificacion)
+    if no_modificado:
+        return no_modificado
+    
+    ids = request.args.get('ids')
+    cursor = request.args.get('cursor')
+    if ids is not None:
+        respuesta, estado = _listar_productos_por_ids(ids)
+    elif cursor is not None:
+        respuesta, estado = _listar_productos_cursor(cursor, por_pagina, filtros, modo_total or 'omitir')
+    else:
+        orden = request.args.get('orden', 'id')
+        if orden not in ORDENES_LISTADO:
+            return jsonify({'error': 'Orden no soportado, use: ' + ', '.join(ORDENES_LISTADO)}), 400
+        respuesta = jsonify(obtener_productos_serializados(
+            pagina, por_pagina, filtros, orden, modo_total or 'aproximado', version
+        ))
+        estado = 200
+    
+    if estado != 200:
+        return respuesta, estado
+    return _con_validadores(respuesta, etag, ultima_modificacion), estado
+
+def _fila_exportacion(fila):
+    """Convertir una fila de exportación a valores serializables"""
+    return [v.isoformat() if hasattr(v, 'isoformat') else v for v in fila]
+
+def _exportar_ndjson(bloques):
+    dumps = current_app.json.dumps
+    for bloque in bloques:
+        yield ''.join(dumps(dict(zip(COLUMNAS_PRODUCTO, fila))) + '\n' for fila in bloque)
+
+def _exportar_csv(bloques):
+    salida = io.StringIO()
+    escritor = csv.writer(salida)
+    escritor.writerow(COLUMNAS_PRODUCTO)
+    yield salida.getvalue()
+    for bloque in bloques:
+        salida.seek(0)
+        salida.truncate()
+        escritor.writerows(_fila_exportacion(fila) for fila in bloque)
+        yield salida.getvalue()
+
+FORMATOS_EXPORTACION = {
+    'ndjson': (_exportar_ndjson, 'application/x-ndjson'),
+    'csv': (_exportar_csv, 'text/csv; charset=utf-8'),
+}
+
+@api.route('/productos/export', methods=['GET'])
+def exportar_productos():
+    """GET /api/productos/export?formato=ndjson|csv - Exportar el catálogo
+    
+    La respuesta se transmite por bloques a medida que se leen las filas,
+    con los mismos filtros que el listado.
+    """
+    formato = request.args.get('formato', 'ndjson')
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({'error': 'formato debe ser ndjson o csv'}), 400
+    
+    filtros, error = _leer_filtros()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    generador, mimetype = FORMATOS_EXPORTACION[formato]
+    respuesta = Response(
+        stream_with_context(generador(iterar_productos_exportacion(filtros))),
+        mimetype=mimetype
+    )
+    respuesta.headers['Content-Disposition'] = f'attachment; filename=productos.{formato}'
+    return respuesta
+
+def _leer_parametros_cambios():
+    """Leer desde y limite del feed de cambios
+
+    `desde` también se acepta en la cabecera Last-Event-ID, que el
+    navegador envía al reconectar un EventSource.
+    Retorna (desde, limite, error).
+    """
+    desde = request.args.get('desde') or request.headers.get('Last-Event-ID') or '0'
+    try:
+        desde = decodificar_desde(desde)
+    except ValueError as e:
+        return None, None, str(e)
+    
+    limite = request.args.get('limite', 100, type=int)
+    if limite < 1 or limite > MAX_CAMBIOS:
+        return None, None, f'limite debe estar entre 1 y {MAX_CAMBIOS}'
+    return desde, limite, None
+
+@api.route('/productos/cambios', methods=['GET'])
+def listar_cambios():
+    """GET /api/productos/cambios?desde=<secuencia> - Feed de cambios
+    
+    Retorna los productos creados o modificados y las eliminaciones
+    posteriores a `desde`, en orden. Con `espera=<segundos>` la petición
+    queda abierta (long-poll) hasta que haya cambios o venza el plazo.
+    """
+    desde, limite, error = _leer_parametros_cambios()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    espera = request.args.get('espera', 0, type=float)
+    # NaN pasaría las comparaciones y la espera no vencería nunca
+    if not math.isfinite(espera) or espera < 0 or espera > current_app.config['CAMBIOS_ESPERA_MAX']:
+        return jsonify({'error': f"espera debe estar entre 0 y {current_app.config['CAMBIOS_ESPERA_MAX']}"}), 400
+    
+    # La versión se lee antes que los cambios para no perder uno intermedio
+    version = obtener_version_productos()[0]
+    cambios, siguiente = obtener_cambios(desde, limite)
+    aviso = obtener_aviso_cambios()
+    if not cambios and espera and aviso is not None:
+        if not aviso.ocupar():
+            return _sin_lugar_en_el_feed()
+        try:
+            if aviso.esperar(version, espera) > version:
+                cambios, siguiente = obtener_cambios(desde, limite)
+        finally:
+            aviso.liberar()
+    
+    return jsonify({
+        'cambios': cambios,
+        'siguiente': siguiente,
+        'hay_mas': len(cambios) == limite
+    }), 200
+
+def _sin_lugar_en_el_feed():
+    """Respuesta cuando CAMBIOS_MAX_CLIENTES clientes ya esperan cambios"""
+    respuesta = jsonify({'error': 'Demasiados clientes esperando cambios, reintente más tarde'})
+    respuesta.headers['Retry-After'] = '1'
+    return respuesta, 503
+
+def _flujo_cambios(desde, limite, duracion, aviso):
+    """Eventos SSE con los cambios a medida que se confirman
+
+    Cada evento lleva como id la posición siguiente del feed. El flujo se
+    cierra tras `duracion` segundos y el cliente se reconecta con
+    Last-Event-ID, así ninguna conexión retiene un worker indefinidamente.
+    """
+    dumps = current_app.json.dumps
+    fin = time.monotonic() + duracion
+    yield 'retry: 1000\n\n'
+    while True:
+        version = obtener_version_productos()[0]
+        cambios, siguiente = obtener_cambios(desde, limite)
+        if cambios:
+            yield f'id: {siguiente}\nevent: cambios\ndata: {dumps(cambios)}\n\n'
+            desde = decodificar_desde(siguiente)
+            if len(cambios) == limite:
+                continue
+        
+        restante = fin - time.monotonic()
+        if restante <= 0:
+            return
+        if aviso.esperar(version, min(restante, LATIDO_SSE)) <= version:
+            yield ': latido\n\n'
+
+@api.route('/productos/cambios/stream', methods=['GET'])
+def flujo_cambios():
+    """GET /api/productos/cambios/stream?desde=<secuencia> - Feed de cambios por SSE"""
+    desde, limite, error = _leer_parametros_cambios()
+    if error:
+        return jsonify({'error': error}), 400
+    
+    aviso = obtener_aviso_cambios()
+    if aviso is None:
+        return jsonify({'error': 'Feed de cambios no inicializado'}), 404
+    if not aviso.ocupar():
+        return _sin_lugar_en_el_feed()
+    
+    respuesta = Response(
+        stream_with_context(_flujo_cambios(desde, limite, current_app.config['CAMBIOS_SSE_DURACION'], aviso)),
+        mimetype='text/event-stream'
+    )
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    respuesta.headers['X-Accel-Buffering'] = 'no'
+    # El lugar se libera al cerrar la respuesta, también si el cliente se va
+    respuesta.call_on_close(aviso.liberar)
+    return respuesta
+
+@api.route('/productos/estadisticas', methods=['GET'])
+def estadisticas_inventario():
+    """GET /api/productos/estadisticas - Valor total, stock y conteos de stock bajo
+    
+    Se lee el resumen mantenido en cada escritura, sin recorrer la tabla.
+    """
+    return jsonify(obtener_estadisticas()), 200
+
+@api.route('/productos/buscar', methods=['GET'])
+def buscar_productos_endpoint():
+    """GET /api/productos/buscar?q=texto - Buscar productos por nombre
+    
+    Cada palabra se busca como prefijo y los resultados se ordenan por
+    relevancia.
+    """
+    texto = request.args.get('q', '').strip()
     pagina = request.args.get('pagina', 1, type=int)
     por_pagina = request.args.get('por_pagina', 10, type=int)
     
+    if not texto:
+        return jsonify({'error': 'Parámetro q requerido'}), 400
+    
     if pagina < 1:
         return jsonify({'error': 'La página debe ser mayor a 0'}), 400
     
     if por_pagina < 1 or por_pagina > 100:
         return jsonify({'error': 'por_pagina debe estar entre 1 y 100'}), 400
     
-    paginacion = obtener_productos(pagina, por_pagina)
+    productos, total = buscar_productos(texto, pagina, por_pagina)
+    
+    return jsonify({
+        'productos': filas_a_dicts(COLUMNAS_PRODUCTO, productos),
+        'total': total,
+        'pagina': pagina,
+        'por_pagina': por_pagina
+    }), 200
+
+@api.route('/productos/<int:producto_id>', methods=['GET'])
+def obtener_producto_endpoint(producto_id):
+    """GET /api/productos/{id} - Obtener un producto por ID"""
+    existe, ultima_modificacion = obtener_fecha_actualizacion(producto_id)
+    if not existe:
+        return jsonify({'error': 'Producto no encontrado'}), 404
+    
+    marca = ultima_modificacion.isoformat() if ultima_modificacion else ''
+    etag = f'{producto_id}-{marca}'
+    no_modificado = _no_modificado(etag, ultima_modificacion)
+    if no_modificado:
+        return no_modificado
+    
+    producto = obtener_producto_serializado(producto_id, ultima_modificacion)
+    if producto is None:
+        return jsonify({'error': 'Producto no encontrado'}), 404
+    
+    return _con_validadores(jsonify({'producto': producto}), etag, ultima_modificacion), 200
+
+def _listar_productos_por_ids(ids):
+    """Respuesta de listado para una lista de ids separados por coma"""
+    try:
+        producto_ids = [int(i) for i in ids.split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'error': 'ids debe ser una lista de enteros separados por coma'}), 400
+    
+    if not producto_ids or len(producto_ids) > MAX_IDS:
+        return jsonify({'error': f'ids debe contener entre 1 y {MAX_IDS} elementos'}), 400
+    
+    productos, no_encontrados = obtener_productos_serializados_por_ids(producto_ids)
     
     return jsonify({
-        'productos': [p.to_dict() for p in paginacion.items],
-        'total': paginacion.total,
-        'pagina': paginacion.page,
-        'por_pagina': paginacion.per_page,
-        'total_paginas': paginacion.pages
+        'productos': productos,
+        'no_encontrados': no_encontrados
     }), 200
 
+def _listar_productos_cursor(cursor, por_pagina, filtros, modo_total):
+    """Respuesta de listado en modo cursor, el total solo si se pide"""
+    resultado, error = obtener_productos_cursor(
+        cursor,
+        por_pagina,
+        orden=request.args.get('orden', 'id'),
+        modo_total=modo_total,
+        filtros=filtros
+    )
+    
+    if error:
+        return jsonify({'error': error}), 400
+    
+    respuesta = {
+        'productos': filas_a_dicts(COLUMNAS_PRODUCTO, resultado['items']),
+        'por_pagina': por_pagina,
+        'orden': resultado['orden'],
+        'siguiente_cursor': resultado['siguiente_cursor']
+    }
+    if resultado['total'] is not None:
+        respuesta['total'] = resultado['total']
+    
+    return jsonify(respuesta), 200
+
 @api.route('/productos/<int:producto_id>/stock', methods=['PUT'])
 def actualizar_stock_endpoint(producto_id):
     """PUT /api/productos/{id}/stock - Actualizar stock"""
@@ -71,6 +469,116 @@ def actualizar_stock_endpoint(producto_id):
         'producto': producto.to_dict()
     }), 200
 
+@api.route('/productos/<int:producto_id>/umbral-reorden', methods=['PUT'])
+def actualizar_umbral_reorden_endpoint(producto_id):
+    """PUT /api/productos/{id}/umbral-reorden - Umbral de alerta de stock bajo
+    
+    Recibe {umbral_reorden: entero} o {umbral_reorden: null} para volver
+    al umbral global.
+    """
+    datos = request.get_json(silent=True)
+    
+    if not isinstance(datos, dict) or 'umbral_reorden' not in datos:
+        return jsonify({'error': 'Campo umbral_reorden requerido'}), 400
+    
+    producto, error = actualizar_umbral_reorden(producto_id, datos['umbral_reorden'])
+    
+    if error == "Producto no encontrado":
+        return jsonify({'error': error}), 404
+    if error:
+        return jsonify({'error': error}), 400
+    
+    return jsonify({
+        'mensaje': 'Umbral de reorden actualizado exitosamente',
+        'producto': producto.to_dict()
+    }), 200
+
+@api.route('/productos/<int:producto_id>/stock', methods=['GET'])
+def obtener_stock_endpoint(producto_id):
+    """GET /api/productos/{id}/stock?en=<fecha ISO> - Stock actual o a una fecha"""
+    en = request.args.get('en')
+    if en is None:
+        producto = obtener_producto_por_id(producto_id)
+        if not producto:
+            return jsonify({'error': 'Producto no encontrado'}), 404
+        return jsonify({'id': producto_id, 'stock': producto.stock}), 200
+    
+    try:
+        momento = datetime.fromisoformat(en)
+    except ValueError:
+        return jsonify({'error': 'Parámetro en debe ser una fecha ISO 8601'}), 400
+    if momento.tzinfo is not None:
+        # Las fechas se guardan en UTC sin zona horaria
+        momento = momento.astimezone(timezone.utc).replace(tzinfo=None)
+    
+    stock, error = obtener_stock_en(producto_id, momento)
+    if error:
+        return jsonify({'error': error}), 404
+    return jsonify({'id': producto_id, 'stock': stock, 'en': momento.isoformat()}), 200
+
+@api.route('/productos/<int:producto_id>/movimientos', methods=['GET'])
+def listar_movimientos_endpoint(producto_id):
+    """GET /api/productos/{id}/movimientos?desde_id=&limite= - Historial de stock"""
+    desde_id = request.args.get('desde_id', 0, type=int)
+    limite = request.args.get('limite', 100, type=int)
+    
+    if limite < 1 or limite > 1000:
+        return jsonify({'error': 'limite debe estar entre 1 y 1000'}), 400
+    
+    movimientos = obtener_movimientos(producto_id, desde_id, limite)
+    return jsonify({
+        'movimientos': [m.to_dict() for m in movimientos],
+        'siguiente_desde_id': movimientos[-1].id if len(movimientos) == limite else None
+    }), 200
+
+@api.route('/productos/<int:producto_id>/stock/ajuste', methods=['POST'])
+def ajustar_stock_endpoint(producto_id):
+    """POST /api/productos/{id}/stock/ajuste - Sumar un delta al stock"""
+    datos = request.get_json(silent=True)
+    
+    if not datos or 'delta' not in datos:
+        return jsonify({'error': 'Campo delta requerido'}), 400
+    
+    delta = datos.get('delta')
+    if not isinstance(delta, int) or isinstance(delta, bool):
+        return jsonify({'error': 'El delta debe ser un número entero'}), 400
+    if not ENTERO_MIN <= delta <= ENTERO_MAX:
+        return jsonify({'error': 'El delta está fuera del rango de enteros de 64 bits'}), 400
+    
+    nuevo_stock, error = ajustar_stock(producto_id, delta)
+    
+    if error == "Producto no encontrado":
+        return jsonify({'error': error}), 404
+    if error:
+        return jsonify({'error': error}), 409
+    
+    return jsonify({
+        'mensaje': 'Stock ajustado exitosamente',
+        'id': producto_id,
+        'stock': nuevo_stock
+    }), 200
+
+@api.route('/productos/stock', methods=['PATCH'])
+def ajustar_stock_lote_endpoint():
+    """PATCH /api/productos/stock - Ajustar stock de varios productos
+    
+    Recibe un arreglo de {id, stock} o {id, delta} que se aplica en una
+    sola transacción.
+    """
+    entradas = request.get_json(silent=True)
+    
+    if not isinstance(entradas, list) or not entradas:
+        return jsonify({'error': 'Se requiere un arreglo JSON de ajustes'}), 400
+    
+    resultado = ajustar_stock_lote(entradas)
+    
+    return jsonify({
+        'mensaje': 'Ajuste de stock procesado',
+        'actualizados': resultado['actualizados'],
+        'no_encontrados': resultado['no_encontrados'],
+        'rechazados': resultado['rechazados']
+    }), 200
+
 @api.route('/productos/<int:producto_id>', methods=['DELETE'])
 def eliminar_producto_endpoint(producto_id):
     """DELETE /api/productos/{id} - Eliminar producto"""
@@ -81,6 +589,62 @@ def eliminar_producto_endpoint(producto_id):
     
     return jsonify({'mensaje': 'Producto eliminado exitosamente'}), 200
 
+@api.route('/cache', methods=['GET'])
+def estadisticas_cache():
+    """GET /api/cache - Contadores de aciertos y fallos de la caché"""
+    cache = obtener_cache()
+    if cache is None:
+        return jsonify({'error': 'Caché no inicializada'}), 404
+    return jsonify(cache.estadisticas()), 200
+
+def _metricas_adicionales():
+    """Contadores de la caché, las alertas y el escritor agrupado para /api/metricas"""
+    extras = []
+    cache = obtener_cache()
+    if cache is not None:
+        estadisticas = cache.estadisticas()
+        extras += [
+            ('inventario_cache_aciertos_total', 'counter', 'Aciertos de la caché', estadisticas['aciertos']),
+            ('inventario_cache_fallos_total', 'counter', 'Fallos de la caché', estadisticas['fallos']),
+            ('inventario_cache_entradas', 'gauge', 'Entradas en la caché', estadisticas['entradas']),
+        ]
+    aviso = obtener_aviso_cambios()
+    if aviso is not None:
+        extras.append(('inventario_cambios_esperando', 'gauge', 'Clientes esperando cambios', aviso.esperando))
+        extras.append(('inventario_cambios_clientes', 'gauge', 'Clientes del long-poll y del flujo SSE',
+                       aviso.clientes))
+    replicas = obtener_replicas()
+    if replicas is not None:
+        extras.append(('inventario_replicas_sanas', 'gauge', 'Réplicas de lectura sanas',
+                       sum(replicas.estado().values())))
+    alertas = obtener_procesador_alertas()
+    if alertas is not None:
+        extras += [
+            ('inventario_alertas_enviadas_total', 'counter', 'Alertas de stock entregadas al sumidero',
+             alertas.enviados),
+            ('inventario_alertas_errores_total', 'counter', 'Alertas de stock que el sumidero rechazó',
+             alertas.errores),
+        ]
+    escritor = obtener_escritor()
+    if escritor is not None:
+        extras += [
+            ('inventario_escritura_lotes_total', 'counter', 'Commits del escritor agrupado', escritor.lotes),
+            ('inventario_escritura_operaciones_total', 'counter', 'Operaciones del escritor agrupado',
+             escritor.operaciones),
+        ]
+    return extras
+
+@api.route('/metricas', methods=['GET'])
+def metricas_endpoint():
+    """GET /api/metricas - Métricas del proceso en formato de Prometheus"""
+    metricas = obtener_metricas()
+    if metricas is None:
+        return jsonify({'error': 'Métricas desactivadas'}), 404
+    return Response(
+        metricas.exportar(_metricas_adicionales()),
+        mimetype='text/plain; version=0.0.4'
+    ), 200
+
 @api.route('/health', methods=['GET'])
 def health_check():
     """Endpoint de health check para pruebas"""
@@ -0,0 +1,232 @@
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from itertools import accumulate
+from sqlalchemy import func, insert, literal, select
+from inventario.models import db, Producto, MovimientoStock, SnapshotStock, ProductoEliminado
+from inventario.busqueda import crear_indice_fts
+from inventario.database import (
+    _es_memoria, _marcar_modificados, _confirmar, recalcular_estadisticas, obtener_version_productos
+)
+
+# Categorías con su rango de precio, para que los precios sean verosímiles
+CATEGORIAS = [
+    ('Laptop', 450.0, 2500.0),
+    ('Monitor', 120.0, 900.0),
+    ('Teclado', 15.0, 180.0),
+    ('Mouse', 8.0, 120.0),
+    ('Auriculares', 12.0, 350.0),
+    ('Cámara web', 25.0, 200.0),
+    ('Impresora', 90.0, 600.0),
+    ('Router', 30.0, 400.0),
+    ('Disco SSD', 35.0, 450.0),
+    ('Memoria RAM', 25.0, 300.0),
+    ('Tablet', 150.0, 1300.0),
+    ('Cable USB-C', 3.0, 40.0),
+    ('Adaptador HDMI', 5.0, 45.0),
+    ('Parlante', 20.0, 400.0),
+    ('Silla gamer', 120.0, 700.0),
+]
+MARCAS = ['HP', 'Dell', 'Lenovo', 'Logitech', 'Samsung', 'Asus', 'Acer', 'Kingston', 'TP-Link', 'Sony',
+          'LG', 'Xiaomi', 'Razer', 'Corsair', 'Epson']
+SERIES = ['Pro', 'Air', 'Max', 'Lite', 'Plus', 'Ultra', 'Mini', 'X', 'S', 'Go']
+
+# Pragmas de la conexión de carga: sin fsync ni journal en disco
+PRAGMAS_CARGA = {
+    'journal_mode': 'MEMORY',
+    'synchronous': 'OFF',
+    'cache_size': -262144,
+    'temp_store': 'MEMORY',
+}
+
+TAMANO_LOTE_SEMILLA = 50000
+
+# Período que cubren las fechas de creación
+INICIO_FECHAS = datetime(2023, 1, 1)
+DIAS_FECHAS = 730
+
+# Tablas precalculadas: formatear fechas con datetime fila a fila es lo
+# más caro de la generación
+_PREFIJOS = [
+    (f'{categoria} {marca} {serie} ', minimo, maximo - minimo)
+    for categoria, minimo, maximo in CATEGORIAS for marca in MARCAS for serie in SERIES
+]
+_MODELOS = [str(m) for m in range(100, 10000)]
+_STOCKS = range(500)
+_STOCKS_ACUMULADOS = list(accumulate(1 / (1 + s) for s in _STOCKS))
+_DIAS = [(INICIO_FECHAS + timedelta(days=d)).strftime('%Y-%m-%d ') for d in range(DIAS_FECHAS + 1)]
+_HORAS = [f'{h:02d}:{m:02d}:{s:02d}.000000' for h in range(24) for m in range(60) for s in range(60)]
+
+def generar_lote(semilla, desde, n, filas):
+    """Generar las filas [desde, desde + n) de un catálogo de `filas` productos
+
+    Retorna tuplas (nombre, precio, stock, fecha) con la fecha en el formato
+    del tipo DateTime de SQLAlchemy en SQLite. Cada lote usa su propio
+    generador aleatorio, así el resultado es el mismo sin importar cuántos
+    procesos generen los lotes. Las fechas crecen con la fila y el stock se
+    concentra en valores bajos, como en un catálogo real.
+    """
+    aleatorio = random.Random(f'{semilla}:{desde}')
+    paso = DIAS_FECHAS * 86400 / max(filas, 1)
+    segundos = [int(paso * i) for i in range(desde, desde + n)]
+    fechas = [_DIAS[s // 86400] + _HORAS[s % 86400] for s in segundos]
+    return [
+        (prefijo + modelo, round(minimo + rango * sorteo * sorteo, 2), stock, fecha)
+        for (prefijo, minimo, rango), modelo, sorteo, stock, fecha in zip(
+            aleatorio.choices(_PREFIJOS, k=n),
+            aleatorio.choices(_MODELOS, k=n),
+            [aleatorio.random() for _ in range(n)],
+            aleatorio.choices(_STOCKS, cum_weights=_STOCKS_ACUMULADOS, k=n),
+            fechas
+        )
+    ]
+
+def _generar_lote(args):
+    return generar_lote(*args)
+
+def generar_lotes(filas, semilla=0, tamano_lote=TAMANO_LOTE_SEMILLA, procesos=1):
+    """Generar el catálogo en lotes, en paralelo si `procesos` > 1
+
+    La generación en Python es más lenta que la inserción, por lo que con
+    varios procesos el hilo principal solo inserta.
+    """
+    argumentos = [(semilla, desde, min(tamano_lote, filas - desde), filas)
+                  for desde in range(0, filas, tamano_lote)]
+    if procesos <= 1 or len(argumentos) <= 1:
+        yield from map(_generar_lote, argumentos)
+        return
+
+    # Solo se adelantan unos pocos lotes para no acumular el catálogo en memoria
+    with ProcessPoolExecutor(procesos) as ejecutor:
+        pendientes = deque()
+        for args in argumentos:
+            pendientes.append(ejecutor.submit(generar_lote, *args))
+            if len(pendientes) > 2 * procesos:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+def _insertar_sqlite(cursor, lotes, secuencia):
+    sentencia = ('INSERT INTO productos (nombre, precio, stock, fecha_creacion, fecha_actualizacion, secuencia) '
+                 f'VALUES (?1, ?2, ?3, ?4, ?4, {int(secuencia)})')
+    for lote in lotes:
+        cursor.executemany(sentencia, lote)
+
+def _insertar_snapshots_sqlite(cursor, ultimo_id):
+    cursor.execute(
+        'INSERT INTO snapshots_stock (producto_id, movimiento_id, stock, fecha) '
+        'SELECT id, 0, stock, fecha_creacion FROM productos WHERE id > ?',
+        (ultimo_id,)
+    )
+
+def _marcar_eliminados_sqlite(cursor, secuencia):
+    """Una marca de eliminación por producto existente, para el feed de cambios"""
+    ahora = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S.%f')
+    cursor.execute(
+        'INSERT INTO productos_eliminados (producto_id, secuencia, fecha) '
+        f'SELECT id, {int(secuencia)}, ? FROM productos',
+        (ahora,)
+    )
+
+def _sembrar_sqlite(app, lotes, reemplazar, secuencia, tiempos):
+    """Carga directa con el driver: pragmas de carga, sin índices ni triggers
+
+    Los índices secundarios y el índice FTS se eliminan antes de insertar y
+    se reconstruyen al final en una sola pasada, que es mucho más rápido que
+    mantenerlos fila a fila. En lugar de un movimiento por producto, el
+    stock inicial se registra con un snapshot en la misma transacción.
+    """
+    inicio = time.perf_counter()
+    indices = list(Producto.__table__.indexes)
+    conexion = db.engine.raw_connection()
+    try:
+        cursor = conexion.cursor()
+        for nombre, valor in PRAGMAS_CARGA.items():
+            cursor.execute(f'PRAGMA {nombre}={valor}')
+
+        cursor.execute('BEGIN')
+        cursor.execute('DROP TABLE IF EXISTS productos_fts')
+        for sufijo in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS productos_fts_{sufijo}')
+        for indice in indices:
+            cursor.execute(f'DROP INDEX IF EXISTS {indice.name}')
+        if reemplazar:
+            _marcar_eliminados_sqlite(cursor, secuencia)
+            for tabla in ('productos', 'movimientos_stock', 'snapshots_stock'):
+                cursor.execute(f'DELETE FROM {tabla}')
+
+        ultimo_id = cursor.execute('SELECT coalesce(max(id), 0) FROM productos').fetchone()[0]
+        _insertar_sqlite(cursor, lotes, secuencia)
+        _insertar_snapshots_sqlite(cursor, ultimo_id)
+        conexion.commit()
+    finally:
+        conexion.close()
+    # Se descarta la conexión de carga para que las siguientes vuelvan a
+    # abrirse con los pragmas del perfil (una base en memoria se perdería)
+    if not _es_memoria(app.config['SQLALCHEMY_DATABASE_URI']):
+        db.engine.dispose()
+
+    tiempos['carga'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with db.engine.begin() as conexion_sa:
+        for indice in indices:
+            indice.create(conexion_sa, checkfirst=True)
+        crear_indice_fts(conexion_sa)
+    tiempos['indices'] = time.perf_counter() - inicio
+
+def _sembrar_generico(lotes, reemplazar, secuencia, tiempos):
+    inicio = time.perf_counter()
+    if reemplazar:
+        db.session.execute(insert(ProductoEliminado).from_select(
+            ['producto_id', 'secuencia', 'fecha'],
+            select(Producto.id, literal(secuencia), literal(datetime.utcnow()))
+        ))
+        for modelo in (Producto, MovimientoStock, SnapshotStock):
+            db.session.execute(modelo.__table__.delete())
+    ultimo_id = db.session.execute(select(func.coalesce(func.max(Producto.id), 0))).scalar()
+    for lote in lotes:
+        filas = []
+        for nombre, precio, stock, fecha in lote:
+            fecha = datetime.fromisoformat(fecha)
+            filas.append({'nombre': nombre, 'precio': precio, 'stock': stock,
+                          'fecha_creacion': fecha, 'fecha_actualizacion': fecha, 'secuencia': secuencia})
+        db.session.execute(insert(Producto), filas)
+    db.session.execute(insert(SnapshotStock).from_select(
+        ['producto_id', 'movimiento_id', 'stock', 'fecha'],
+        select(Producto.id, literal(0), Producto.stock, Producto.fecha_creacion).where(Producto.id > ultimo_id)
+    ))
+    db.session.commit()
+    tiempos['carga'] = time.perf_counter() - inicio
+    tiempos['indices'] = 0.0
+
+def sembrar(app, filas, semilla=0, tamano_lote=TAMANO_LOTE_SEMILLA, reemplazar=False, procesos=1):
+    """Cargar `filas` productos sintéticos en la base de datos de `app`
+
+    Con `reemplazar` se eliminan antes los productos existentes y su
+    historial de stock, dejando una marca de eliminación por producto para
+    que los consumidores del feed de cambios se enteren de las bajas; con
+    `procesos` > 1 los datos se generan en paralelo. Las filas cargadas y
+    las marcas comparten la secuencia del feed de cambios que produce el
+    incremento final de la versión de la tabla; luego se invalida la caché y se recalculan el
+    contador de filas y el resumen de inventario.
+    Retorna {'carga', 'indices'} con los segundos de la inserción (incluida
+    la generación de datos) y de la reconstrucción de índices.
+    """
+    lotes = generar_lotes(filas, semilla, tamano_lote, procesos)
+    tiempos = {}
+    with app.app_context():
+        secuencia = obtener_version_productos()[0] + 1
+        db.session.remove()
+        if db.engine.dialect.name == 'sqlite':
+            _sembrar_sqlite(app, lotes, reemplazar, secuencia, tiempos)
+        else:
+            _sembrar_generico(lotes, reemplazar, secuencia, tiempos)
+
+        _marcar_modificados()
+        _confirmar()
+        recalcular_estadisticas()
+        db.session.remove()
+    return tiempos
\ No newline at end of file
@@ -0,0 +1,57 @@
+from datetime import date, datetime
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depende del entorno
+    orjson = None
+
+def _por_defecto(obj):
+    """Serializar tipos no nativos de JSON
+
+    Las fechas se emiten en ISO 8601, igual que orjson, para que la salida
+    no dependa del backend disponible.
+    """
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+class ProveedorJSON(DefaultJSONProvider):
+    """Proveedor JSON de Flask que usa orjson cuando está instalado
+
+    orjson serializa dicts, listas y fechas en C y produce bytes, que se
+    usan directamente como cuerpo de la respuesta. Sin orjson se usa el
+    módulo json estándar con la misma salida.
+    """
+    default = staticmethod(_por_defecto)
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_por_defecto, option=orjson.OPT_SORT_KEYS).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None or self._app.debug or self.compact is False:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        cuerpo = orjson.dumps(
+            obj,
+            default=_por_defecto,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE
+        )
+        return self._app.response_class(cuerpo, mimetype=self.mimetype)
+
+def filas_a_dicts(columnas, filas):
+    """Construir diccionarios de respuesta directamente desde tuplas
+
+    Evita crear objetos ORM y llamar a to_dict por fila; las fechas se
+    dejan como datetime para que el proveedor JSON las serialice.
+    """
+    return [dict(zip(columnas, fila)) for fila in filas]
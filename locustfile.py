@@ -85,6 +85,24 @@ class InventarioUser(HttpUser):
                 else:
                     update_response.failure(f"Status: {update_response.status_code}")
     
+    @task(2)
+    def ajustar_stock(self):
+        """Tarea: Ajustar stock con delta atómico (peso 2)"""
+        if not getattr(self, 'producto_id', None):
+            return
+        
+        with self.client.post(
+            f"/api/productos/{self.producto_id}/stock/ajuste",
+            json={'delta': random.choice([-1, 1])},
+            catch_response=True,
+            name="/api/productos/{id}/stock/ajuste [POST]"
+        ) as response:
+            # 409 (stock insuficiente) y 404 (eliminado) son respuestas válidas
+            if response.status_code in (200, 404, 409):
+                response.success()
+            else:
+                response.failure(f"Status: {response.status_code}")
+    
     @task(1)
     def eliminar_producto(self):
         """Tarea: Eliminar producto (peso 1)"""
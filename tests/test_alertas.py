@@ -0,0 +1,251 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from inventario.alertas import (
+    ProcesadorAlertas, SumideroAlertas, SumideroArchivo, SumideroCola, SumideroWebhook
+)
+from inventario.app import crear_app
+from inventario.database import (
+    crear_producto, crear_productos_lote, actualizar_stock, ajustar_stock, ajustar_stock_lote,
+    actualizar_umbral_reorden, eliminar_producto
+)
+from inventario.models import db
+
+@pytest.fixture
+def app_alertas():
+    """Aplicación con alertas de stock hacia una cola en proceso"""
+    app = crear_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+        'ALERTAS_SUMIDERO': 'cola',
+        'UMBRAL_STOCK_BAJO': 5
+    })
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+    app.extensions['inventario_alertas'].detener()
+
+def _recibidas(app):
+    """Eventos entregados a la cola tras vaciar el procesador"""
+    procesador = app.extensions['inventario_alertas']
+    procesador.detener()
+    procesador.iniciar()
+    eventos = []
+    while True:
+        evento = procesador.sumidero.obtener(timeout=0)
+        if evento is None:
+            return eventos
+        eventos.append(evento)
+
+def _crear(stock, umbral=None):
+    datos = {'nombre': 'Producto', 'precio': 10.0, 'stock': stock}
+    if umbral is not None:
+        datos['umbral_reorden'] = umbral
+    producto, _ = crear_producto(datos)
+    return producto.id
+
+def test_alerta_al_cruzar_umbral_global(app_alertas):
+    """Prueba que actualizar_stock alerta al bajar al umbral global"""
+    producto_id = _crear(10)
+    actualizar_stock(producto_id, 6)
+    assert _recibidas(app_alertas) == []
+    
+    actualizar_stock(producto_id, 5)
+    eventos = _recibidas(app_alertas)
+    assert len(eventos) == 1
+    assert eventos[0]['tipo'] == 'stock_bajo'
+    assert eventos[0]['producto_id'] == producto_id
+    assert (eventos[0]['stock_anterior'], eventos[0]['stock'], eventos[0]['umbral']) == (6, 5, 5)
+
+def test_alerta_solo_en_el_cruce(app_alertas):
+    """Prueba que un producto que sigue bajo no vuelve a alertar hasta reponerse"""
+    producto_id = _crear(10)
+    ajustar_stock(producto_id, -6)
+    ajustar_stock(producto_id, -1)
+    assert len(_recibidas(app_alertas)) == 1
+    
+    actualizar_stock(producto_id, 20)
+    actualizar_stock(producto_id, 0)
+    assert len(_recibidas(app_alertas)) == 1
+
+def test_alerta_con_umbral_por_producto(app_alertas):
+    """Prueba que el umbral de reorden del producto reemplaza al global"""
+    producto_id = _crear(100, umbral=50)
+    ajustar_stock(producto_id, -40)
+    assert _recibidas(app_alertas) == []
+    
+    ajustar_stock(producto_id, -10)
+    eventos = _recibidas(app_alertas)
+    assert [(e['stock'], e['umbral']) for e in eventos] == [(50, 50)]
+
+def test_alerta_en_altas(app_alertas):
+    """Prueba que un alta con stock bajo alerta, también en lote"""
+    alto = _crear(10)
+    bajo = _crear(2)
+    creados, _ = crear_productos_lote([
+        {'nombre': 'A', 'precio': 1.0, 'stock': 0},
+        {'nombre': 'B', 'precio': 1.0, 'stock': 30, 'umbral_reorden': 40},
+        {'nombre': 'C', 'precio': 1.0, 'stock': 30},
+    ])
+    assert creados == 3
+    
+    eventos = _recibidas(app_alertas)
+    assert [e['producto_id'] for e in eventos] == [bajo, alto + 2, alto + 3]
+    assert all(e['stock_anterior'] is None for e in eventos)
+
+def test_alerta_en_ajuste_por_lote(app_alertas):
+    """Prueba que ajustar_stock_lote evalúa el umbral de cada producto"""
+    a = _crear(10)
+    b = _crear(10, umbral=8)
+    c = _crear(10)
+    resultado = ajustar_stock_lote([
+        {'id': a, 'stock': 1},
+        {'id': b, 'delta': -2},
+        {'id': c, 'delta': -2},
+    ])
+    assert sorted(resultado['actualizados']) == [a, b, c]
+    
+    eventos = sorted(_recibidas(app_alertas), key=lambda e: e['producto_id'])
+    assert [(e['producto_id'], e['stock']) for e in eventos] == [(a, 1), (b, 8)]
+
+def test_sin_alertas_en_bajas_ni_rollback(app_alertas):
+    """Prueba que ni la eliminación ni una transacción revertida alertan"""
+    producto_id = _crear(10)
+    eliminar_producto(producto_id)
+    
+    def entradas():
+        yield {'nombre': 'Agotado', 'precio': 1.0, 'stock': 0}
+        raise ValueError('lectura interrumpida')
+    
+    with pytest.raises(ValueError):
+        crear_productos_lote(entradas(), tamano_lote=1)
+    assert 'alertas_stock' not in db.session.info
+    assert _recibidas(app_alertas) == []
+
+def test_cambio_de_umbral_alerta_si_el_stock_queda_bajo(app_alertas):
+    """Prueba que subir el umbral por encima del stock alerta una vez"""
+    producto_id = _crear(20)
+    producto, error = actualizar_umbral_reorden(producto_id, 25)
+    assert error is None
+    assert producto.umbral_reorden == 25
+    actualizar_umbral_reorden(producto_id, 30)
+    
+    eventos = _recibidas(app_alertas)
+    assert [(e['stock'], e['umbral']) for e in eventos] == [(20, 25)]
+
+def test_cambio_de_umbral_invalido(app_alertas):
+    """Prueba las validaciones de actualizar_umbral_reorden"""
+    producto_id = _crear(20)
+    assert actualizar_umbral_reorden(producto_id, -1)[1] == \
+        "El umbral de reorden debe ser un entero mayor o igual a 0"
+    assert actualizar_umbral_reorden(producto_id, True)[1] is not None
+    assert actualizar_umbral_reorden(9999, 3)[1] == "Producto no encontrado"
+    assert actualizar_umbral_reorden(producto_id, None)[0].umbral_reorden is None
+
+def test_sin_sumidero_no_hay_procesador(app):
+    """Prueba que sin ALERTAS_SUMIDERO las escrituras no anotan alertas"""
+    assert 'inventario_alertas' not in app.extensions
+    producto_id = _crear(10)
+    actualizar_stock(producto_id, 0)
+    assert 'alertas_stock' not in db.session.info
+
+def test_endpoint_umbral_reorden(client):
+    """Prueba PUT /api/productos/{id}/umbral-reorden"""
+    respuesta = client.post('/api/productos', json={'nombre': 'P', 'precio': 1.0, 'stock': 3})
+    producto_id = respuesta.get_json()['producto']['id']
+    
+    respuesta = client.put(f'/api/productos/{producto_id}/umbral-reorden', json={'umbral_reorden': 2})
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()['producto']['umbral_reorden'] == 2
+    
+    respuesta = client.put(f'/api/productos/{producto_id}/umbral-reorden', json={'umbral_reorden': 'dos'})
+    assert respuesta.status_code == 400
+    respuesta = client.put(f'/api/productos/{producto_id}/umbral-reorden', json={})
+    assert respuesta.status_code == 400
+    respuesta = client.put('/api/productos/9999/umbral-reorden', json={'umbral_reorden': None})
+    assert respuesta.status_code == 404
+
+def test_metricas_de_alertas(app_alertas):
+    """Prueba que /api/metricas expone los contadores del procesador"""
+    actualizar_stock(_crear(10), 0)
+    _recibidas(app_alertas)
+    
+    texto = app_alertas.test_client().get('/api/metricas').get_data(as_text=True)
+    assert 'inventario_alertas_enviadas_total 1' in texto
+    assert 'inventario_alertas_errores_total 0' in texto
+
+def test_procesador_agrupa_en_lotes():
+    """Prueba que el procesador envía los eventos en lotes de max_lote"""
+    class SumideroLotes(SumideroAlertas):
+        def __init__(self):
+            self.lotes = []
+    
+        def enviar(self, eventos):
+            self.lotes.append(list(eventos))
+    
+    sumidero = SumideroLotes()
+    procesador = ProcesadorAlertas(sumidero, max_lote=2)
+    procesador.publicar([{'n': i} for i in range(5)])
+    procesador.iniciar()
+    procesador.detener()
+    
+    assert [len(lote) for lote in sumidero.lotes] == [2, 2, 1]
+    assert procesador.enviados == 5
+
+def test_procesador_registra_errores_del_sumidero():
+    """Prueba que un sumidero que falla no detiene el procesador"""
+    class SumideroCaido(SumideroAlertas):
+        def enviar(self, eventos):
+            raise OSError('sin conexión')
+    
+    procesador = ProcesadorAlertas(SumideroCaido())
+    procesador.iniciar()
+    procesador.publicar([{'n': 1}, {'n': 2}])
+    procesador.detener()
+    assert (procesador.enviados, procesador.errores) == (0, 2)
+
+def test_sumidero_cola_descarta_si_esta_llena():
+    """Prueba que la cola llena descarta eventos en lugar de bloquear"""
+    sumidero = SumideroCola(max_eventos=1)
+    sumidero.enviar([{'n': 1}, {'n': 2}])
+    assert sumidero.obtener(timeout=0) == {'n': 1}
+    assert sumidero.obtener(timeout=0) is None
+    assert sumidero.descartados == 1
+
+def test_sumidero_archivo(tmp_path):
+    """Prueba que el sumidero de archivo añade una línea JSON por evento"""
+    ruta = tmp_path / 'alertas.ndjson'
+    sumidero = SumideroArchivo(ruta)
+    sumidero.enviar([{'producto_id': 1}])
+    sumidero.enviar([{'producto_id': 2}])
+    
+    lineas = ruta.read_text(encoding='utf-8').splitlines()
+    assert [json.loads(l)['producto_id'] for l in lineas] == [1, 2]
+
+def test_sumidero_webhook():
+    """Prueba que el webhook recibe los eventos del lote en un POST JSON"""
+    recibidos = []
+    
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            longitud = int(self.headers['Content-Length'])
+            recibidos.append(json.loads(self.rfile.read(longitud)))
+            self.send_response(204)
+            self.end_headers()
+    
+        def log_message(self, *args):
+            pass
+    
+    servidor = HTTPServer(('127.0.0.1', 0), Manejador)
+    hilo = threading.Thread(target=servidor.handle_request)
+    hilo.start()
+    try:
+        SumideroWebhook(f'http://127.0.0.1:{servidor.server_port}/alertas').enviar([{'producto_id': 7}])
+        hilo.join(5)
+    finally:
+        servidor.server_close()
+    
+    assert recibidos == [{'eventos': [{'producto_id': 7}]}]
@@ -0,0 +1,84 @@
+import pytest
+import asyncio
+import json
+import time
+
+a2wsgi = pytest.importorskip('a2wsgi')
+
+from inventario.asgi import crear_app_asgi
+
+async def _llamar(app, metodo, ruta, cuerpo=b''):
+    """Ejecutar una petición HTTP contra una aplicación ASGI"""
+    ruta, _, consulta = ruta.partition('?')
+    mensajes = []
+    recibido = False
+    
+    async def recibir():
+        nonlocal recibido
+        if recibido:
+            return {'type': 'http.disconnect'}
+        recibido = True
+        return {'type': 'http.request', 'body': cuerpo, 'more_body': False}
+    
+    async def enviar(mensaje):
+        mensajes.append(mensaje)
+    
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': metodo, 'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(),
+        'query_string': consulta.encode(), 'root_path': '', 'server': ('testserver', 80),
+        'client': ('127.0.0.1', 1234),
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(cuerpo)).encode())
+        ]
+    }
+    await app(scope, recibir, enviar)
+    estado = mensajes[0]['status']
+    datos = b''.join(m.get('body', b'') for m in mensajes[1:])
+    return estado, json.loads(datos)
+
+def test_asgi_crear_y_listar():
+    """Prueba la API servida a través del adaptador ASGI"""
+    app = crear_app_asgi({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    producto = json.dumps({'nombre': 'ASGI', 'precio': 1, 'stock': 1}).encode()
+    
+    estado, datos = asyncio.run(_llamar(app, 'POST', '/api/productos', producto))
+    assert estado == 201
+    
+    estado, datos = asyncio.run(_llamar(app, 'GET', '/api/productos'))
+    assert estado == 200
+    assert datos['total'] == 1
+
+def test_asgi_clientes_del_feed_no_agotan_los_hilos(tmp_path):
+    """Prueba que los long-poll ocupan como mucho la mitad del pool y /api/health sigue respondiendo"""
+    app = crear_app_asgi({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'asgi.db'}",
+        'ASGI_HILOS': 4
+    })
+    
+    async def health_tras_espera():
+        await asyncio.sleep(0.2)
+        inicio = time.perf_counter()
+        estado, _ = await _llamar(app, 'GET', '/api/health')
+        return estado, time.perf_counter() - inicio
+    
+    async def todas():
+        return await asyncio.gather(
+            health_tras_espera(),
+            *(_llamar(app, 'GET', '/api/productos/cambios?desde=0&espera=2') for _ in range(6))
+        )
+    
+    (estado_health, duracion), *long_polls = asyncio.run(todas())
+    assert estado_health == 200
+    assert duracion < 1
+    assert sorted(estado for estado, _ in long_polls) == [200, 200, 503, 503, 503, 503]
+
+def test_asgi_acota_las_esperas_del_feed():
+    """Prueba que el modo ASGI acota el long-poll y la duración del flujo SSE"""
+    app = crear_app_asgi({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'CAMBIOS_SSE_DURACION': 600})
+    config = app.app.config
+    
+    assert config['CAMBIOS_ESPERA_MAX'] == 30
+    assert config['CAMBIOS_SSE_DURACION'] == 60
+    assert app.app.extensions['inventario_cambios'].max_clientes == 32
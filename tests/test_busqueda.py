@@ -0,0 +1,58 @@
+import pytest
+from inventario.busqueda import buscar_productos, consulta_fts
+from inventario.database import (
+    crear_producto, crear_productos_lote, eliminar_producto
+)
+from inventario.models import db, Producto
+
+def _nombres(productos):
+    return [p.nombre for p in productos]
+
+def test_consulta_fts_prefijos_citados():
+    """Prueba que cada término se cita y se busca como prefijo"""
+    assert consulta_fts('lap "hp') == '"lap"* """hp"*'
+
+def test_buscar_productos_por_prefijo(app):
+    """Prueba búsqueda por prefijo de palabras del nombre"""
+    with app.app_context():
+        crear_producto({'nombre': 'Laptop HP Pavilion', 'precio': 900.0, 'stock': 1})
+        crear_producto({'nombre': 'Mouse inalámbrico HP', 'precio': 20.0, 'stock': 5})
+        crear_producto({'nombre': 'Teclado mecánico', 'precio': 60.0, 'stock': 3})
+        
+        productos, total = buscar_productos('hp')
+        assert total == 2
+        assert set(_nombres(productos)) == {'Laptop HP Pavilion', 'Mouse inalámbrico HP'}
+        
+        productos, total = buscar_productos('lap pav')
+        assert _nombres(productos) == ['Laptop HP Pavilion']
+        
+        # Sin distinguir acentos
+        productos, _ = buscar_productos('mecanico')
+        assert _nombres(productos) == ['Teclado mecánico']
+
+def test_buscar_productos_sincronizado_con_escrituras(app):
+    """Prueba que el índice sigue a inserciones masivas, cambios y borrados"""
+    with app.app_context():
+        crear_productos_lote([{'nombre': f'Cable USB {i}', 'precio': 1.0} for i in range(15)])
+        productos, total = buscar_productos('cable', pagina=2, por_pagina=10)
+        assert total == 15
+        assert len(productos) == 5
+        
+        producto = Producto.query.filter_by(nombre='Cable USB 0').first()
+        producto.nombre = 'Adaptador HDMI'
+        db.session.commit()
+        eliminar_producto(productos[0].id)
+        
+        assert buscar_productos('cable')[1] == 13
+        assert _nombres(buscar_productos('adaptador')[0]) == ['Adaptador HDMI']
+
+def test_buscar_productos_sin_fts(app):
+    """Prueba la búsqueda alternativa para motores sin FTS5"""
+    with app.app_context():
+        crear_producto({'nombre': 'Laptop 100%', 'precio': 900.0, 'stock': 1})
+        crear_producto({'nombre': 'Laptop 100', 'precio': 900.0, 'stock': 1})
+        app.extensions['inventario_fts'] = False
+        
+        productos, total = buscar_productos('LAPTOP 100%')
+        assert total == 1
+        assert _nombres(productos) == ['Laptop 100%']
@@ -0,0 +1,90 @@
+import pytest
+import time
+from inventario.app import crear_app
+from inventario.cache import Cache, CacheLRU, CacheNula
+from inventario.models import db
+
+def test_cache_lru_expulsa_menos_usado():
+    """Prueba que la LRU expulsa la entrada menos usada al llenarse"""
+    backend = CacheLRU(max_entradas=2)
+    backend.guardar('a', 1)
+    backend.guardar('b', 2)
+    backend.obtener('a')
+    backend.guardar('c', 3)
+    
+    assert backend.obtener('a') == 1
+    assert backend.obtener('b') is None
+    assert backend.obtener('c') == 3
+    assert len(backend) == 2
+
+def test_cache_lru_expira_por_ttl():
+    """Prueba que las entradas expiran tras su TTL"""
+    backend = CacheLRU()
+    backend.guardar('a', 1, ttl=0.01)
+    time.sleep(0.02)
+    assert backend.obtener('a') is None
+
+def test_cache_read_through_cuenta_aciertos():
+    """Prueba que la caché carga una sola vez y cuenta aciertos y fallos"""
+    cache = Cache(CacheLRU())
+    llamadas = []
+    
+    def cargar():
+        llamadas.append(1)
+        return {'id': 1}
+    
+    assert cache.obtener_o_cargar('productos:1', cargar) == {'id': 1}
+    assert cache.obtener_o_cargar('productos:1', cargar) == {'id': 1}
+    
+    assert len(llamadas) == 1
+    estadisticas = cache.estadisticas()
+    assert estadisticas['aciertos'] == 1
+    assert estadisticas['fallos'] == 1
+
+def test_cache_no_guarda_valores_no_vigentes():
+    """Prueba que un valor cargado tras una escritura no se guarda bajo la clave anterior"""
+    cache = Cache(CacheLRU())
+    assert cache.obtener_o_cargar('a', lambda: 1, lambda _: False) == 1
+    assert cache.obtener_o_cargar('a', lambda: 2, lambda _: True) == 2
+    assert cache.obtener_o_cargar('a', lambda: 3) == 2
+    
+    valores = cache.obtener_varios_o_cargar(
+        [1, 2], lambda i: f'v:{i}', lambda ids: {i: i * 10 for i in ids}, lambda i, _: i == 1
+    )
+    assert valores == {1: 10, 2: 20}
+    assert cache.backend.obtener('v:1') == 10
+    assert cache.backend.obtener('v:2') is None
+
+def test_cache_nula_no_guarda():
+    """Prueba que el backend nulo desactiva la caché"""
+    cache = Cache(CacheNula())
+    cache.obtener_o_cargar('a', lambda: 1)
+    assert cache.obtener_o_cargar('a', lambda: 2) == 2
+
+def test_cache_entre_procesos_ve_escrituras_de_otro(tmp_path):
+    """Prueba que dos aplicaciones sobre la misma base no sirven datos antiguos de su caché"""
+    config = {'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'compartida.db'}"}
+    lectora = crear_app(config)
+    escritora = crear_app(config)
+    cliente = lectora.test_client()
+    
+    producto = escritora.test_client().post(
+        '/api/productos', json={'nombre': 'Compartido', 'precio': 1.0, 'stock': 1}
+    ).get_json()['producto']
+    ruta = f"/api/productos/{producto['id']}"
+    # Deja en la caché de la lectora el producto, la página y la consulta por ids
+    anterior = cliente.get(ruta)
+    cliente.get('/api/productos')
+    cliente.get(f"/api/productos?ids={producto['id']}")
+    
+    escritora.test_client().put(f'{ruta}/stock', json={'stock': 9})
+    
+    respuesta = cliente.get(ruta)
+    assert respuesta.get_json()['producto']['stock'] == 9
+    assert respuesta.headers['ETag'] != anterior.headers['ETag']
+    assert cliente.get('/api/productos').get_json()['productos'][0]['stock'] == 9
+    assert cliente.get(f"/api/productos?ids={producto['id']}").get_json()['productos'][0]['stock'] == 9
+    
+    for app in (lectora, escritora):
+        with app.app_context():
+            db.engine.dispose()
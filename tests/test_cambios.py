@@ -0,0 +1,109 @@
+import pytest
+import threading
+import time
+from inventario.app import crear_app
+from inventario.cambios import obtener_aviso_cambios
+from inventario.database import crear_producto, obtener_version_productos
+from inventario.models import db
+
+@pytest.fixture
+def app_archivo(tmp_path):
+    """Aplicación sobre una base de datos en archivo, sin sondeo frecuente"""
+    app = crear_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "cambios.db"}',
+        'CAMBIOS_INTERVALO_MS': 10000,
+        'CAMBIOS_SSE_DURACION': 0
+    })
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+def _crear_despues(app, segundos):
+    def crear():
+        time.sleep(segundos)
+        with app.app_context():
+            crear_producto({'nombre': 'Nuevo', 'precio': 1.0, 'stock': 1})
+    hilo = threading.Thread(target=crear)
+    hilo.start()
+    return hilo
+
+def test_esperar_despierta_al_confirmar(app_archivo):
+    """Prueba que una escritura del proceso despierta a quien espera sin sondear"""
+    with app_archivo.app_context():
+        aviso = obtener_aviso_cambios()
+        version = obtener_version_productos()[0]
+        
+        hilo = _crear_despues(app_archivo, 0.1)
+        inicio = time.monotonic()
+        actual = aviso.esperar(version, 5)
+        hilo.join()
+        
+        assert actual == version + 1
+        assert time.monotonic() - inicio < 2
+        assert aviso.esperando == 0
+
+def test_esperar_vence_sin_cambios(app_archivo):
+    """Prueba que la espera termina al vencer el plazo"""
+    with app_archivo.app_context():
+        assert obtener_aviso_cambios().esperar(0, 0.05) == 0
+
+def test_long_poll_retorna_el_cambio(app_archivo):
+    """Prueba que espera mantiene la petición abierta hasta el primer cambio"""
+    client = app_archivo.test_client()
+    
+    hilo = _crear_despues(app_archivo, 0.1)
+    response = client.get('/api/productos/cambios?desde=0&espera=5')
+    hilo.join()
+    
+    data = response.get_json()
+    assert response.status_code == 200
+    assert [c['nombre'] for c in data['cambios']] == ['Nuevo']
+    assert data['siguiente'] == f"1:{data['cambios'][0]['id']}"
+
+def test_long_poll_rechaza_esperas_no_finitas(app_archivo):
+    """Prueba que espera=nan o inf no deja la petición abierta sin límite"""
+    client = app_archivo.test_client()
+    for valor in ('nan', 'inf', '-inf'):
+        response = client.get(f'/api/productos/cambios?desde=0&espera={valor}')
+        assert response.status_code == 400
+
+def test_flujo_sse(app_archivo):
+    """Prueba que el flujo SSE emite los cambios con su posición como id"""
+    with app_archivo.app_context():
+        crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 1})
+        crear_producto({'nombre': 'B', 'precio': 1.0, 'stock': 1})
+    client = app_archivo.test_client()
+    
+    response = client.get('/api/productos/cambios/stream', headers={'Last-Event-ID': '1:1'})
+    cuerpo = response.get_data(as_text=True)
+    
+    assert response.mimetype == 'text/event-stream'
+    assert cuerpo.startswith('retry: 1000\n\n')
+    assert 'id: 2:2\nevent: cambios\n' in cuerpo
+    assert '"nombre":"B"' in cuerpo and '"nombre":"A"' not in cuerpo
+
+def test_max_clientes_del_feed(app_archivo):
+    """Prueba que sin lugares libres el feed responde 503 y los lugares se liberan"""
+    aviso = app_archivo.extensions['inventario_cambios']
+    aviso.max_clientes = 1
+    client = app_archivo.test_client()
+    
+    response = client.get('/api/productos/cambios/stream')
+    response.get_data()
+    response.close()
+    assert aviso.clientes == 0
+    
+    assert aviso.ocupar()
+    response = client.get('/api/productos/cambios?desde=0&espera=1')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert client.get('/api/productos/cambios/stream').status_code == 503
+    # Sin espera el long-poll no necesita lugar
+    assert client.get('/api/productos/cambios?desde=0').status_code == 200
+    aviso.liberar()
+    
+    assert client.get('/api/productos/cambios?desde=0&espera=0.05').status_code == 200
+    assert aviso.clientes == 0
@@ -0,0 +1,121 @@
+import pytest
+import os
+from inventario.app import crear_app, preparar_proceso_hijo
+from inventario.cache import CacheLRU, CacheNula
+from inventario.cli import crear_parser, _opciones_servidor, _crear_app_servidor, HILOS_POR_WORKER
+from inventario.database import crear_producto
+from inventario.models import db, Producto
+
+def test_serve_opciones_por_defecto():
+    """Prueba que serve usa un worker por CPU y app precargada"""
+    args = crear_parser().parse_args(['serve'])
+    opciones = _opciones_servidor(args)
+    
+    assert opciones['workers'] == (os.cpu_count() or 1)
+    assert opciones['preload_app'] is True
+    assert opciones['bind'] == '0.0.0.0:5000'
+    assert opciones['max_requests'] == 10000
+
+def test_serve_opciones_personalizadas():
+    """Prueba argumentos de workers y reciclaje"""
+    args = crear_parser().parse_args(['serve', '--workers', '3', '--max-requests', '500', '--port', '8000'])
+    opciones = _opciones_servidor(args)
+    
+    assert opciones['workers'] == 3
+    assert opciones['max_requests'] == 500
+    assert opciones['bind'] == '0.0.0.0:8000'
+
+def test_serve_usa_workers_con_hilos():
+    """Prueba que serve usa gthread salvo que se pida un solo hilo"""
+    opciones = _opciones_servidor(crear_parser().parse_args(['serve']))
+    assert opciones['threads'] == HILOS_POR_WORKER > 1
+    assert opciones['worker_class'] == 'gthread'
+    
+    opciones = _opciones_servidor(crear_parser().parse_args(['serve', '--hilos', '1']))
+    assert opciones['worker_class'] == 'sync'
+
+def test_serve_sync_acota_esperas_del_feed(monkeypatch):
+    """Prueba que con workers sync el long-poll y el SSE terminan antes del timeout"""
+    monkeypatch.setattr('inventario.cli.crear_app', lambda config=None: crear_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **(config or {})
+    }))
+    
+    app = _crear_app_servidor(crear_parser().parse_args(['serve', '--hilos', '1', '--timeout', '20']))
+    assert app.config['CAMBIOS_ESPERA_MAX'] == 15
+    assert app.config['CAMBIOS_SSE_DURACION'] == 15
+    
+    app = _crear_app_servidor(crear_parser().parse_args(['serve', '--timeout', '20']))
+    assert app.config['CAMBIOS_ESPERA_MAX'] == 30
+    assert app.config['CAMBIOS_SSE_DURACION'] == 300
+
+def test_serve_sin_cache(monkeypatch):
+    """Prueba que serve mantiene la caché con varios workers salvo con --sin-cache"""
+    monkeypatch.setattr('inventario.cli.crear_app', lambda config=None: crear_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', **(config or {})
+    }))
+    
+    app = _crear_app_servidor(crear_parser().parse_args(['serve', '--workers', '4']))
+    assert isinstance(app.extensions['inventario_cache'].backend, CacheLRU)
+    
+    app = _crear_app_servidor(crear_parser().parse_args(['serve', '--workers', '4', '--sin-cache']))
+    assert isinstance(app.extensions['inventario_cache'].backend, CacheNula)
+
+def test_preparar_proceso_hijo_reinicia_escritor(tmp_path):
+    """Prueba que tras fork el escritor agrupado vuelve a aceptar escrituras"""
+    app = crear_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "fork.db"}',
+        'ESCRITURA_AGRUPADA': True
+    })
+    escritor = app.extensions['inventario_escritor']
+    hilo_original = escritor._hilo
+    
+    preparar_proceso_hijo(app)
+    
+    assert escritor._hilo is not hilo_original
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Hijo', 'precio': 1.0, 'stock': 1})
+        assert producto.id is not None
+    escritor.detener()
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_seed_carga_productos(tmp_path, capsys):
+    """Prueba el subcomando seed contra una base de datos en archivo"""
+    from inventario.cli import main
+    uri = f'sqlite:///{tmp_path / "seed.db"}'
+    
+    assert main(['seed', '--filas', '250', '--procesos', '1', '--base-datos', uri]) == 0
+    assert '250 productos cargados' in capsys.readouterr().out
+    
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': uri})
+    with app.app_context():
+        assert Producto.query.count() == 250
+        db.engine.dispose()
+
+def test_consolidar_stock(tmp_path, capsys):
+    """Prueba el subcomando consolidar-stock"""
+    from inventario.cli import main
+    uri = f'sqlite:///{tmp_path / "consolidar.db"}'
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': uri})
+    with app.app_context():
+        db.create_all()
+        crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 3})
+        db.engine.dispose()
+    
+    assert main(['consolidar-stock', '--base-datos', uri]) == 0
+    assert '1 snapshots de stock creados' in capsys.readouterr().out
+    assert main(['consolidar-stock', '--base-datos', uri]) == 0
+    assert '0 snapshots de stock creados' in capsys.readouterr().out
+
+def test_recalcular_estadisticas(tmp_path, capsys):
+    """Prueba el subcomando recalcular-estadisticas"""
+    from inventario.cli import main
+    uri = f'sqlite:///{tmp_path / "estadisticas.db"}'
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': uri})
+    with app.app_context():
+        crear_producto({'nombre': 'A', 'precio': 2.0, 'stock': 3})
+        db.engine.dispose()
+    
+    assert main(['recalcular-estadisticas', '--base-datos', uri]) == 0
+    assert '1 productos, valor total 6.00, 0 sin stock, 1 con stock bajo' in capsys.readouterr().out
\ No newline at end of file
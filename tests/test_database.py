@@ -1,9 +1,19 @@
 import pytest
+import threading
+from datetime import datetime
+from sqlalchemy import insert
+from inventario.app import crear_app
 from inventario.database import (
-    crear_producto, obtener_productos, obtener_producto_por_id,
-    actualizar_stock, eliminar_producto
+    crear_producto, crear_productos_lote, obtener_productos, obtener_productos_cursor,
+    obtener_productos_serializados, obtener_producto_serializado,
+    obtener_version_productos, obtener_productos_serializados_por_ids,
+    consulta_productos, iterar_productos_exportacion, contar_productos, recontar_productos,
+    obtener_producto_por_id, actualizar_stock, ajustar_stock, ajustar_stock_lote,
+    eliminar_producto, obtener_movimientos, obtener_stock_en, consolidar_stock,
+    obtener_cambios, decodificar_desde, obtener_estadisticas, recalcular_estadisticas,
+    _actualizar_stock, _ajustar_stock, _confirmar
 )
-from inventario.models import db, Producto
+from inventario.models import db, Producto, EstadoTabla, SnapshotStock
 
 def test_crear_producto_database(app):
     """Prueba crear producto en base de datos"""
@@ -131,4 +141,514 @@ def test_eliminar_producto_inexistente(app):
     with app.app_context():
         exitoso, error = eliminar_producto(9999)
         assert exitoso is False
-        assert error == "Producto no encontrado"
\ No newline at end of file
+        assert error == "Producto no encontrado"
+
+def test_obtener_productos_cursor_recorre_todo(app):
+    """Prueba que la paginación por cursor recorre todos los productos"""
+    with app.app_context():
+        for i in range(25):
+            crear_producto({'nombre': f'Prod {i}', 'precio': 10.0, 'stock': 1})
+        
+        ids = []
+        cursor = None
+        while True:
+            resultado, error = obtener_productos_cursor(cursor, por_pagina=10)
+            assert error is None
+            ids.extend(p.id for p in resultado['items'])
+            cursor = resultado['siguiente_cursor']
+            if cursor is None:
+                break
+        
+        assert ids == sorted(ids)
+        assert len(ids) == 25
+        assert resultado['total'] is None
+
+def test_obtener_productos_cursor_por_fecha_creacion(app):
+    """Prueba cursor ordenado por fecha de creación con total exacto"""
+    with app.app_context():
+        for i in range(5):
+            crear_producto({'nombre': f'Prod {i}', 'precio': 10.0, 'stock': 1})
+        
+        primera, _ = obtener_productos_cursor(None, 3, 'fecha_creacion', modo_total='exacto')
+        segunda, error = obtener_productos_cursor(primera['siguiente_cursor'], 3)
+        
+        assert error is None
+        assert primera['total'] == 5
+        assert segunda['orden'] == 'fecha_creacion'
+        assert len(segunda['items']) == 2
+        assert segunda['siguiente_cursor'] is None
+
+def test_obtener_productos_cursor_invalido(app):
+    """Prueba que un cursor corrupto retorna error"""
+    with app.app_context():
+        resultado, error = obtener_productos_cursor('no-es-un-cursor')
+        assert resultado is None
+        assert error == "Cursor inválido"
+
+def test_crear_productos_lote(app):
+    """Prueba crear productos en lote en varios bloques"""
+    with app.app_context():
+        datos = [{'nombre': f'Lote {i}', 'precio': 5.0, 'stock': i} for i in range(25)]
+        creados, errores = crear_productos_lote(datos, tamano_lote=10)
+        
+        assert creados == 25
+        assert errores == []
+        assert Producto.query.count() == 25
+        assert Producto.query.first().fecha_creacion is not None
+
+def test_crear_productos_lote_secuencia_de_la_escritura(app):
+    """Prueba que todos los bloques de un lote reciben la versión que deja su commit"""
+    with app.app_context():
+        crear_producto({'nombre': 'Previo', 'precio': 1.0, 'stock': 1})
+        crear_productos_lote([{'nombre': f'Lote {i}', 'precio': 5.0, 'stock': i} for i in range(25)],
+                             tamano_lote=10)
+        
+        version = obtener_version_productos()[0]
+        secuencias = {p.secuencia for p in Producto.query.filter(Producto.nombre.like('Lote %'))}
+        assert secuencias == {version}
+
+def test_crear_productos_lote_errores_por_elemento(app):
+    """Prueba que los elementos inválidos se reportan sin detener el lote"""
+    with app.app_context():
+        datos = [
+            {'nombre': 'Válido', 'precio': 5.0, 'stock': 1},
+            {'nombre': '', 'precio': -1, 'stock': 1},
+            'no es un objeto',
+            {'nombre': 'Precio texto', 'precio': 'caro'}
+        ]
+        creados, errores = crear_productos_lote(datos)
+        
+        assert creados == 1
+        assert [e['indice'] for e in errores] == [1, 2, 3]
+        assert len(errores[0]['detalles']) == 2
+
+def test_ajustar_stock_lote(app):
+    """Prueba ajuste de stock en lote con valores absolutos y deltas"""
+    with app.app_context():
+        a, _ = crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 10})
+        b, _ = crear_producto({'nombre': 'B', 'precio': 1.0, 'stock': 10})
+        c, _ = crear_producto({'nombre': 'C', 'precio': 1.0, 'stock': 2})
+        fecha_original = b.fecha_actualizacion
+        
+        resultado = ajustar_stock_lote([
+            {'id': a.id, 'stock': 3},
+            {'id': b.id, 'delta': 5},
+            {'id': c.id, 'delta': -5},
+            {'id': 9999, 'delta': 1}
+        ])
+        
+        assert sorted(resultado['actualizados']) == sorted([a.id, b.id])
+        assert resultado['no_encontrados'] == [9999]
+        assert resultado['rechazados'][0]['id'] == c.id
+        assert resultado['rechazados'][0]['indice'] == 2
+        assert obtener_producto_por_id(a.id).stock == 3
+        assert obtener_producto_por_id(b.id).stock == 15
+        assert obtener_producto_por_id(b.id).fecha_actualizacion >= fecha_original
+        assert obtener_producto_por_id(c.id).stock == 2
+
+def test_ajustar_stock_lote_entradas_invalidas(app):
+    """Prueba que las entradas mal formadas se rechazan"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 10})
+        
+        resultado = ajustar_stock_lote([
+            {'id': producto.id, 'stock': -1},
+            {'id': producto.id, 'stock': 1, 'delta': 1},
+            {'id': 'x', 'delta': 1},
+            {'id': producto.id, 'delta': 1},
+            {'id': producto.id, 'delta': 1}
+        ])
+        
+        assert resultado['actualizados'] == [producto.id]
+        assert [r['indice'] for r in resultado['rechazados']] == [0, 1, 2, 4]
+
+def test_ajustar_stock_delta(app):
+    """Prueba ajuste atómico de stock con delta positivo y negativo"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Cable', 'precio': 5.0, 'stock': 10})
+        
+        nuevo_stock, error = ajustar_stock(producto.id, -4)
+        assert error is None
+        assert nuevo_stock == 6
+        
+        nuevo_stock, error = ajustar_stock(producto.id, 3)
+        assert nuevo_stock == 9
+        assert obtener_producto_por_id(producto.id).stock == 9
+
+def test_ajustar_stock_insuficiente(app):
+    """Prueba que el ajuste no deja el stock negativo"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Cable', 'precio': 5.0, 'stock': 2})
+        
+        nuevo_stock, error = ajustar_stock(producto.id, -3)
+        assert nuevo_stock is None
+        assert error == "Stock insuficiente"
+        assert obtener_producto_por_id(producto.id).stock == 2
+
+def test_ajustar_stock_producto_inexistente(app):
+    """Prueba ajuste de stock de producto inexistente"""
+    with app.app_context():
+        nuevo_stock, error = ajustar_stock(9999, 1)
+        assert nuevo_stock is None
+        assert error == "Producto no encontrado"
+
+def test_obtener_producto_serializado_invalida_al_actualizar(app):
+    """Prueba que la caché de un producto se invalida al cambiar su stock"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Cacheado', 'precio': 10.0, 'stock': 1})
+        
+        assert obtener_producto_serializado(producto.id)['stock'] == 1
+        actualizar_stock(producto.id, 7)
+        assert obtener_producto_serializado(producto.id)['stock'] == 7
+        ajustar_stock(producto.id, 1)
+        assert obtener_producto_serializado(producto.id)['stock'] == 8
+        eliminar_producto(producto.id)
+        assert obtener_producto_serializado(producto.id) is None
+
+def test_obtener_productos_serializados_invalida_al_crear(app):
+    """Prueba que los listados en caché se invalidan al crear productos"""
+    with app.app_context():
+        crear_producto({'nombre': 'Uno', 'precio': 10.0, 'stock': 1})
+        assert obtener_productos_serializados(1, 10)['total'] == 1
+        
+        crear_productos_lote([{'nombre': 'Dos', 'precio': 1.0}])
+        assert obtener_productos_serializados(1, 10)['total'] == 2
+
+def test_version_productos_incrementa_en_escrituras(app):
+    """Prueba que cada escritura incrementa la versión de la tabla"""
+    with app.app_context():
+        version_inicial, _ = obtener_version_productos()
+        producto, _ = crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 1})
+        actualizar_stock(producto.id, 2)
+        actualizar_stock(producto.id, -1)
+        eliminar_producto(producto.id)
+        
+        version, actualizado_en = obtener_version_productos()
+        assert version == version_inicial + 3
+        assert actualizado_en is not None
+
+def test_obtener_productos_serializados_por_ids(app):
+    """Prueba obtener varios productos por id respetando el orden pedido"""
+    with app.app_context():
+        ids = [crear_producto({'nombre': f'P{i}', 'precio': 1.0, 'stock': i})[0].id for i in range(3)]
+        
+        # Uno en caché y el resto desde la base de datos
+        obtener_producto_serializado(ids[1])
+        productos, no_encontrados = obtener_productos_serializados_por_ids([ids[2], 9999, ids[1], ids[0], ids[2]])
+        
+        assert [p['id'] for p in productos] == [ids[2], ids[1], ids[0]]
+        assert no_encontrados == [9999]
+
+def _plan_consulta(consulta):
+    """Plan de ejecución de SQLite para una consulta del listado"""
+    sql = consulta.statement.compile(db.engine, compile_kwargs={'literal_binds': True})
+    filas = db.session.execute(db.text(f'EXPLAIN QUERY PLAN {sql}')).fetchall()
+    return ' | '.join(fila[-1] for fila in filas)
+
+def test_obtener_productos_filtros_y_orden(app):
+    """Prueba filtros por stock, precio y prefijo de nombre con orden"""
+    with app.app_context():
+        crear_producto({'nombre': 'Laptop', 'precio': 900.0, 'stock': 2})
+        crear_producto({'nombre': 'Lámpara', 'precio': 30.0, 'stock': 1})
+        crear_producto({'nombre': 'Mouse', 'precio': 20.0, 'stock': 50})
+        
+        paginacion = obtener_productos(1, 10, {'stock_max': 5}, '-precio')
+        assert [p.nombre for p in paginacion.items] == ['Laptop', 'Lámpara']
+        
+        paginacion = obtener_productos(1, 10, {'precio_min': 25, 'precio_max': 100})
+        assert [p.nombre for p in paginacion.items] == ['Lámpara']
+        
+        paginacion = obtener_productos(1, 10, {'nombre': 'La'}, 'nombre')
+        assert [p.nombre for p in paginacion.items] == ['Laptop']
+        assert paginacion.total == 1
+
+@pytest.mark.parametrize('filtros, orden, indice', [
+    ({'stock_max': 5}, 'stock', 'ix_productos_stock'),
+    ({'precio_min': 10, 'precio_max': 50}, 'id', 'ix_productos_precio'),
+    ({'nombre': 'Lap'}, 'id', 'ix_productos_nombre'),
+    ({}, '-precio', 'ix_productos_precio'),
+])
+def test_consulta_productos_usa_indice(app, filtros, orden, indice):
+    """Prueba con EXPLAIN que los filtros y orden usan índices"""
+    with app.app_context():
+        plan = _plan_consulta(consulta_productos(filtros, orden))
+        assert f'USING INDEX {indice}' in plan
+
+def test_iterar_productos_exportacion_por_bloques(app):
+    """Prueba que la exportación entrega el catálogo en bloques de tuplas"""
+    with app.app_context():
+        crear_productos_lote([{'nombre': f'P{i}', 'precio': 1.0} for i in range(25)])
+        
+        bloques = list(iterar_productos_exportacion(tamano_bloque=10))
+        assert [len(b) for b in bloques] == [10, 10, 5]
+        assert bloques[0][0].nombre == 'P0'
+
+def test_pragmas_perfil_produccion(tmp_path):
+    """Prueba que el perfil de producción activa WAL y el pool configurado"""
+    from inventario.app import crear_app
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "perfil.db"}'})
+    with app.app_context():
+        assert db.session.execute(db.text('PRAGMA journal_mode')).scalar() == 'wal'
+        assert db.session.execute(db.text('PRAGMA synchronous')).scalar() == 1
+        assert db.session.execute(db.text('PRAGMA busy_timeout')).scalar() == 5000
+        assert db.engine.pool.size() == 10
+        db.session.remove()
+        db.engine.dispose()
+
+def test_pragmas_perfil_desconocido():
+    """Prueba que un perfil SQLite inexistente se rechaza"""
+    from inventario.app import crear_app
+    with pytest.raises(ValueError):
+        crear_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'SQLITE_PERFIL': 'turbo'})
+
+def test_lecturas_no_cargan_objetos_orm(app):
+    """Prueba que listados, cursor e ids se leen como filas, fuera del identity map"""
+    with app.app_context():
+        crear_productos_lote([{'nombre': f'Prod {i}', 'precio': 1.0, 'stock': i} for i in range(5)])
+        db.session.expunge_all()
+        
+        pagina = obtener_productos_serializados(1, 10)
+        resultado, _ = obtener_productos_cursor(None, 10)
+        productos, _ = obtener_productos_serializados_por_ids([1, 2])
+        producto = obtener_producto_serializado(3)
+        
+        assert len(db.session.identity_map) == 0
+        assert pagina['total'] == 5
+        assert [p.id for p in resultado['items']] == [1, 2, 3, 4, 5]
+        assert [p['id'] for p in productos] == [1, 2]
+        assert producto['stock'] == 2
+
+
+def test_contador_aproximado_sigue_escrituras(app):
+    """Prueba que el contador de filas se mantiene en altas, lotes y bajas"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 1})
+        assert contar_productos(modo='aproximado') == 1
+        
+        crear_productos_lote([{'nombre': f'L{i}', 'precio': 1.0, 'stock': 1} for i in range(4)])
+        eliminar_producto(producto.id)
+        
+        assert db.session.get(EstadoTabla, 'productos').filas == 4
+        assert contar_productos(modo='aproximado') == 4
+        assert contar_productos({'nombre': 'L1'}, 'aproximado') == 1
+        assert contar_productos(modo='omitir') is None
+
+def test_recontar_productos_tras_sql_directo(app):
+    """Prueba que recontar corrige el contador tras escrituras fuera de la API"""
+    with app.app_context():
+        crear_producto({'nombre': 'A', 'precio': 1.0, 'stock': 1})
+        assert contar_productos(modo='aproximado') == 1
+        
+        db.session.execute(insert(Producto), [{'nombre': 'B', 'precio': 1.0, 'stock': 1}])
+        db.session.commit()
+        
+        assert contar_productos(modo='aproximado') == 1
+        assert recontar_productos() == 2
+        assert contar_productos(modo='exacto') == 2
+
+def test_movimientos_registran_cada_cambio_de_stock(app):
+    """Prueba que altas, asignaciones, ajustes, lotes y bajas dejan un movimiento"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Teclado', 'precio': 20.0, 'stock': 10})
+        producto_id = producto.id
+        actualizar_stock(producto_id, 7)
+        actualizar_stock(producto_id, 7)
+        ajustar_stock(producto_id, 5)
+        ajustar_stock(producto_id, -100)
+        ajustar_stock_lote([{'id': producto_id, 'stock': 20}])
+        ajustar_stock_lote([{'id': producto_id, 'delta': -2}])
+        eliminar_producto(producto_id)
+        
+        movimientos = obtener_movimientos(producto_id)
+        assert [(m.motivo, m.delta) for m in movimientos] == [
+            ('alta', 10), ('asignacion', -3), ('ajuste', 5), ('lote', 8), ('lote', -2), ('baja', -18)
+        ]
+        assert sum(m.delta for m in movimientos) == 0
+
+def _suma_movimientos(producto_id):
+    return sum(m.delta for m in obtener_movimientos(producto_id, limite=1000))
+
+def test_movimientos_en_una_misma_transaccion(app):
+    """Prueba que los UPDATE de Core previos no dejan un stock anterior obsoleto
+    
+    Es la secuencia que puede confirmar el escritor agrupado en un commit.
+    """
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Cable', 'precio': 2.0, 'stock': 10})
+        producto_id = producto.id
+        recalcular_estadisticas()
+        
+        _actualizar_stock(producto_id, 8)
+        _ajustar_stock(producto_id, -1)
+        _actualizar_stock(producto_id, 5)
+        _confirmar()
+        
+        assert obtener_producto_por_id(producto_id).stock == 5
+        assert _suma_movimientos(producto_id) == 5
+        assert obtener_estadisticas()['stock_total'] == 5
+
+def test_movimientos_con_escritura_concurrente(tmp_path):
+    """Prueba que el stock anterior se lee bajo el bloqueo, no del identity map
+    
+    Otra sesión confirma un ajuste después de que esta leyó el producto.
+    """
+    app = crear_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "carrera.db"}'})
+    
+    def ajustar(producto_id):
+        with app.app_context():
+            ajustar_stock(producto_id, 5)
+    
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Mouse', 'precio': 2.0, 'stock': 10})
+        producto_id = producto.id
+        recalcular_estadisticas()
+        assert db.session.get(Producto, producto_id).stock == 10
+        
+        hilo = threading.Thread(target=ajustar, args=(producto_id,))
+        hilo.start()
+        hilo.join()
+        actualizar_stock(producto_id, 4)
+        
+        assert _suma_movimientos(producto_id) == 4
+        assert obtener_estadisticas()['stock_total'] == 4
+        assert recalcular_estadisticas()['stock_total'] == 4
+        db.engine.dispose()
+
+def test_movimientos_de_alta_en_lote(app):
+    """Prueba que el alta en lote registra un movimiento por producto creado"""
+    with app.app_context():
+        crear_productos_lote([{'nombre': f'P{i}', 'precio': 1.0, 'stock': i} for i in range(5)], tamano_lote=2)
+        
+        for producto in Producto.query.all():
+            movimientos = obtener_movimientos(producto.id)
+            deltas = [m.delta for m in movimientos]
+            assert deltas == ([producto.stock] if producto.stock else [])
+
+def test_ids_de_productos_eliminados_no_se_reutilizan(app):
+    """Prueba que un alta tras eliminar el último producto no hereda su historial"""
+    with app.app_context():
+        producto, _ = crear_producto({'nombre': 'Viejo', 'precio': 1.0, 'stock': 7})
+        viejo_id = producto.id
+        eliminar_producto(viejo_id)
+        
+        producto, _ = crear_producto({'nombre': 'Nuevo', 'precio': 1.0, 'stock': 2})
+        assert producto.id != viejo_id
+        assert [(m.delta, m.motivo) for m in obtener_movimientos(producto.id)] == [(2, 'alta')]
+
+def test_stock_en_fecha_con_y_sin_snapshots(app):
+    """Prueba que el stock histórico es el mismo antes y después de consolidar"""
+    with app.app_context():
+        antes = datetime.utcnow()
+        producto, _ = crear_producto({'nombre': 'Monitor', 'precio': 200.0, 'stock': 4})
+        producto_id = producto.id
+        momentos = [datetime.utcnow()]
+        for delta in (3, -5, 10):
+            ajustar_stock(producto_id, delta)
+            momentos.append(datetime.utcnow())
+        esperados = [4, 7, 2, 12]
+        
+        assert obtener_stock_en(producto_id, antes) == (None, "Sin historial de stock a esa fecha")
+        assert [obtener_stock_en(producto_id, m)[0] for m in momentos] == esperados
+        
+        assert consolidar_stock() == 1
+        assert consolidar_stock() == 0
+        ajustar_stock(producto_id, -1)
+        assert consolidar_stock(minimo_movimientos=2) == 0
+        assert consolidar_stock() == 1
+        
+        assert SnapshotStock.query.filter_by(producto_id=producto_id).count() == 2
+        assert [obtener_stock_en(producto_id, m)[0] for m in momentos] == esperados
+        assert obtener_stock_en(producto_id, datetime.utcnow()) == (11, None)
+
+def test_feed_de_cambios_en_orden_con_eliminaciones(app):
+    """Prueba que el feed entrega cada producto una vez, en orden, con bajas"""
+    with app.app_context():
+        ids = [crear_producto({'nombre': n, 'precio': 1.0, 'stock': 5})[0].id for n in 'ABC']
+        ajustar_stock(ids[0], 1)
+        eliminar_producto(ids[1])
+        
+        cambios, siguiente = obtener_cambios()
+        assert [(c['id'], c['secuencia'], c['eliminado']) for c in cambios] == [
+            (ids[2], 3, False), (ids[0], 4, False), (ids[1], 5, True)
+        ]
+        assert cambios[1]['stock'] == 6
+        assert obtener_version_productos()[0] == 5
+        assert obtener_cambios(decodificar_desde(siguiente)) == ([], siguiente)
+        assert [c['id'] for c in obtener_cambios(decodificar_desde('3'))[0]] == [ids[0], ids[1]]
+
+def test_feed_de_cambios_pagina_dentro_de_una_secuencia(app):
+    """Prueba que las filas de una misma escritura se paginan por id"""
+    with app.app_context():
+        crear_productos_lote([{'nombre': f'P{i}', 'precio': 1.0, 'stock': 1} for i in range(5)])
+        ajustar_stock_lote([{'id': 2, 'stock': 9}, {'id': 4, 'delta': 1}])
+        
+        vistos = []
+        desde = (0, None)
+        while True:
+            cambios, siguiente = obtener_cambios(desde, limite=2)
+            if not cambios:
+                break
+            vistos += [(c['id'], c['secuencia']) for c in cambios]
+            desde = decodificar_desde(siguiente)
+        
+        assert vistos == [(1, 1), (3, 1), (5, 1), (2, 2), (4, 2)]
+        with pytest.raises(ValueError):
+            decodificar_desde('x:1')
+
+def _estadisticas_esperadas(umbral=5):
+    productos = Producto.query.all()
+    return {
+        'productos': len(productos),
+        'valor_total': round(sum(p.precio * p.stock for p in productos), 2),
+        'stock_total': sum(p.stock for p in productos),
+        'sin_stock': sum(p.stock == 0 for p in productos),
+        'stock_bajo': sum(p.stock <= umbral for p in productos),
+        'umbral_stock_bajo': umbral
+    }
+
+def test_estadisticas_se_mantienen_en_cada_escritura(app):
+    """Prueba que el resumen incremental coincide con el recálculo completo"""
+    with app.app_context():
+        assert obtener_estadisticas() == _estadisticas_esperadas()
+        
+        a, _ = crear_producto({'nombre': 'A', 'precio': 10.0, 'stock': 8})
+        b, _ = crear_producto({'nombre': 'B', 'precio': 2.5, 'stock': 0})
+        assert obtener_estadisticas() == _estadisticas_esperadas()
+        
+        crear_productos_lote([{'nombre': f'L{i}', 'precio': 1.5, 'stock': i} for i in range(8)])
+        actualizar_stock(a.id, 3)
+        ajustar_stock(b.id, 6)
+        ajustar_stock(b.id, -100)
+        ajustar_stock_lote([{'id': 4, 'stock': 0}, {'id': 5, 'delta': 9}, {'id': 7, 'delta': -50}])
+        eliminar_producto(6)
+        
+        estadisticas = obtener_estadisticas()
+        assert estadisticas == _estadisticas_esperadas()
+        assert estadisticas['sin_stock'] == 2
+        assert db.session.get(EstadoTabla, 'productos').valor_total_centavos is not None
+
+def test_valor_total_en_centavos_no_deriva(app):
+    """Prueba que muchos deltas con precios no representables suman exacto"""
+    with app.app_context():
+        crear_productos_lote([{'nombre': f'P{i}', 'precio': 0.1, 'stock': 0} for i in range(300)])
+        recalcular_estadisticas()
+        for _ in range(3):
+            ajustar_stock_lote([{'id': i, 'delta': 1} for i in range(1, 301)])
+        
+        assert db.session.get(EstadoTabla, 'productos').valor_total_centavos == 9000
+        assert obtener_estadisticas()['valor_total'] == 90.0
+        assert recalcular_estadisticas()['valor_total'] == 90.0
+
+def test_recalcular_estadisticas_tras_sql_directo(app):
+    """Prueba el recálculo tras escrituras fuera de la API y con otro umbral"""
+    with app.app_context():
+        crear_producto({'nombre': 'A', 'precio': 4.0, 'stock': 7})
+        obtener_estadisticas()
+        db.session.execute(insert(Producto), [{'nombre': 'B', 'precio': 1.0, 'stock': 0}])
+        db.session.commit()
+        
+        assert obtener_estadisticas()['productos'] == 1
+        assert recalcular_estadisticas() == _estadisticas_esperadas()
+        
+        app.config['UMBRAL_STOCK_BAJO'] = 10
+        assert obtener_estadisticas() == _estadisticas_esperadas(umbral=10)
\ No newline at end of file
@@ -0,0 +1,55 @@
+import pytest
+import threading
+from inventario.app import crear_app
+from inventario.database import crear_producto, actualizar_stock, ajustar_stock, eliminar_producto
+from inventario.escritura import obtener_escritor
+from inventario.models import db, Producto
+
+@pytest.fixture
+def app_agrupada(tmp_path):
+    """Aplicación con escritura agrupada sobre una base de datos en archivo"""
+    app = crear_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "agrupada.db"}',
+        'ESCRITURA_AGRUPADA': True,
+        'ESCRITURA_INTERVALO_MS': 50
+    })
+    yield app
+    app.extensions['inventario_escritor'].detener()
+    with app.app_context():
+        db.engine.dispose()
+
+def test_escrituras_concurrentes_se_agrupan(app_agrupada):
+    """Prueba que escrituras concurrentes comparten commits"""
+    resultados = []
+    
+    def crear(i):
+        with app_agrupada.app_context():
+            producto, errores = crear_producto({'nombre': f'P{i}', 'precio': 1.0, 'stock': i})
+            resultados.append((producto.to_dict(), errores))
+    
+    hilos = [threading.Thread(target=crear, args=(i,)) for i in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    
+    with app_agrupada.app_context():
+        escritor = obtener_escritor()
+        assert Producto.query.count() == 20
+        assert escritor.operaciones == 20
+        assert escritor.lotes < 20
+    assert all(errores is None and producto['id'] for producto, errores in resultados)
+
+def test_escritura_agrupada_conserva_resultados_por_operacion(app_agrupada):
+    """Prueba que cada operación recibe su propio resultado o error"""
+    with app_agrupada.app_context():
+        producto, _ = crear_producto({'nombre': 'Agrupado', 'precio': 5.0, 'stock': 3})
+        assert producto.to_dict()['nombre'] == 'Agrupado'
+        
+        assert crear_producto({'nombre': '', 'precio': -1})[0] is None
+        assert actualizar_stock(producto.id, 8)[0].stock == 8
+        assert ajustar_stock(producto.id, -10) == (None, "Stock insuficiente")
+        assert ajustar_stock(producto.id, -1) == (7, None)
+        assert eliminar_producto(producto.id) == (True, None)
+        assert eliminar_producto(producto.id) == (False, "Producto no encontrado")
@@ -0,0 +1,70 @@
+import logging
+from inventario.app import crear_app
+from inventario.metricas import Histograma
+from inventario.models import db
+
+def test_histograma_acumulado():
+    """Prueba que los buckets del histograma son acumulativos"""
+    histograma = Histograma()
+    for valor in (0.0005, 0.003, 0.003, 10):
+        histograma.observar(valor)
+    
+    acumulados = dict(histograma.acumulados())
+    assert acumulados[0.001] == 1
+    assert acumulados[0.005] == 3
+    assert acumulados[5.0] == 3
+    assert acumulados[float('inf')] == 4
+    assert histograma.total == 4
+
+def test_metricas_por_ruta_y_consultas():
+    """Prueba que /api/metricas agrupa por regla de ruta y cuenta consultas SQL"""
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'METRICAS_SQL': True})
+    client = app.test_client()
+    producto = client.post('/api/productos', json={'nombre': 'P', 'precio': 1.0, 'stock': 1}).get_json()['producto']
+    client.get(f"/api/productos/{producto['id']}")
+    client.get('/api/productos/999999')
+    client.get('/api/cache')
+    
+    response = client.get('/api/metricas')
+    texto = response.get_data(as_text=True)
+    
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert ('inventario_peticion_segundos_count{ruta="/api/productos/<int:producto_id>",'
+            'metodo="GET",estado="200"} 1') in texto
+    assert 'estado="404"} 1' in texto
+    assert 'inventario_cache_aciertos_total' in texto
+    
+    linea = next(l for l in texto.splitlines()
+                 if l.startswith('inventario_sql_consultas_total{ruta="/api/productos/<int:producto_id>"}'))
+    assert int(linea.split()[-1]) >= 2
+
+def test_consultas_lentas_se_registran(caplog):
+    """Prueba que las consultas sobre el umbral se cuentan y se registran"""
+    app = crear_app({
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'METRICAS_SQL': True, 'METRICAS_UMBRAL_LENTA_MS': 0
+    })
+    
+    with caplog.at_level(logging.WARNING, logger='inventario.metricas'):
+        app.test_client().get('/api/productos')
+    texto = app.test_client().get('/api/metricas').get_data(as_text=True)
+    
+    assert any('Consulta lenta' in r.message for r in caplog.records)
+    assert 'inventario_sql_consultas_lentas_total 0' not in texto
+
+def test_metricas_sin_sql_por_defecto(client):
+    """Prueba que por defecto se miden las peticiones pero no se escuchan las consultas"""
+    client.get('/api/productos')
+    texto = client.get('/api/metricas').get_data(as_text=True)
+    
+    assert 'inventario_peticion_segundos_count{ruta="/api/productos",metodo="GET",estado="200"} 1' in texto
+    assert 'inventario_sql_consultas_total' not in texto
+    with client.application.app_context():
+        assert not db.engine.dispatch.before_cursor_execute
+        assert not db.engine.dispatch.after_cursor_execute
+
+def test_metricas_desactivadas():
+    """Prueba que con METRICAS desactivado el endpoint no existe"""
+    app = crear_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:', 'METRICAS': False})
+    
+    assert app.test_client().get('/api/metricas').status_code == 404
@@ -0,0 +1,110 @@
+import sqlite3
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table
+from sqlalchemy.dialects import sqlite
+from inventario.app import crear_app
+from inventario.migraciones import _sql_agregar_columna
+from inventario.models import db
+
+# Esquema de productos anterior al feed de cambios y a los umbrales de reorden
+ESQUEMA_ORIGINAL = """CREATE TABLE productos (
+    id INTEGER NOT NULL,
+    nombre VARCHAR(100) NOT NULL,
+    precio FLOAT NOT NULL,
+    stock INTEGER NOT NULL,
+    fecha_creacion DATETIME,
+    fecha_actualizacion DATETIME,
+    PRIMARY KEY (id)
+)"""
+
+@pytest.fixture
+def base_original(tmp_path):
+    """Base de datos en archivo con el esquema original y dos productos"""
+    ruta = tmp_path / 'original.db'
+    conexion = sqlite3.connect(ruta)
+    conexion.execute(ESQUEMA_ORIGINAL)
+    conexion.executemany(
+        'INSERT INTO productos (nombre, precio, stock, fecha_creacion, fecha_actualizacion) '
+        "VALUES (?, ?, ?, '2024-01-01 00:00:00.000000', '2024-01-02 00:00:00.000000')",
+        [('Teclado', 10.0, 3), ('Mouse', 5.0, 0)]
+    )
+    conexion.commit()
+    conexion.close()
+    return ruta
+
+def _crear_app(ruta):
+    return crear_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': f'sqlite:///{ruta}'})
+
+def test_migrar_base_original(base_original):
+    """Prueba que una base creada antes de las columnas nuevas sigue sirviendo la API"""
+    app = _crear_app(base_original)
+    cliente = app.test_client()
+    
+    respuesta = cliente.get('/api/productos')
+    assert respuesta.status_code == 200
+    productos = respuesta.get_json()['productos']
+    assert [p['umbral_reorden'] for p in productos] == [None, None]
+    # La migración no altera la fecha que usan los ETag
+    assert productos[0]['fecha_actualizacion'] == '2024-01-02T00:00:00'
+    
+    columnas = {fila[1] for fila in sqlite3.connect(base_original).execute('PRAGMA table_info(productos)')}
+    assert {'secuencia', 'umbral_reorden'} <= columnas
+    indices = {fila[1] for fila in sqlite3.connect(base_original).execute('PRAGMA index_list(productos)')}
+    assert 'ix_productos_secuencia_id' in indices
+    
+    with app.app_context():
+        db.engine.dispose()
+
+def test_migracion_publica_productos_existentes_en_el_feed(base_original):
+    """Prueba que las filas existentes aparecen en el feed consultado desde 0"""
+    app = _crear_app(base_original)
+    cliente = app.test_client()
+    
+    datos = cliente.get('/api/productos/cambios?desde=0').get_json()
+    assert [c['id'] for c in datos['cambios']] == [1, 2]
+    
+    # Una escritura posterior queda después de la posición alcanzada
+    cliente.put('/api/productos/1/stock', json={'stock': 7})
+    siguiente = cliente.get(f"/api/productos/cambios?desde={datos['siguiente']}").get_json()
+    assert [(c['id'], c['stock']) for c in siguiente['cambios']] == [(1, 7)]
+    
+    with app.app_context():
+        db.engine.dispose()
+
+def test_migracion_es_idempotente(base_original):
+    """Prueba que abrir de nuevo la base migrada no agrega nada"""
+    from inventario.migraciones import migrar_esquema
+    
+    app = _crear_app(base_original)
+    with app.app_context():
+        with db.engine.begin() as conexion:
+            assert migrar_esquema(conexion) == []
+        db.engine.dispose()
+
+def test_migracion_recrea_productos_con_autoincrement(base_original):
+    """Prueba que la tabla recreada conserva filas, búsqueda e ids ya usados"""
+    conexion = sqlite3.connect(base_original)
+    conexion.execute('DELETE FROM productos WHERE id = 2')
+    conexion.commit()
+    conexion.close()
+    
+    app = _crear_app(base_original)
+    cliente = app.test_client()
+    sql = sqlite3.connect(base_original).execute(
+        "SELECT sql FROM sqlite_master WHERE name = 'productos'"
+    ).fetchone()[0]
+    assert 'AUTOINCREMENT' in sql
+    
+    assert [p['id'] for p in cliente.get('/api/productos/buscar?q=tecl').get_json()['productos']] == [1]
+    cliente.delete('/api/productos/1')
+    respuesta = cliente.post('/api/productos', json={'nombre': 'Nuevo', 'precio': 1.0, 'stock': 1})
+    assert respuesta.get_json()['producto']['id'] == 2
+    
+    with app.app_context():
+        db.engine.dispose()
+
+def test_columna_not_null_sin_valor_por_defecto():
+    """Prueba que una columna NOT NULL sin valor por defecto no se agrega a ciegas"""
+    tabla = Table('t', MetaData(), Column('id', Integer, primary_key=True), Column('n', Integer, nullable=False))
+    with pytest.raises(RuntimeError):
+        _sql_agregar_columna(tabla, tabla.c.n, sqlite.dialect())
@@ -0,0 +1,94 @@
+import pytest
+import sqlite3
+from inventario.app import crear_app
+from inventario.database import crear_producto
+from inventario.models import db
+from inventario.replicas import COOKIE_PRIMARIA, obtener_replicas
+
+def _sincronizar(origen, destino):
+    """Copiar la primaria sobre la réplica con la API de backup de SQLite"""
+    with sqlite3.connect(origen) as fuente, sqlite3.connect(destino) as copia:
+        fuente.backup(copia)
+    fuente.close()
+    copia.close()
+
+@pytest.fixture
+def rutas(tmp_path):
+    return {nombre: tmp_path / f'{nombre}.db' for nombre in ('primaria', 'replica_1', 'replica_2')}
+
+@pytest.fixture
+def crear_app_replicada(rutas):
+    """Fábrica de aplicaciones con réplicas en archivos SQLite"""
+    apps = []
+    
+    def crear(replicas=('replica_1',)):
+        app = crear_app({
+            'TESTING': True,
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{rutas['primaria']}",
+            'SQLALCHEMY_BINDS': {nombre: f'sqlite:///{rutas[nombre]}' for nombre in replicas},
+            'REPLICAS_LECTURA': list(replicas),
+            'CACHE_TIPO': 'nula'
+        })
+        apps.append(app)
+        return app
+    
+    yield crear
+    for app in apps:
+        with app.app_context():
+            for motor in db.engines.values():
+                motor.dispose()
+            # Flask-SQLAlchemy registra un MetaData por bind en la extensión
+            # global; se quitan para que otras apps no esperen esos binds
+            for nombre in app.config['SQLALCHEMY_BINDS']:
+                db.metadatas.pop(nombre, None)
+
+@pytest.fixture
+def app_replicada(crear_app_replicada, rutas):
+    app = crear_app_replicada()
+    _sincronizar(rutas['primaria'], rutas['replica_1'])
+    return app
+
+def test_lecturas_van_a_la_replica(app_replicada, rutas):
+    """Prueba que las lecturas GET ven la réplica hasta que se sincroniza"""
+    with app_replicada.app_context():
+        producto, _ = crear_producto({'nombre': 'Router', 'precio': 50.0, 'stock': 2})
+        producto_id = producto.id
+    client = app_replicada.test_client()
+    
+    assert client.get(f'/api/productos/{producto_id}').status_code == 404
+    assert client.get('/api/productos?total=exacto').get_json()['total'] == 0
+    
+    _sincronizar(rutas['primaria'], rutas['replica_1'])
+    assert client.get(f'/api/productos/{producto_id}').status_code == 200
+
+def test_lee_su_propia_escritura(app_replicada):
+    """Prueba que tras escribir el cliente lee de la primaria"""
+    client = app_replicada.test_client()
+    response = client.post('/api/productos', json={'nombre': 'Mouse', 'precio': 10.0, 'stock': 1})
+    producto_id = response.get_json()['producto']['id']
+    
+    assert COOKIE_PRIMARIA in response.headers['Set-Cookie']
+    assert client.get(f'/api/productos/{producto_id}').status_code == 200
+    
+    otro = app_replicada.test_client()
+    assert otro.get(f'/api/productos/{producto_id}').status_code == 404
+
+def test_turno_rotativo_y_replica_caida(crear_app_replicada, rutas):
+    """Prueba el reparto entre réplicas y que una caída deja de recibir lecturas"""
+    app = crear_app_replicada(('replica_1', 'replica_2'))
+    _sincronizar(rutas['primaria'], rutas['replica_1'])
+    
+    with app.app_context():
+        grupo = obtener_replicas()
+        elegidas = {grupo.elegir() for _ in range(4)}
+        
+        # replica_2 es un archivo vacío, sin la tabla productos
+        assert grupo.estado() == {'replica_1': True, 'replica_2': False}
+        assert elegidas == {db.engines['replica_1']}
+        
+        grupo._marcar('replica_1', False)
+        assert grupo.elegir() is None
+        
+        _sincronizar(rutas['primaria'], rutas['replica_2'])
+        grupo._proximo_chequeo['replica_2'] = 0.0
+        assert grupo.elegir() is db.engines['replica_2']
@@ -1,5 +1,7 @@
 import pytest
 import json
+from datetime import datetime, timezone
+from inventario.database import codificar_cursor
 
 def test_crear_producto_exitoso(client):
     """Prueba crear producto con datos válidos"""
@@ -153,3 +155,428 @@ def test_eliminar_producto_exitoso(client):
     assert response.status_code == 200
     data = response.get_json()
     assert data['mensaje'] == 'Producto eliminado exitosamente'
+
+
+def test_listar_productos_con_cursor(client):
+    """Prueba listar productos en modo cursor"""
+    for i in range(3):
+        datos = {'nombre': f'Producto {i}', 'precio': 10, 'stock': 1}
+        client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+
+    response = client.get('/api/productos?cursor=&por_pagina=2')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert len(data['productos']) == 2
+    assert 'total' not in data
+
+    response = client.get(f"/api/productos?cursor={data['siguiente_cursor']}&total=exacto")
+    data = response.get_json()
+    assert len(data['productos']) == 1
+    assert data['siguiente_cursor'] is None
+    assert data['total'] == 3
+
+
+def test_listar_productos_cursor_invalido(client):
+    """Prueba listar con cursor inválido"""
+    response = client.get('/api/productos?cursor=xyz')
+    assert response.status_code == 400
+
+
+def test_listar_productos_cursor_con_valores_invalidos(client):
+    """Prueba que un cursor bien formado con valores de otro tipo responde 400"""
+    cursores = [
+        codificar_cursor('id', [{}]),
+        codificar_cursor('id', [10**30]),
+        codificar_cursor('id', [True]),
+        codificar_cursor('id', ['1']),
+        codificar_cursor('fecha_creacion', [20240101, 1]),
+    ]
+    for cursor in cursores:
+        response = client.get(f'/api/productos?cursor={cursor}')
+        assert response.status_code == 400
+        assert response.get_json()['error'] == 'Cursor inválido'
+
+
+def test_crear_productos_lote_json(client):
+    """Prueba crear productos en lote con un arreglo JSON"""
+    datos = [
+        {'nombre': 'Lápiz', 'precio': 1.5, 'stock': 100},
+        {'nombre': '', 'precio': 2, 'stock': 1}
+    ]
+    response = client.post('/api/productos/lote',
+                           data=json.dumps(datos),
+                           content_type='application/json')
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['creados'] == 1
+    assert data['errores'][0]['indice'] == 1
+
+
+def test_crear_productos_lote_ndjson(client):
+    """Prueba crear productos en lote con un cuerpo NDJSON"""
+    cuerpo = '\n'.join([
+        json.dumps({'nombre': 'A', 'precio': 1, 'stock': 1}),
+        '{esto no es json',
+        json.dumps({'nombre': 'B', 'precio': 2, 'stock': 2}),
+        ''
+    ])
+    response = client.post('/api/productos/lote',
+                           data=cuerpo,
+                           content_type='application/x-ndjson')
+
+    assert response.status_code == 201
+    data = response.get_json()
+    assert data['creados'] == 2
+    assert data['errores'][0]['indice'] == 1
+
+
+def test_crear_productos_lote_sin_validos(client):
+    """Prueba lote sin productos válidos"""
+    response = client.post('/api/productos/lote',
+                           data=json.dumps({'nombre': 'No es arreglo'}),
+                           content_type='application/json')
+    assert response.status_code == 400
+
+    response = client.post('/api/productos/lote',
+                           data=json.dumps([{'nombre': ''}]),
+                           content_type='application/json')
+    assert response.status_code == 400
+    assert len(response.get_json()['errores']) == 1
+
+
+def test_ajustar_stock_lote_endpoint(client):
+    """Prueba ajustar stock de varios productos en una petición"""
+    ids = []
+    for i in range(2):
+        datos = {'nombre': f'Producto {i}', 'precio': 10, 'stock': 5}
+        res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+        ids.append(res.get_json()['producto']['id'])
+
+    ajustes = [{'id': ids[0], 'delta': -2}, {'id': ids[1], 'delta': -6}, {'id': 9999, 'stock': 1}]
+    response = client.patch('/api/productos/stock',
+                            data=json.dumps(ajustes),
+                            content_type='application/json')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['actualizados'] == [ids[0]]
+    assert data['no_encontrados'] == [9999]
+    assert data['rechazados'][0]['id'] == ids[1]
+
+
+def test_ajustar_stock_lote_sin_arreglo(client):
+    """Prueba ajuste en lote sin arreglo JSON"""
+    response = client.patch('/api/productos/stock',
+                            data=json.dumps({'id': 1, 'stock': 2}),
+                            content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_ajustar_stock_lote_fuera_de_rango(client):
+    """Prueba que ids y valores fuera del rango de 64 bits se rechazan por entrada"""
+    datos = {'nombre': 'Rango', 'precio': 10, 'stock': 5}
+    res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+
+    ajustes = [
+        {'id': producto_id, 'delta': 10**20},
+        {'id': 10**20, 'stock': 1},
+        {'id': producto_id, 'stock': 2**63},
+        {'id': producto_id, 'stock': 7}
+    ]
+    response = client.patch('/api/productos/stock',
+                            data=json.dumps(ajustes),
+                            content_type='application/json')
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['actualizados'] == [producto_id]
+    assert [r['indice'] for r in data['rechazados']] == [0, 1, 2]
+    assert 'fuera del rango' in data['rechazados'][2]['error']
+
+
+def test_ajustar_stock_endpoint(client):
+    """Prueba ajustar stock con delta"""
+    datos = {'nombre': 'Monitor', 'precio': 150, 'stock': 4}
+    res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+
+    response = client.post(f'/api/productos/{producto_id}/stock/ajuste',
+                           data=json.dumps({'delta': -3}),
+                           content_type='application/json')
+    assert response.status_code == 200
+    assert response.get_json()['stock'] == 1
+
+    response = client.post(f'/api/productos/{producto_id}/stock/ajuste',
+                           data=json.dumps({'delta': -3}),
+                           content_type='application/json')
+    assert response.status_code == 409
+
+
+def test_ajustar_stock_endpoint_errores(client):
+    """Prueba ajuste de stock con delta inválido o producto inexistente"""
+    response = client.post('/api/productos/9999/stock/ajuste',
+                           data=json.dumps({'delta': 1}),
+                           content_type='application/json')
+    assert response.status_code == 404
+
+    response = client.post('/api/productos/9999/stock/ajuste',
+                           data=json.dumps({'delta': '1'}),
+                           content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_ajustar_stock_endpoint_fuera_de_rango(client):
+    """Prueba que un delta fuera del rango de 64 bits devuelve 400"""
+    datos = {'nombre': 'Rango', 'precio': 10, 'stock': 5}
+    res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+
+    for delta in (10**20, 2**63, -2**63 - 1):
+        response = client.post(f'/api/productos/{producto_id}/stock/ajuste',
+                               data=json.dumps({'delta': delta}),
+                               content_type='application/json')
+        assert response.status_code == 400
+
+    response = client.post(f'/api/productos/{producto_id}/stock/ajuste',
+                           data=json.dumps({'delta': 2**63}),
+                           content_type='application/json')
+    assert 'fuera del rango' in response.get_json()['error']
+    assert client.get(f'/api/productos/{producto_id}/stock').get_json()['stock'] == 5
+
+
+def test_stock_historico_y_movimientos(client):
+    """Prueba el stock a una fecha y el historial de movimientos"""
+    datos = {'nombre': 'Parlante', 'precio': 40, 'stock': 6}
+    res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+    momento = datetime.now(timezone.utc).isoformat()
+    client.post(f'/api/productos/{producto_id}/stock/ajuste',
+                data=json.dumps({'delta': -2}), content_type='application/json')
+
+    response = client.get(f'/api/productos/{producto_id}/stock')
+    assert response.get_json() == {'id': producto_id, 'stock': 4}
+    response = client.get(f'/api/productos/{producto_id}/stock', query_string={'en': momento})
+    assert response.status_code == 200
+    assert response.get_json()['stock'] == 6
+    assert client.get(f'/api/productos/{producto_id}/stock?en=ayer').status_code == 400
+    assert client.get('/api/productos/9999/stock').status_code == 404
+
+    response = client.get(f'/api/productos/{producto_id}/movimientos?limite=1')
+    data = response.get_json()
+    assert [m['delta'] for m in data['movimientos']] == [6]
+    response = client.get(f'/api/productos/{producto_id}/movimientos',
+                          query_string={'desde_id': data['siguiente_desde_id']})
+    data = response.get_json()
+    assert [(m['motivo'], m['delta']) for m in data['movimientos']] == [('ajuste', -2)]
+    assert data['siguiente_desde_id'] is None
+
+
+def test_feed_de_cambios_endpoint(client):
+    """Prueba el feed de cambios y la validación de sus parámetros"""
+    res = client.post('/api/productos', data=json.dumps({'nombre': 'Mouse', 'precio': 9, 'stock': 3}),
+                      content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+    client.delete(f'/api/productos/{producto_id}')
+
+    response = client.get('/api/productos/cambios?desde=0')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data['cambios'] == [{'id': producto_id, 'secuencia': 2, 'eliminado': True}]
+    assert data['hay_mas'] is False
+
+    response = client.get('/api/productos/cambios', query_string={'desde': data['siguiente']})
+    assert response.get_json()['cambios'] == []
+    assert client.get('/api/productos/cambios?desde=abc').status_code == 400
+    assert client.get('/api/productos/cambios?limite=0').status_code == 400
+    assert client.get('/api/productos/cambios?espera=3600').status_code == 400
+
+
+def test_estadisticas_inventario(client):
+    """Prueba el resumen de inventario del endpoint de estadísticas"""
+    for nombre, precio, stock in (('A', 10.0, 3), ('B', 2.0, 0), ('C', 1.25, 20)):
+        client.post('/api/productos', data=json.dumps({'nombre': nombre, 'precio': precio, 'stock': stock}),
+                    content_type='application/json')
+
+    response = client.get('/api/productos/estadisticas')
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'productos': 3,
+        'valor_total': 55.0,
+        'stock_total': 23,
+        'sin_stock': 1,
+        'stock_bajo': 2,
+        'umbral_stock_bajo': 5
+    }
+
+
+def test_estadisticas_cache(client):
+    """Prueba que los listados repetidos se sirven desde la caché"""
+    client.get('/api/productos')
+    client.get('/api/productos')
+
+    response = client.get('/api/cache')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['aciertos'] == 1
+    assert data['fallos'] == 1
+
+
+def test_obtener_producto_por_id_endpoint(client):
+    """Prueba obtener un producto individual"""
+    datos = {'nombre': 'Webcam', 'precio': 60, 'stock': 3}
+    res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+
+    response = client.get(f'/api/productos/{producto_id}')
+    assert response.status_code == 200
+    assert response.get_json()['producto']['nombre'] == 'Webcam'
+    assert response.headers['ETag']
+
+    response = client.get('/api/productos/9999')
+    assert response.status_code == 404
+
+
+def test_obtener_producto_etag_304(client):
+    """Prueba que un ETag vigente responde 304 y uno antiguo no"""
+    datos = {'nombre': 'Webcam', 'precio': 60, 'stock': 3}
+    res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+    producto_id = res.get_json()['producto']['id']
+
+    etag = client.get(f'/api/productos/{producto_id}').headers['ETag']
+    response = client.get(f'/api/productos/{producto_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    client.put(f'/api/productos/{producto_id}/stock',
+               data=json.dumps({'stock': 9}),
+               content_type='application/json')
+    response = client.get(f'/api/productos/{producto_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['producto']['stock'] == 9
+
+
+def test_listar_productos_etag_304(client):
+    """Prueba respuestas condicionales del listado según la versión de la tabla"""
+    client.post('/api/productos',
+                data=json.dumps({'nombre': 'A', 'precio': 1, 'stock': 1}),
+                content_type='application/json')
+
+    response = client.get('/api/productos?pagina=1')
+    etag = response.headers['ETag']
+    assert response.headers['Last-Modified']
+
+    response = client.get('/api/productos?pagina=1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+    response = client.get('/api/productos?pagina=2', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+    client.post('/api/productos',
+                data=json.dumps({'nombre': 'B', 'precio': 1, 'stock': 1}),
+                content_type='application/json')
+    response = client.get('/api/productos?pagina=1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['total'] == 2
+
+
+def test_listar_productos_por_ids(client):
+    """Prueba obtener varios productos por id en una sola petición"""
+    ids = []
+    for i in range(3):
+        datos = {'nombre': f'Producto {i}', 'precio': 10, 'stock': 1}
+        res = client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+        ids.append(res.get_json()['producto']['id'])
+
+    response = client.get(f'/api/productos?ids={ids[2]},{ids[0]},9999')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [p['id'] for p in data['productos']] == [ids[2], ids[0]]
+    assert data['no_encontrados'] == [9999]
+
+
+def test_listar_productos_por_ids_invalidos(client):
+    """Prueba ids mal formados"""
+    assert client.get('/api/productos?ids=1,a').status_code == 400
+    assert client.get('/api/productos?ids=').status_code == 400
+
+
+def test_listar_productos_filtros_y_orden(client):
+    """Prueba filtros y orden en el listado"""
+    for nombre, precio, stock in [('Laptop', 900, 2), ('Mouse', 20, 50), ('Monitor', 150, 0)]:
+        datos = {'nombre': nombre, 'precio': precio, 'stock': stock}
+        client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+
+    response = client.get('/api/productos?stock_max=5&orden=-precio')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert [p['nombre'] for p in data['productos']] == ['Laptop', 'Monitor']
+    assert data['total'] == 2
+
+    response = client.get('/api/productos?nombre=Mo&cursor=&orden=id')
+    assert [p['nombre'] for p in response.get_json()['productos']] == ['Mouse', 'Monitor']
+
+
+def test_listar_productos_filtros_invalidos(client):
+    """Prueba filtros u orden inválidos"""
+    assert client.get('/api/productos?precio_min=barato').status_code == 400
+    assert client.get('/api/productos?orden=color').status_code == 400
+
+
+def test_buscar_productos_endpoint(client):
+    """Prueba búsqueda de productos por nombre"""
+    for nombre in ['Laptop HP', 'Laptop Dell', 'Mouse']:
+        datos = {'nombre': nombre, 'precio': 10, 'stock': 1}
+        client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+
+    response = client.get('/api/productos/buscar?q=lap')
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['total'] == 2
+
+    assert client.get('/api/productos/buscar').status_code == 400
+
+
+def test_exportar_productos_ndjson(client):
+    """Prueba exportación del catálogo en NDJSON"""
+    datos = [{'nombre': f'Producto {i}', 'precio': 1.5, 'stock': i} for i in range(3)]
+    client.post('/api/productos/lote', data=json.dumps(datos), content_type='application/json')
+
+    response = client.get('/api/productos/export')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    filas = [json.loads(linea) for linea in response.data.decode().splitlines()]
+    assert [f['nombre'] for f in filas] == ['Producto 0', 'Producto 1', 'Producto 2']
+    assert filas[0]['fecha_creacion']
+
+
+def test_exportar_productos_csv_con_filtros(client):
+    """Prueba exportación en CSV con filtros del listado"""
+    datos = [{'nombre': f'Producto {i}', 'precio': 1.5, 'stock': i} for i in range(3)]
+    client.post('/api/productos/lote', data=json.dumps(datos), content_type='application/json')
+
+    response = client.get('/api/productos/export?formato=csv&stock_max=1')
+    assert response.status_code == 200
+    lineas = response.data.decode().splitlines()
+    assert lineas[0] == 'id,nombre,precio,stock,umbral_reorden,fecha_creacion,fecha_actualizacion'
+    assert len(lineas) == 3
+
+    assert client.get('/api/productos/export?formato=xml').status_code == 400
+
+
+def test_listar_productos_modos_total(client):
+    """Prueba total=aproximado (por defecto), exacto y omitir"""
+    for i in range(3):
+        datos = {'nombre': f'Producto {i}', 'precio': 10, 'stock': 1}
+        client.post('/api/productos', data=json.dumps(datos), content_type='application/json')
+
+    assert client.get('/api/productos').get_json()['total'] == 3
+    assert client.get('/api/productos?total=exacto&nombre=Producto 1').get_json()['total'] == 1
+
+    data = client.get('/api/productos?total=omitir').get_json()
+    assert len(data['productos']) == 3
+    assert 'total' not in data and 'total_paginas' not in data
+
+    response = client.get('/api/productos?total=todo')
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+from sqlalchemy import inspect, select, text
+from inventario.app import crear_app
+from inventario.busqueda import buscar_productos
+from datetime import datetime
+from inventario.database import (
+    ajustar_stock, contar_productos, obtener_stock_en, obtener_version_productos, obtener_cambios,
+    decodificar_desde, MAX_CAMBIOS
+)
+from inventario.models import db, Producto, SnapshotStock
+from inventario.semilla import generar_lote, generar_lotes, sembrar
+
+def _app(tmp_path):
+    return crear_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path / "semilla.db"}'})
+
+def test_generar_lote_determinista():
+    """Prueba que una semilla produce los mismos datos sin importar el lote"""
+    assert generar_lote(7, 0, 50, 100) == generar_lote(7, 0, 50, 100)
+    assert generar_lote(7, 0, 50, 100) != generar_lote(8, 0, 50, 100)
+    
+    lotes = list(generar_lotes(100, semilla=7, tamano_lote=50))
+    assert lotes == [generar_lote(7, 0, 50, 100), generar_lote(7, 50, 50, 100)]
+
+def test_generar_lote_valores_validos():
+    """Prueba que las filas generadas pasan la validación del modelo"""
+    filas = generar_lote(0, 0, 500, 500)
+    fechas = [f for _, _, _, f in filas]
+    
+    assert fechas == sorted(fechas)
+    for nombre, precio, stock, _ in filas:
+        assert not Producto(nombre=nombre, precio=precio, stock=stock).validar()
+
+def test_sembrar_reconstruye_indices_y_busqueda(tmp_path):
+    """Prueba la carga con índices, FTS y contador reconstruidos"""
+    app = _app(tmp_path)
+    
+    tiempos = sembrar(app, 1200, tamano_lote=500)
+    
+    with app.app_context():
+        indices = {i['name'] for i in inspect(db.engine).get_indexes('productos')}
+        nombre = db.session.execute(select(Producto.nombre).where(Producto.id == 1)).scalar()
+        productos, total = buscar_productos(nombre.split()[0])
+        
+        assert set(tiempos) == {'carga', 'indices'}
+        assert {i.name for i in Producto.__table__.indexes} <= indices
+        assert db.session.execute(text('SELECT count(*) FROM productos_fts')).scalar() == 1200
+        assert total > 0
+        assert contar_productos(modo='aproximado') == 1200
+        assert obtener_version_productos()[0] >= 1
+        assert db.session.get(Producto, 1200).fecha_creacion is not None
+        db.engine.dispose()
+
+def test_sembrar_reemplazar(tmp_path):
+    """Prueba que reemplazar elimina los productos previos y deja sus marcas"""
+    app = _app(tmp_path)
+    
+    sembrar(app, 300)
+    with app.app_context():
+        desde = obtener_version_productos()[0]
+    sembrar(app, 200, reemplazar=True)
+    
+    with app.app_context():
+        assert contar_productos() == 200
+        assert contar_productos(modo='aproximado') == 200
+        assert SnapshotStock.query.count() == 200
+        
+        # El feed informa la baja de cada producto reemplazado
+        cambios = []
+        siguiente = (desde, None)
+        while True:
+            pagina, posicion = obtener_cambios(siguiente, limite=MAX_CAMBIOS)
+            if not pagina:
+                break
+            cambios += pagina
+            siguiente = decodificar_desde(posicion)
+        eliminados = sorted(c['id'] for c in cambios if c['eliminado'])
+        assert eliminados == list(range(1, 301))
+        assert min(c['id'] for c in cambios if not c['eliminado']) == 301
+        db.engine.dispose()
+
+def test_sembrar_registra_stock_inicial(tmp_path):
+    """Prueba que el stock sembrado queda en snapshots para el historial"""
+    app = _app(tmp_path)
+    
+    sembrar(app, 100)
+    
+    with app.app_context():
+        producto = db.session.get(Producto, 50)
+        stock = producto.stock
+        fecha_creacion = producto.fecha_creacion
+        ajustar_stock(50, 5)
+        
+        assert SnapshotStock.query.count() == 100
+        assert obtener_stock_en(50, fecha_creacion) == (stock, None)
+        assert obtener_stock_en(50, datetime.utcnow()) == (stock + 5, None)
+        db.engine.dispose()
\ No newline at end of file
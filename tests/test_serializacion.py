@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+from inventario.serializacion import ProveedorJSON, filas_a_dicts
+
+def test_proveedor_serializa_fechas_y_texto_no_ascii(app):
+    """Prueba que el proveedor emite fechas ISO y no escapa caracteres"""
+    texto = app.json.dumps({'nombre': 'Café ñandú', 'fecha': datetime(2024, 1, 2, 3, 4, 5)})
+    
+    assert isinstance(app.json, ProveedorJSON)
+    assert 'Café ñandú' in texto
+    assert json.loads(texto) == {'nombre': 'Café ñandú', 'fecha': '2024-01-02T03:04:05'}
+
+def test_proveedor_respuesta_json(app):
+    """Prueba que las respuestas del proveedor son JSON válido"""
+    with app.test_request_context():
+        respuesta = app.json.response({'b': 1, 'a': [1, 2]})
+    
+    assert respuesta.mimetype == 'application/json'
+    assert json.loads(respuesta.get_data()) == {'a': [1, 2], 'b': 1}
+
+def test_filas_a_dicts():
+    """Prueba la conversión de tuplas de columnas a diccionarios"""
+    filas = [(1, 'A'), (2, 'B')]
+    assert filas_a_dicts(('id', 'nombre'), filas) == [
+        {'id': 1, 'nombre': 'A'},
+        {'id': 2, 'nombre': 'B'}
+    ]
+
+def test_listado_conserva_formato_de_producto(client, sample_producto):
+    """Prueba que el listado desde filas coincide con el detalle del producto"""
+    listado = client.get('/api/productos').get_json()
+    detalle = client.get(f'/api/productos/{sample_producto}').get_json()
+    
+    assert listado['productos'] == [detalle['producto']]
+    assert listado['total'] == 1
+    assert listado['total_paginas'] == 1